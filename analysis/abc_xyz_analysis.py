@@ -0,0 +1,33 @@
+import plotly.express as px
+import streamlit as st
+from utils.classification import ABC_THRESHOLDS, XYZ_THRESHOLDS, DEFAULT_XYZ_WEEKS
+
+# Products and revenue in each ABC x XYZ cell of one scope (a store or all stores)
+def compute_class_matrix(scope_classes):
+    return scope_classes.groupby(['abc', 'xyz'], as_index=False).agg(
+        products=('productName', 'size'),
+        revenue=('revenue', 'sum'),
+    )
+
+def abc_xyz_analysis(product_classes, scope, selected_products):
+    st.markdown("<h1 style='text-align: center; color: green;'>ABC/XYZ Classification</h1>", unsafe_allow_html=True)
+    st.caption(
+        f"ABC ranks products by cumulative revenue share (A: top {ABC_THRESHOLDS[0]:.0%}, B: up to {ABC_THRESHOLDS[1]:.0%}, C: the rest). "
+        f"XYZ grades weekly demand over the last {DEFAULT_XYZ_WEEKS} weeks by its coefficient of variation "
+        f"(X: up to {XYZ_THRESHOLDS[0]}, Y: up to {XYZ_THRESHOLDS[1]}, Z: above). Classes cover the whole dataset; "
+        f"the date filter does not apply."
+    )
+
+    scope_classes = product_classes[product_classes['storeName'] == scope]
+    if scope_classes.empty:
+        st.warning(f"No products to classify in {scope}.")
+        return
+
+    matrix = compute_class_matrix(scope_classes)
+    fig = px.density_heatmap(matrix, x='xyz', y='abc', z='revenue', text_auto=',.0f',
+                             category_orders={'abc': ['A', 'B', 'C'], 'xyz': ['X', 'Y', 'Z']},
+                             title=f"Revenue by class: {scope}", labels={'abc': 'ABC', 'xyz': 'XYZ'})
+    st.plotly_chart(fig, use_container_width=True)
+
+    table = scope_classes[scope_classes['productName'].isin(selected_products)]
+    st.dataframe(table.drop(columns='storeName'), use_container_width=True, hide_index=True)
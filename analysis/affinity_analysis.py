@@ -2,21 +2,46 @@ import pandas as pd
 import itertools
 from collections import Counter
 import streamlit as st
+from utils.heavy_hitters import SpaceSaving
+from utils.export import DEFAULT_EXPORT_CHUNK_ROWS, frame_chunks
 
-def affinity_analysis(data):
-    # Extract relevant columns (invoice, productId, productName, and time) from the data
-    transaction_data = data[['invoice', 'productId', 'productName', 'time']]
+# Counters kept per combination size (pairs, triples) in streaming mode
+DEFAULT_STREAMING_CAPACITY = 50_000
 
-    # Ensure the 'time' column is parsed as datetime
-    try:
-        transaction_data['time'] = pd.to_datetime(transaction_data['time'], errors='coerce')
-    except Exception as e:
-        st.warning("Time column contains invalid or inconsistent formats. Proceeding without time-based filtering.")
-        transaction_data['time'] = pd.NaT
+# Combinations of each size reported in streaming mode
+DEFAULT_STREAMING_TOP_K = 1_000
+
+def _prepare_transactions(data):
+    # Extract relevant columns (invoice, productId and productName) from the data; time-of-day
+    # splits are handled by the association rules in analysis/association_rules.py
+    transaction_data = data[['invoice', 'productId', 'productName']]
 
     # Drop rows with missing productId or invoice (essential for analysis)
     transaction_data = transaction_data.dropna(subset=['productId', 'invoice'])
 
+    return transaction_data
+
+# Split (combination, frequency, ...) records into product_1..product_n columns, most frequent first
+def _combinations_frame(records, value_columns):
+    cooccurrence_df = pd.DataFrame(records, columns=['product_combination'] + value_columns)
+
+    if not cooccurrence_df.empty:
+        max_combination_size = cooccurrence_df['product_combination'].apply(len).max()
+
+        product_combinations_df = pd.DataFrame(
+            cooccurrence_df['product_combination'].tolist(),
+            columns=[f'product_{i+1}' for i in range(max_combination_size)]
+        )
+
+        cooccurrence_df = pd.concat([cooccurrence_df[value_columns], product_combinations_df], axis=1)
+
+        cooccurrence_df = cooccurrence_df.sort_values(by='frequency', ascending=False).reset_index(drop=True)
+
+    return cooccurrence_df
+
+def compute_cooccurrence(data):
+    transaction_data = _prepare_transactions(data)
+
     # Step 1: Generate Co-occurrence Matrix (Combinations)
     cooccurrence = Counter()
 
@@ -29,27 +54,92 @@ def affinity_analysis(data):
                 cooccurrence.update(product_combinations)
 
     # Step 3: Convert co-occurrence dictionary to a DataFrame for easier analysis
-    cooccurrence_df = pd.DataFrame(cooccurrence.items(), columns=['product_combination', 'frequency'])
+    cooccurrence_df = _combinations_frame(cooccurrence.items(), ['frequency'])
 
-    if not cooccurrence_df.empty:
-        max_combination_size = cooccurrence_df['product_combination'].apply(len).max()
+    # Map the productId to productName for displaying in the selectbox
+    product_name_map = dict(zip(transaction_data['productId'], transaction_data['productName']))
 
-        product_combinations_df = pd.DataFrame(
-            cooccurrence_df['product_combination'].tolist(),
-            columns=[f'product_{i+1}' for i in range(max_combination_size)]
-        )
+    return transaction_data, cooccurrence_df, product_name_map
 
-        cooccurrence_df = pd.concat([product_combinations_df, cooccurrence_df['frequency']], axis=1)
+# Exact counts of a sidebar selection (start_date, end_date, stores, products), cached per dataset and filter
+# in the dataset's FilterCache, so a warm start can precompute the default view. Only the counts and the name
+# map are cached; the transaction rows are re-taken from the (cached) selection slice. Callers get shallow
+# copies (copy-on-write) and their own name map, never the cached objects.
+def selection_cooccurrence(filter_cache, selection):
+    cooccurrence_df, product_name_map = filter_cache.derived('cooccurrence', *selection, lambda rows: compute_cooccurrence(rows)[1:])
+    transaction_data = _prepare_transactions(filter_cache.by_product(*selection))
+    return transaction_data, cooccurrence_df.copy(deep=False), dict(product_name_map)
 
-        columns = ['frequency'] + [col for col in cooccurrence_df.columns if col != 'frequency']
-        cooccurrence_df = cooccurrence_df[columns]
+# Bounded-memory variant: invoices are streamed through Space-Saving summaries of `capacity` counters
+# per combination size, so memory no longer grows with the number of distinct combinations.
+# frequency_error is the maximum overcount of each row; the frame's attrs carry the global bounds.
+def compute_streaming_cooccurrence(data, capacity=DEFAULT_STREAMING_CAPACITY, top_k=DEFAULT_STREAMING_TOP_K):
+    transaction_data = _prepare_transactions(data)
 
-        cooccurrence_df = cooccurrence_df.sort_values(by='frequency', ascending=False).reset_index(drop=True)
+    summaries = {r: SpaceSaving(capacity) for r in range(2, 4)}
+
+    for invoice, product_ids in transaction_data.groupby('invoice', sort=False)['productId']:
+        if len(product_ids) > 1:
+            product_ids = sorted(product_ids.tolist())
+            for r, summary in summaries.items():
+                summary.update(itertools.combinations(product_ids, r))
+
+    records = [record for summary in summaries.values() for record in summary.top(top_k)]
+    cooccurrence_df = _combinations_frame(records, ['frequency', 'frequency_error'])
+    cooccurrence_df.attrs['error_bounds'] = {r: summary.max_error for r, summary in summaries.items()}
+
+    product_name_map = dict(zip(transaction_data['productId'], transaction_data['productName']))
+
+    return transaction_data, cooccurrence_df, product_name_map
+
+# Every exact combination with product names, in chunks for export: names are mapped one chunk at a
+# time instead of building a second full-size frame. With a filter cache, the selection's cached counts are used.
+def cooccurrence_export_chunks(data, filter_cache=None, selection=None, chunk_rows=DEFAULT_EXPORT_CHUNK_ROWS):
+    if filter_cache is None:
+        _, cooccurrence_df, product_name_map = compute_cooccurrence(data)
+    else:
+        _, cooccurrence_df, product_name_map = selection_cooccurrence(filter_cache, selection)
+    product_columns = [col for col in cooccurrence_df.columns if col.startswith('product_')]
+    for chunk in frame_chunks(cooccurrence_df, chunk_rows):
+        yield chunk.assign(**{col: chunk[col].map(product_name_map) for col in product_columns})
+
+# `data` is the by_product slice of `selection` in filter_cache; without a filter cache counts are not cached
+def affinity_analysis(data, filter_cache=None, selection=None):
+    counting_mode = st.radio(
+        "Combination counting",
+        ["Exact", "Streaming (bounded memory)"],
+        horizontal=True,
+        key="affinity_counting_mode",
+        help="Streaming mode keeps a fixed number of counters per combination size and reports the top combinations with error bounds."
+    )
+
+    if counting_mode == "Exact" and filter_cache is not None:
+        with st.spinner("Counting product combinations..."):
+            transaction_data, cooccurrence_df, product_name_map = selection_cooccurrence(filter_cache, selection)
+    elif counting_mode == "Exact":
+        transaction_data, cooccurrence_df, product_name_map = compute_cooccurrence(data)
     else:
+        capacity = st.number_input(
+            "Counters per combination size (memory budget)",
+            min_value=100,
+            value=DEFAULT_STREAMING_CAPACITY,
+            step=1_000,
+            key="affinity_streaming_capacity"
+        )
+        transaction_data, cooccurrence_df, product_name_map = compute_streaming_cooccurrence(data, capacity=int(capacity))
+        if not cooccurrence_df.empty:
+            bounds = cooccurrence_df.attrs['error_bounds']
+            st.caption(
+                f"Each frequency overstates the true count by at most its frequency_error "
+                f"(never more than {bounds[2]:,.1f} for pairs and {bounds[3]:,.1f} for triples). "
+                f"Any combination bought together more often than that is guaranteed to be listed."
+            )
+
+    if cooccurrence_df.empty:
         st.warning("No product combinations found. Please check your data.")
 
-    # Map the productId to productName for displaying in the selectbox
-    product_name_map = dict(zip(transaction_data['productId'], transaction_data['productName']))
+    product_columns = [col for col in cooccurrence_df.columns if col.startswith('product_')]
+
     unique_product_names = sorted(transaction_data['productName'].unique())
 
     # Let the user select a product by its name
@@ -62,16 +152,16 @@ def affinity_analysis(data):
     if selected_product_name == "All Products":
         filtered_df = cooccurrence_df.copy()
 
-        for col in filtered_df.columns[1:]:
+        for col in product_columns:
             filtered_df[col] = filtered_df[col].map(product_name_map)
     else:
         selected_product_id = [product_id for product_id, product_name in product_name_map.items() if product_name == selected_product_name][0]
 
         filtered_df = cooccurrence_df[
-            cooccurrence_df.apply(lambda row: selected_product_id in row.values[1:], axis=1)
+            cooccurrence_df[product_columns].eq(selected_product_id).any(axis=1)
         ]
 
-        for col in filtered_df.columns[1:]:
+        for col in product_columns:
             filtered_df[col] = filtered_df[col].map(product_name_map)
 
     if selected_product_name == "All Products":
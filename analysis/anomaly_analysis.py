@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from utils.time_series import select_series
+from utils.anomalies import DEFAULT_THRESHOLD, DEFAULT_BASELINE_WEEKS, anomaly_series, detect_anomalies, seasonal_robust_zscores
+
+METRICS = {"Sales": "total_sales", "Quantity": "total_quantity"}
+LEVELS = {"Store totals": "store", "Product and store": "product_store"}
+
+# Days of context shown around a flagged day
+CONTEXT_DAYS = 42
+
+# Flagged days of the selected products and stores between start and end
+def compute_anomalies(daily_cube, selected_products, selected_stores, start_date, end_date, metric="total_sales", level="store",
+                      threshold=DEFAULT_THRESHOLD):
+    rows = select_series(daily_cube, selected_products, selected_stores)
+    flagged = detect_anomalies(daily_cube, metric, level, rows, threshold)
+    in_range = flagged['orderDate'].between(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize())
+    return flagged[in_range].reset_index(drop=True)
+
+def anomaly_analysis(daily_cube, selected_products, selected_stores, start_date, end_date):
+    st.markdown("<h1 style='text-align: center; color: green;'>Sales Anomalies</h1>", unsafe_allow_html=True)
+    st.caption(
+        f"Each day is compared with the median of the same weekday over the previous {DEFAULT_BASELINE_WEEKS} weeks; "
+        "days whose robust z-score passes the threshold are flagged. Store totals catch outages, "
+        "product and store series catch stock-outs."
+    )
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        level_label = st.selectbox("Series", list(LEVELS), key="anomaly_level")
+    with col2:
+        metric_label = st.selectbox("Metric", list(METRICS), key="anomaly_metric")
+    with col3:
+        threshold = st.number_input("Z-score threshold", min_value=1.0, max_value=20.0, value=DEFAULT_THRESHOLD, step=0.5,
+                                    key="anomaly_threshold")
+
+    level, metric = LEVELS[level_label], METRICS[metric_label]
+    flagged = compute_anomalies(daily_cube, selected_products, selected_stores, start_date, end_date, metric, level, threshold)
+
+    if flagged.empty:
+        st.success("No anomalies in the selected range.")
+        return
+
+    col1, col2 = st.columns(2)
+    col1.metric("Drops", f"{(flagged['direction'] == 'drop').sum():,}")
+    col2.metric("Spikes", f"{(flagged['direction'] == 'spike').sum():,}")
+    st.dataframe(flagged, use_container_width=True, hide_index=True)
+
+    # One flagged day in context: the series against its weekday baseline
+    series_labels = flagged['storeName'] if level == "store" else flagged['productName'] + " @ " + flagged['storeName']
+    options = (series_labels + " on " + flagged['orderDate'].dt.strftime('%Y-%m-%d')).head(50).tolist()
+    chosen_label = st.selectbox("Flagged day", options, key="anomaly_day")
+    chosen = flagged.iloc[options.index(chosen_label)]
+
+    series_rows = select_series(daily_cube, selected_products, [chosen['storeName']])
+    if level != "store":
+        series_rows = series_rows[daily_cube['products'][series_rows] == chosen['productName']]
+    _, matrix = anomaly_series(daily_cube, metric, "store", series_rows)
+    baseline, _ = seasonal_robust_zscores(matrix)
+
+    day = daily_cube['dates'].get_loc(chosen['orderDate'])
+    window = slice(max(day - CONTEXT_DAYS, 0), min(day + CONTEXT_DAYS // 3, len(daily_cube['dates']) - 1) + 1)
+    chart_data = pd.DataFrame({
+        'orderDate': np.tile(daily_cube['dates'][window], 2),
+        metric_label: np.concatenate([matrix[0, window], baseline[0, window]]),
+        'series': np.repeat(["Actual", "Weekday baseline"], window.stop - window.start),
+    })
+    fig = px.line(chart_data, x='orderDate', y=metric_label, color='series', title=chosen_label)
+    fig.add_scatter(x=[chosen['orderDate']], y=[chosen['value']], mode='markers', marker=dict(size=12, color='red'), name=chosen['direction'])
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import streamlit as st
+from utils.data_loader import row_hours
+
+# Hour-of-day buckets used to split baskets; hours are [start, end) and may wrap past midnight
+TIME_BUCKETS = {
+    "Morning (6-12)": (6, 12),
+    "Afternoon (12-17)": (12, 17),
+    "Evening (17-22)": (17, 22),
+    "Night (22-6)": (22, 6),
+}
+
+ALL_DAY = "All day"
+
+def _bucket_mask(hours, start, end):
+    if start < end:
+        return (hours >= start) & (hours < end)
+    return (hours >= start) | (hours < end)
+
+# Mine item and pair counts once per selection: one basket x item incidence matrix, then one
+# sparse co-occurrence matrix (upper triangle) and item-count vector per time bucket
+def build_rule_model(data):
+    transactions = pd.DataFrame({
+        'invoice': data['invoice'],
+        'productId': data['productId'],
+        'productName': data['productName'],
+        'hour': row_hours(data),
+    }).dropna(subset=['invoice', 'productId'])
+
+    basket_codes, baskets = pd.factorize(transactions['invoice'])
+    item_codes, items = pd.factorize(transactions['productId'])
+
+    incidence = sp.csr_matrix(
+        (np.ones(len(basket_codes), dtype=np.int32), (basket_codes, item_codes)),
+        shape=(len(baskets), len(items)),
+    )
+    # Repeated lines of the same product in one invoice count once
+    incidence.data[:] = 1
+
+    hour_of_basket = np.full(len(baskets), -1, dtype=np.int64)
+    hour_of_basket[basket_codes] = transactions['hour'].fillna(-1).to_numpy(dtype=np.int64)
+
+    buckets = {ALL_DAY: np.ones(len(baskets), dtype=bool)}
+    for name, (start, end) in TIME_BUCKETS.items():
+        buckets[name] = _bucket_mask(hour_of_basket, start, end)
+
+    bucket_models = {}
+    for name, mask in buckets.items():
+        bucket_incidence = incidence[np.flatnonzero(mask)]
+        pair_counts = sp.triu(bucket_incidence.T @ bucket_incidence, k=1, format='coo')
+        bucket_models[name] = {
+            'baskets': int(mask.sum()),
+            'item_counts': np.asarray(bucket_incidence.sum(axis=0)).ravel(),
+            'pair_counts': pair_counts,
+        }
+
+    product_names = dict(zip(transactions['productId'], transactions['productName']))
+    return {
+        'items': items,
+        'item_names': np.array([product_names.get(item) for item in items], dtype=object),
+        'buckets': bucket_models,
+    }
+
+# Support, confidence and lift for every pair in a bucket, in both directions, from the count arrays
+def compute_rules(model, bucket=ALL_DAY, min_pair_count=2):
+    bucket_model = model['buckets'][bucket]
+    baskets = bucket_model['baskets']
+    pairs = bucket_model['pair_counts']
+    item_counts = bucket_model['item_counts']
+
+    keep = pairs.data >= min_pair_count
+    first, second, together = pairs.row[keep], pairs.col[keep], pairs.data[keep].astype(np.float64)
+
+    # Each unordered pair yields the rules first -> second and second -> first
+    antecedent = np.concatenate([first, second])
+    consequent = np.concatenate([second, first])
+    together = np.concatenate([together, together])
+
+    antecedent_count = item_counts[antecedent].astype(np.float64)
+    consequent_count = item_counts[consequent].astype(np.float64)
+
+    rules = pd.DataFrame({
+        'antecedent': model['item_names'][antecedent],
+        'consequent': model['item_names'][consequent],
+        'pair_count': together.astype(np.int64),
+        'support': together / max(baskets, 1),
+        'confidence': together / antecedent_count,
+        'lift': together * baskets / (antecedent_count * consequent_count),
+    })
+    return rules.sort_values(by=['lift', 'confidence'], ascending=False, ignore_index=True)
+
+# The model of a sidebar selection (start_date, end_date, stores, products), cached in the dataset's FilterCache.
+# The model is shared, not copied: compute_rules only reads it.
+def selection_rule_model(filter_cache, selection):
+    return filter_cache.derived('rule_model', *selection, build_rule_model)
+
+# `data` is the by_product slice of `selection` in filter_cache; without a filter cache the model is not cached
+def association_rules_analysis(data, filter_cache=None, selection=None):
+    st.markdown("<h3 style='text-align: center; color: green;'>Association Rules</h3>", unsafe_allow_html=True)
+
+    with st.spinner("Mining association rules..."):
+        model = build_rule_model(data) if filter_cache is None else selection_rule_model(filter_cache, selection)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        bucket = st.selectbox("Time of day", [ALL_DAY] + list(TIME_BUCKETS), key="association_rules_bucket")
+    with col2:
+        min_pair_count = st.number_input("Minimum baskets with both products", min_value=1, value=3, step=1,
+                                         key="association_rules_min_count")
+    with col3:
+        sort_by = st.selectbox("Rank rules by", ["lift", "confidence", "support"], key="association_rules_sort")
+
+    rules = compute_rules(model, bucket, int(min_pair_count))
+    rules = rules.sort_values(by=sort_by, ascending=False, ignore_index=True)
+
+    st.caption(
+        f"{model['buckets'][bucket]['baskets']:,} baskets in '{bucket}'. "
+        "Lift above 1 means the products are bought together more often than their individual popularity predicts."
+    )
+
+    if rules.empty:
+        st.warning("No product pairs meet the minimum basket count for this time of day.")
+        return
+
+    st.dataframe(rules, use_container_width=True)
@@ -0,0 +1,46 @@
+import plotly.express as px
+import streamlit as st
+from utils.baskets import average_baskets
+
+METRICS = {
+    "Average basket value": "avg_basket_value",
+    "Average basket size (products)": "avg_basket_size",
+    "Average items per basket": "avg_item_count",
+    "Average basket margin": "avg_basket_margin",
+}
+
+def basket_analysis(basket_rollup, selected_stores, start_date, end_date):
+    st.markdown("<h1 style='text-align: center; color: green;'>Basket Analysis</h1>", unsafe_allow_html=True)
+    st.caption("Whole baskets (invoices) of the selected stores and dates, whichever products they contain.")
+
+    overall = average_baskets(basket_rollup, selected_stores, start_date, end_date, by=())
+    if overall.empty or overall['baskets'].iloc[0] == 0:
+        st.warning("No baskets for the selected criteria.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Baskets", f"{overall['baskets'].iloc[0]:,.0f}")
+    col2.metric("Average basket value", f"₹{overall['avg_basket_value'].iloc[0]:,.2f}")
+    col3.metric("Average basket size", f"{overall['avg_basket_size'].iloc[0]:,.2f}")
+    col4.metric("Average basket margin", f"₹{overall['avg_basket_margin'].iloc[0]:,.2f}")
+
+    metric_label = st.selectbox("Metric", list(METRICS), key="basket_metric")
+    metric = METRICS[metric_label]
+
+    # Store x hour grid; baskets without a time are left out of it but counted in the store table
+    store_hours = average_baskets(basket_rollup, selected_stores, start_date, end_date)
+    store_hours = store_hours[store_hours['hour'] >= 0]
+    if not store_hours.empty:
+        grid = store_hours.pivot(index='storeName', columns='hour', values=metric)
+        fig = px.imshow(
+            grid,
+            aspect='auto',
+            color_continuous_scale='Greens',
+            labels={'x': 'Hour', 'y': 'Store', 'color': metric_label},
+            title=f"{metric_label} by store and hour",
+        )
+        fig.update_xaxes(tickmode='linear', dtick=1)
+        st.plotly_chart(fig, use_container_width=True)
+
+    stores = average_baskets(basket_rollup, selected_stores, start_date, end_date, by=('storeName',))
+    st.dataframe(stores.sort_values(by=metric, ascending=False), use_container_width=True, hide_index=True)
@@ -1,27 +1,29 @@
 import streamlit as st
+import pandas as pd
 import plotly.express as px
+from analysis.display import show_table
 
 def category_breakdown_analysis(data, selected_brands):
     st.markdown("<h1 style='text-align: center; color: green;'>Category Breakdown</h1>", unsafe_allow_html=True)
     
-    # Strip extra spaces from categoryName and brandName to ensure consistency
-    data['categoryName'] = data['categoryName'].str.strip()
-    data['brandName'] = data['brandName'].str.strip()
-
-    # Filter data for selected brands
-    filtered_data = data[data['brandName'].isin(selected_brands)]
+    # Filter data for selected brands (names are trimmed at load time)
+    mask = data['brandName'].isin(selected_brands)
 
     # Check if filtered data is empty
-    if filtered_data.empty:
+    if not mask.any():
         st.warning("No data found for the selected brands and categories.")
         return
 
-    # Calculate sales and cost by category
-    filtered_data['total_sales'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_cost'] = filtered_data['costPrice'] * filtered_data['quantity']
+    # Calculate sales and cost by category, for the selected rows only
+    lines = pd.DataFrame({
+        'categoryName': data['categoryName'],
+        'total_sales': data['sellingPrice'] * data['quantity'],
+        'total_cost': data['costPrice'] * data['quantity'],
+        'quantity': data['quantity'],
+    })[mask]
 
     # Aggregate total_sales, total_cost, and quantity by categoryName
-    category_sales = filtered_data.groupby('categoryName').agg(
+    category_sales = lines.groupby('categoryName').agg(
     total_sales=('total_sales', 'sum'),
         total_cost=('total_cost', 'sum'),
         total_quantity=('quantity', 'sum')
@@ -29,16 +31,13 @@ def category_breakdown_analysis(data, selected_brands):
 
     # Calculate profit and profit margin
     category_sales['profit'] = category_sales['total_sales'] - category_sales['total_cost']
-    category_sales['profit_margin'] = ((category_sales['profit'] / category_sales['total_sales']) * 100).round(2)
-
-    # Format profit margin as a percentage
-    category_sales['profit_margin'] = category_sales['profit_margin'].astype(str) + '%'
+    category_sales['profit_margin'] = (category_sales['profit'] / category_sales['total_sales']) * 100
 
     # Sort the dataframe by total_sales in descending order
     category_sales = category_sales.sort_values(by='total_sales', ascending=False)
 
     # Display data table
-    st.dataframe(category_sales)
+    show_table(category_sales)
 
     # Sidebar options for chart customization
     # st.sidebar.subheader("Category Breakdown Chart Settings")
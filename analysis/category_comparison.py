@@ -5,8 +5,8 @@ import plotly.express as px
 def category_comparison_analysis(data, selected_categories):
     st.subheader("Category vs. Category Comparison Analysis")
 
-    # Filter data for selected categories
-    filtered_data = data[data['categoryName'].isin(selected_categories)]
+    # Filter data for selected categories, copying only the two columns the comparison uses
+    filtered_data = data.loc[data['categoryName'].isin(selected_categories), ['categoryName', 'sellingPrice']]
 
     # Group by categoryName and calculate total sales
     category_comparison = (filtered_data.groupby('categoryName')['sellingPrice']
@@ -1,24 +1,61 @@
 import pandas as pd
 import plotly.express as px
 import streamlit as st
+from utils.approximate import estimate_totals
 
-def daily_sales_analysis(filtered_data, selected_products, selected_stores):
-    st.markdown("<h1 style='text-align: center; color: green;'>Daily Sales</h1>", unsafe_allow_html=True)
-    
+def _line_values(data):
+    line_sales = data['sellingPrice'] * data['quantity']
+    line_cost = data['costPrice'] * data['quantity']
+    return {
+        'total_sales': line_sales,
+        'total_quantity': data['quantity'],
+        'total_cost': line_cost,
+        'profit': line_sales - line_cost,
+    }
+
+# With approximate=True, filtered_data is a stratified sample and totals carry *_ci interval columns
+def compute_daily_sales(filtered_data, selected_products, approximate=False):
     # Filter data based on selected products (formerly categories)
     daily_sales_data = filtered_data[filtered_data['productName'].isin(selected_products)]
+
+    if approximate:
+        daily_sales = estimate_totals(daily_sales_data, ['orderDay', 'productName'], _line_values(daily_sales_data))
+        return daily_sales.rename(columns={'orderDay': 'orderDate'}).sort_values(by=['orderDate', 'productName'], ignore_index=True)
     
-    # Aggregate daily sales for each product
-    daily_sales_data['orderDate'] = pd.to_datetime(daily_sales_data['orderDate'])
-    daily_sales = daily_sales_data.groupby([daily_sales_data['orderDate'].dt.date, 'productName']).agg(
-        total_sales=('sellingPrice', lambda x: (x * daily_sales_data.loc[x.index, 'quantity']).sum()),
-        total_quantity=('quantity', 'sum'),
-        total_cost=('costPrice', lambda x: (x * daily_sales_data.loc[x.index, 'quantity']).sum())
-    ).reset_index()
+    # Aggregate daily sales for each product (days stay datetime64, at midnight)
+    line_values = _line_values(daily_sales_data)
+    daily_sales = pd.DataFrame({
+        'orderDate': daily_sales_data['orderDate'].dt.normalize(),
+        'productName': daily_sales_data['productName'],
+        'total_sales': line_values['total_sales'],
+        'total_quantity': line_values['total_quantity'],
+        'total_cost': line_values['total_cost'],
+    }).groupby(['orderDate', 'productName'], as_index=False).sum()
 
     # Add profit calculation: total sales minus total cost
     daily_sales['profit'] = daily_sales['total_sales'] - daily_sales['total_cost']
 
+    return daily_sales
+
+# The exact table of a sidebar selection (start_date, end_date, stores, products), cached in the dataset's
+# FilterCache; callers get a shallow copy (copy-on-write)
+def selection_daily_sales(filter_cache, selection):
+    products = selection[3]
+    return filter_cache.derived('daily_sales', *selection, lambda rows: compute_daily_sales(rows, products)).copy(deep=False)
+
+# `filtered_data` is the by_product slice of `selection` in filter_cache (or a sample of it with approximate=True);
+# only exact tables are cached, and only with a filter cache
+def daily_sales_analysis(filtered_data, selected_products, selected_stores, approximate=False, filter_cache=None, selection=None):
+    st.markdown("<h1 style='text-align: center; color: green;'>Daily Sales</h1>", unsafe_allow_html=True)
+
+    if approximate:
+        st.caption("Approximate mode: figures are estimated from a stratified sample; *_ci columns give the ±95% interval.")
+
+    if filter_cache is None or approximate:
+        daily_sales = compute_daily_sales(filtered_data, selected_products, approximate)
+    else:
+        daily_sales = selection_daily_sales(filter_cache, selection)
+
     # Create a chart of daily sales
     chart_type = st.selectbox("Select chart type for Daily Sales", ["Line Chart", "Bar Chart", "Area Chart", "Donut Chart"])
     
@@ -53,13 +90,22 @@ def daily_sales_analysis(filtered_data, selected_products, selected_stores):
     total_quantity = daily_sales['total_quantity'].sum()
     total_profit = daily_sales['profit'].sum()
 
+    # Intervals of the overall totals (not the sum of the per-day intervals)
+    sales_interval, quantity_interval, profit_interval = "", "", ""
+    if approximate:
+        sample = filtered_data[filtered_data['productName'].isin(selected_products)]
+        overall = estimate_totals(sample, [], _line_values(sample)).iloc[0]
+        sales_interval = f" ± ₹{overall['total_sales_ci']:,.0f}"
+        quantity_interval = f" ± {overall['total_quantity_ci']:,.0f}"
+        profit_interval = f" ± ₹{overall['profit_ci']:,.0f}"
+
     # Using st.columns() to display metrics side by side
     col1, col2, col3 = st.columns(3)
 
     # Display metrics in each column
     with col1:
-        st.metric("Total Sales", f"₹{total_sales:,.2f}", delta=f"▲ ₹{total_sales - daily_sales['total_sales'].mean():,.2f}", delta_color="normal")
+        st.metric("Total Sales", f"₹{total_sales:,.2f}{sales_interval}", delta=f"▲ ₹{total_sales - daily_sales['total_sales'].mean():,.2f}", delta_color="normal")
     with col2:
-        st.metric("Total Quantity Sold", f"{total_quantity:,.0f}")
+        st.metric("Total Quantity Sold", f"{total_quantity:,.0f}{quantity_interval}")
     with col3:
-        st.metric("Total Profit", f"₹{total_profit:,.2f}", delta=f"▲ ₹{total_profit - daily_sales['profit'].mean():,.2f}", delta_color="normal")
+        st.metric("Total Profit", f"₹{total_profit:,.2f}{profit_interval}", delta=f"▲ ₹{total_profit - daily_sales['profit'].mean():,.2f}", delta_color="normal")
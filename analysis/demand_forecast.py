@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from utils.forecasting import DEFAULT_HISTORY_DAYS
+from utils.time_series import cube_group_sums
+
+# Days of actual quantities shown before the forecast in the series chart
+HISTORY_SHOWN_DAYS = 28
+
+# Forecast rows for the selected products and stores, per product and store or summed per product
+def compute_demand_forecast(forecast, selected_products, selected_stores, level="Product and store"):
+    forecast_dates = forecast.attrs['forecast_dates']
+    day_columns = [date.strftime('%Y-%m-%d') for date in forecast_dates]
+
+    selected = forecast[forecast['productName'].isin(selected_products) & forecast['storeName'].isin(selected_stores)]
+    if level == "Product":
+        selected = selected.groupby('productName', as_index=False)[day_columns + ['forecast_total']].sum()
+
+    return selected.sort_values(by='forecast_total', ascending=False, ignore_index=True)
+
+def demand_forecast_analysis(daily_cube, forecast, selected_products, selected_stores):
+    st.markdown("<h1 style='text-align: center; color: green;'>Demand Forecast</h1>", unsafe_allow_html=True)
+
+    forecast_dates = forecast.attrs['forecast_dates']
+    if len(forecast_dates) == 0 or len(forecast) == 0:
+        st.warning("Not enough data to forecast demand.")
+        return
+
+    st.caption(
+        f"Quantities expected from {forecast_dates[0]:%d %b %Y} to {forecast_dates[-1]:%d %b %Y}, the week after the last order. "
+        f"Each product and store is fitted on its last {DEFAULT_HISTORY_DAYS} days with Holt-Winters smoothing "
+        "and day-of-week seasonality; the date filter does not apply."
+    )
+
+    level = st.radio("Forecast per", ["Product and store", "Product"], horizontal=True, key="demand_forecast_level")
+    table = compute_demand_forecast(forecast, selected_products, selected_stores, level)
+
+    if table.empty:
+        st.warning("No forecast for the selected products and stores.")
+        return
+
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    st.download_button(
+        "Download forecast (CSV)",
+        table.to_csv(index=False),
+        file_name=f"demand_forecast_{forecast_dates[0]:%Y%m%d}.csv",
+        mime="text/csv",
+        key="demand_forecast_download",
+    )
+
+    # Recent actuals followed by the forecast for one series
+    series_labels = table['productName'] if level == "Product" else table['productName'] + " @ " + table['storeName']
+    chosen = st.selectbox("Series", series_labels.tolist(), key="demand_forecast_series")
+    row = table.iloc[series_labels.tolist().index(chosen)]
+
+    series_rows = daily_cube['products'] == row['productName']
+    if level != "Product":
+        series_rows &= daily_cube['stores'] == row['storeName']
+    # Every matching row has the chosen product, so they sum to one series
+    series_rows = np.flatnonzero(series_rows)
+    _, totals = cube_group_sums(daily_cube, 'total_quantity', series_rows, daily_cube['products'][series_rows])
+    actuals = totals[0][-HISTORY_SHOWN_DAYS:]
+
+    day_columns = [date.strftime('%Y-%m-%d') for date in forecast_dates]
+    chart_data = pd.concat([
+        pd.DataFrame({'date': daily_cube['dates'][-len(actuals):], 'quantity': actuals, 'kind': 'Actual'}),
+        pd.DataFrame({'date': forecast_dates, 'quantity': row[day_columns].to_numpy(dtype=float), 'kind': 'Forecast'}),
+    ], ignore_index=True)
+
+    fig = px.line(chart_data, x='date', y='quantity', color='kind', markers=True, title=f"Daily quantity: {chosen}")
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,37 @@
+import streamlit as st
+
+# printf-style display formats of result columns (the format st.column_config takes). Result tables stay
+# float64 for sorting, charts and exports; only the rendered cells are formatted, in the browser.
+PERCENT_FORMAT = "%.2f%%"
+AMOUNT_FORMAT = "%.2f"
+
+COLUMN_FORMATS = {
+    'profit_margin': PERCENT_FORMAT,
+    'avg_profit_margin': PERCENT_FORMAT,
+    'sales_contribution': PERCENT_FORMAT,
+    'profit_contribution': PERCENT_FORMAT,
+    'contribution_percentage': PERCENT_FORMAT,
+    'total_selling_price': AMOUNT_FORMAT,
+    'total_cost_price': AMOUNT_FORMAT,
+    'total_sellingPrice': AMOUNT_FORMAT,
+    'total_costPrice': AMOUNT_FORMAT,
+    'total_sales': AMOUNT_FORMAT,
+    'total_cost': AMOUNT_FORMAT,
+    'total_store_sales': AMOUNT_FORMAT,
+    'profit': AMOUNT_FORMAT,
+}
+
+# Format specs of the frame's columns: the defaults above, overridden by `formats`
+def column_formats(frame, formats=None):
+    formats = {**COLUMN_FORMATS, **(formats or {})}
+    return {column: formats[column] for column in frame.columns if column in formats}
+
+def column_config(frame, formats=None):
+    return {column: st.column_config.NumberColumn(format=spec) for column, spec in column_formats(frame, formats).items()}
+
+# Styler.format callables for tables that also need cell styling (Styler output ignores column_config)
+def styler_formats(frame, formats=None):
+    return {column: (lambda value, spec=spec: spec % value) for column, spec in column_formats(frame, formats).items()}
+
+def show_table(frame, formats=None, **kwargs):
+    st.dataframe(frame, column_config=column_config(frame, formats), **kwargs)
@@ -0,0 +1,40 @@
+import plotly.express as px
+import streamlit as st
+from analysis.display import column_config
+from utils.hierarchy import HIERARCHY_LEVELS, hierarchy_totals, level_table
+
+METRICS = {"Sales": "total_sales", "Profit": "profit", "Quantity": "total_quantity"}
+LEVEL_LABELS = {'categoryName': "Category", 'brandName': "Brand", 'productName': "Product"}
+
+# Table of one level; returns the label of the row clicked in it, or None
+def _level_selection(table, level, key):
+    event = st.dataframe(table, column_config=column_config(table), use_container_width=True, hide_index=True,
+                         on_select="rerun", selection_mode="single-row", key=key)
+    rows = event.selection.rows
+    return table[level].iloc[rows[0]] if rows and rows[0] < len(table) else None
+
+def drilldown_analysis(hierarchy_rollup, selected_stores, start_date, end_date):
+    st.markdown("<h1 style='text-align: center; color: green;'>Category Drill-down</h1>", unsafe_allow_html=True)
+    st.caption("Click a category to see its brands, then a brand to see its products. Figures cover the selected stores and dates.")
+
+    totals = hierarchy_totals(hierarchy_rollup, selected_stores, start_date, end_date)
+    metric_label = st.selectbox("Chart metric", list(METRICS), key="drilldown_metric")
+
+    # Walk down the levels while a row is selected; each table's key carries its parents so a new
+    # category starts with no brand selected
+    parents = {}
+    for level in HIERARCHY_LEVELS:
+        table = level_table(totals, level, parents)
+        if table.empty:
+            st.warning("No sales for the selected criteria.")
+            return
+
+        path = " › ".join(parents.values())
+        fig = px.bar(table.head(30), x=level, y=METRICS[metric_label], title=f"{metric_label} by {LEVEL_LABELS[level].lower()}"
+                     + (f": {path}" if path else ""), labels={level: LEVEL_LABELS[level], METRICS[metric_label]: metric_label})
+        st.plotly_chart(fig, use_container_width=True)
+
+        selection = _level_selection(table, level, key="drilldown_" + "_".join([level] + list(parents.values())))
+        if selection is None or level == HIERARCHY_LEVELS[-1]:
+            break
+        parents[level] = selection
@@ -0,0 +1,26 @@
+import os
+import streamlit as st
+from utils.export import EXPORT_FORMATS, export_path, export_chunks
+
+# Exports up to this size are also offered as a browser download
+DOWNLOAD_LIMIT_BYTES = 100 * 1024 * 1024
+
+# Server-side export of one of `sources` ({name: callable returning a frame or an iterable of frame chunks}).
+# The table is written in chunks to the export directory, so nothing is serialized in the browser.
+def export_panel(sources):
+    with st.sidebar.expander("Export"):
+        source = st.selectbox("Table", list(sources), key="export_source")
+        format_label = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+
+        if not st.button("Export", key="export_run"):
+            return
+
+        path = export_path(source, EXPORT_FORMATS[format_label])
+        with st.spinner(f"Writing {os.path.basename(path)}..."):
+            rows = export_chunks(sources[source](), path)
+        size = os.path.getsize(path)
+        st.success(f"Wrote {rows:,} rows ({size / 1024 / 1024:,.1f} MB) to {path}")
+
+        if size <= DOWNLOAD_LIMIT_BYTES:
+            with open(path, 'rb') as handle:
+                st.download_button("Download export", handle, file_name=os.path.basename(path), key="export_download")
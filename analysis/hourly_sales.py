@@ -1,17 +1,20 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from utils.data_loader import row_hours
 
-def hourly_sales_analysis(data, selected_products, selected_stores):
-    st.markdown("<h1 style='text-align: center; color: green;'>Hourly Sales</h1>", unsafe_allow_html=True)
-
-    # Filter data for selected products and stores
-    filtered_data = data[data['productName'].isin(selected_products) & data['storeName'].isin(selected_stores)]
+def compute_hourly_sales(data, selected_products, selected_stores):
+    # Filter data for selected products and stores; only the needed columns of the matching rows are taken
+    mask = data['productName'].isin(selected_products) & data['storeName'].isin(selected_stores)
     
-    # Extract hour from the time column and calculate total selling price and cost price
-    filtered_data['hour'] = filtered_data['time'].apply(lambda x: x.hour if pd.notnull(x) else None)
-    filtered_data['total_selling_price'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_cost_price'] = filtered_data['costPrice'] * filtered_data['quantity']
+    # Take the hour codes of the rows and calculate total selling price and cost price
+    filtered_data = pd.DataFrame({
+        'productName': data['productName'][mask],
+        'hour': row_hours(data)[mask],
+        'total_selling_price': (data['sellingPrice'] * data['quantity'])[mask],
+        'total_cost_price': (data['costPrice'] * data['quantity'])[mask],
+        'quantity': data['quantity'][mask],
+    })
     
     hourly_sales = filtered_data.groupby(['productName', 'hour']).agg(
         total_selling_price=('total_selling_price', 'sum'),
@@ -28,6 +31,31 @@ def hourly_sales_analysis(data, selected_products, selected_stores):
         fill_value=0
     ).reset_index()
 
+    # Aggregated hourly sales data (with 24 columns for each hour)
+    total_hourly_sales = filtered_data.groupby('hour').agg(
+        total_selling_price=('total_selling_price', 'sum'),
+        total_cost_price=('total_cost_price', 'sum'),
+        quantity=('quantity', 'sum')
+    ).reset_index()
+
+    return hourly_sales_pivot, total_hourly_sales
+
+# The tables of a sidebar selection (start_date, end_date, stores, products), cached in the dataset's FilterCache;
+# callers get shallow copies (copy-on-write)
+def selection_hourly_sales(filter_cache, selection):
+    _, _, stores, products = selection
+    tables = filter_cache.derived('hourly_sales', *selection, lambda rows: compute_hourly_sales(rows, products, stores))
+    return tuple(table.copy(deep=False) for table in tables)
+
+# `data` is the by_product slice of `selection` in filter_cache; without a filter cache the tables are not cached
+def hourly_sales_analysis(data, selected_products, selected_stores, filter_cache=None, selection=None):
+    st.markdown("<h1 style='text-align: center; color: green;'>Hourly Sales</h1>", unsafe_allow_html=True)
+
+    if filter_cache is None:
+        hourly_sales_pivot, total_hourly_sales = compute_hourly_sales(data, selected_products, selected_stores)
+    else:
+        hourly_sales_pivot, total_hourly_sales = selection_hourly_sales(filter_cache, selection)
+
     # Display the pivoted data (product-wise hourly sales)
     st.dataframe(hourly_sales_pivot)
 
@@ -78,13 +106,6 @@ def hourly_sales_analysis(data, selected_products, selected_stores):
     # Aggregated Hourly Sales Analysis (with 24 columns for total sales)
     st.subheader("Total Hourly Sales")
 
-    # Aggregated hourly sales data (with 24 columns for each hour)
-    total_hourly_sales = filtered_data.groupby('hour').agg(
-        total_selling_price=('total_selling_price', 'sum'),
-        total_cost_price=('total_cost_price', 'sum'),
-        quantity=('quantity', 'sum')
-    ).reset_index()
-
     # Display aggregated data table (with 24 columns representing each hour)
     st.dataframe(total_hourly_sales)
 
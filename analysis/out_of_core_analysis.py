@@ -0,0 +1,67 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from analysis.display import show_table
+from analysis.plugins import analysis_function, is_enabled
+
+# Products passed to the row-level analyses, by sales
+DEFAULT_TOP_PRODUCTS = 250
+
+# Totals per `by` columns of the selection, aggregated partition by partition (spilling to disk over budget).
+# The store directory identifies the dataset in the cache key.
+@st.cache_data(max_entries=8, show_spinner="Aggregating partitions...")
+def compute_partition_totals(_partitioned_store, directory, by, start_date, end_date, stores):
+    totals = _partitioned_store.aggregate(by, start_date, end_date, stores)
+    totals['profit'] = totals['total_sales'] - totals['total_cost']
+    return totals.sort_values(by=list(by) if 'orderDate' in by else 'total_sales', ascending='orderDate' in by, ignore_index=True)
+
+def out_of_core_analysis(partitioned_store):
+    manifest = partitioned_store.manifest
+    st.info(f"This file is larger than the {partitioned_store.budget / 1024 ** 2:,.0f} MB memory budget, so its "
+            f"{manifest['rows']:,} rows are stored on disk in {len(manifest['partitions']):,} month x store partitions. "
+            "Totals are aggregated one partition at a time; row-level analyses load only the partitions the selection touches.")
+
+    first_month, last_month = partitioned_store.date_range
+    if first_month is None:
+        st.warning("The file has no dated rows.")
+        return
+    min_date = pd.Timestamp(first_month)
+    max_date = pd.Timestamp(last_month) + pd.offsets.MonthEnd(0)
+
+    with st.sidebar:
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = pd.to_datetime(st.date_input("Start Date", min_date, key="partitioned_start"))
+        with col2:
+            end_date = pd.to_datetime(st.date_input("End Date", max_date, key="partitioned_end"))
+        selected_stores = st.multiselect("Select stores for analysis", partitioned_store.stores, key="partitioned_stores")
+    stores = tuple(selected_stores or partitioned_store.stores)
+
+    def totals(by):
+        return compute_partition_totals(partitioned_store, partitioned_store.directory, by, start_date, end_date, stores)
+
+    store_totals = totals(('storeName',))
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Sales", f"₹{store_totals['total_sales'].sum():,.2f}")
+    col2.metric("Total Profit", f"₹{store_totals['profit'].sum():,.2f}")
+    col3.metric("Total Quantity Sold", f"{store_totals['total_quantity'].sum():,.0f}")
+
+    daily_totals = totals(('orderDate',))
+    st.plotly_chart(px.line(daily_totals, x='orderDate', y='total_sales', title="Daily Sales"), use_container_width=True)
+    st.plotly_chart(px.bar(store_totals, x='storeName', y='total_sales', title="Sales by Store"), use_container_width=True)
+
+    product_totals = totals(('productName',))
+    st.markdown("<h4 style='text-align: center; color: green;'>Products by sales</h4>", unsafe_allow_html=True)
+    show_table(product_totals, use_container_width=True, hide_index=True)
+
+    # Row-level analyses on the selected partitions, when they fit in the budget
+    try:
+        rows = partitioned_store.load(start_date, end_date, stores)
+    except MemoryError as e:
+        st.warning(f"{e}. Showing totals only.")
+        return
+    top_products = product_totals['productName'].head(DEFAULT_TOP_PRODUCTS).tolist()
+    if is_enabled('product_performance'):
+        analysis_function('product_performance')(rows, top_products, list(stores))
+    if is_enabled('daily_sales'):
+        analysis_function('daily_sales')(rows, top_products, list(stores))
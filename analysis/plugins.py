@@ -0,0 +1,148 @@
+import importlib
+from utils.schema import COLUMN_KINDS, REQUIRED_COLUMNS
+
+# Analyses the dashboard can render: the module holding the renderer (imported on first use), the renderer's
+# name, and the canonical columns it reads. Disabled analyses are neither imported nor loaded for.
+ANALYSIS_PLUGINS = {
+    'product_performance': {
+        'module': 'analysis.product_performance_analysis',
+        'render': 'product_performance_analysis',
+        'columns': ['productName', 'storeName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'weekly_sales': {
+        'module': 'analysis.weekly_sales',
+        'render': 'weekly_sales_analysis',
+        'columns': ['orderDate', 'productName', 'brandName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'daily_sales': {
+        'module': 'analysis.daily_sales_analysis',
+        'render': 'daily_sales_analysis',
+        'columns': ['orderDate', 'productName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'store_performance': {
+        'module': 'analysis.store_performance_analysis',
+        'render': 'store_performance_analysis',
+        'columns': ['storeName', 'productName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'sales_trends': {
+        'module': 'analysis.sales_trends',
+        'render': 'sales_trends_analysis',
+        'columns': ['orderDate', 'productName', 'storeName', 'sellingPrice', 'quantity'],
+        'enabled': True,
+    },
+    'anomalies': {
+        'module': 'analysis.anomaly_analysis',
+        'render': 'anomaly_analysis',
+        'columns': ['orderDate', 'productName', 'storeName', 'sellingPrice', 'quantity'],
+        'enabled': True,
+    },
+    'demand_forecast': {
+        'module': 'analysis.demand_forecast',
+        'render': 'demand_forecast_analysis',
+        'columns': ['orderDate', 'productName', 'storeName', 'quantity'],
+        'enabled': True,
+    },
+    'abc_xyz': {
+        'module': 'analysis.abc_xyz_analysis',
+        'render': 'abc_xyz_analysis',
+        'columns': ['orderDate', 'productName', 'storeName', 'sellingPrice', 'quantity'],
+        'enabled': True,
+    },
+    'hourly_sales': {
+        'module': 'analysis.hourly_sales',
+        'render': 'hourly_sales_analysis',
+        'columns': ['time', 'productName', 'storeName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'weekday_hour': {
+        'module': 'analysis.weekday_hour_analysis',
+        'render': 'weekday_hour_analysis',
+        'columns': ['orderDate', 'time', 'storeName', 'productName', 'sellingPrice', 'quantity'],
+        'enabled': True,
+    },
+    'baskets': {
+        'module': 'analysis.basket_analysis',
+        'render': 'basket_analysis',
+        'columns': ['invoice', 'orderDate', 'time', 'storeName', 'productName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'price_elasticity': {
+        'module': 'analysis.price_elasticity_analysis',
+        'render': 'price_elasticity_analysis',
+        'columns': ['orderDate', 'productName', 'storeName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'profit_margin': {
+        'module': 'analysis.profit_margin_analysis',
+        'render': 'profit_margin_analysis',
+        'columns': ['productName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'affinity': {
+        'module': 'analysis.affinity_analysis',
+        'render': 'affinity_analysis',
+        'columns': ['invoice', 'productId', 'productName', 'time'],
+        'enabled': True,
+    },
+    'association_rules': {
+        'module': 'analysis.association_rules',
+        'render': 'association_rules_analysis',
+        'columns': ['invoice', 'productId', 'productName', 'time'],
+        'enabled': True,
+    },
+    'drilldown': {
+        'module': 'analysis.drilldown_analysis',
+        'render': 'drilldown_analysis',
+        'columns': ['orderDate', 'storeName', 'categoryName', 'brandName', 'productName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': True,
+    },
+    'category_breakdown': {
+        'module': 'analysis.category_breakdown',
+        'render': 'category_breakdown_analysis',
+        'columns': ['brandName', 'categoryName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': False,
+    },
+    'top_products': {
+        'module': 'analysis.top_products',
+        'render': 'top_products_analysis',
+        'columns': ['categoryName', 'brandName', 'productId', 'productName', 'sellingPrice', 'costPrice', 'quantity'],
+        'enabled': False,
+    },
+    'category_comparison': {
+        'module': 'analysis.category_comparison',
+        'render': 'category_comparison_analysis',
+        'columns': ['categoryName', 'sellingPrice'],
+        'enabled': False,
+    },
+}
+
+def register_analysis(name, module, render, columns, enabled=True):
+    unknown = set(columns) - set(COLUMN_KINDS)
+    if unknown:
+        raise ValueError(f"Analysis '{name}' reads unknown columns: {sorted(unknown)}")
+    ANALYSIS_PLUGINS[name] = {'module': module, 'render': render, 'columns': list(columns), 'enabled': enabled}
+
+def enabled_analyses():
+    return [name for name, plugin in ANALYSIS_PLUGINS.items() if plugin['enabled']]
+
+def is_enabled(name):
+    return name in ANALYSIS_PLUGINS and ANALYSIS_PLUGINS[name]['enabled']
+
+# The analysis' renderer, or another function of its module, importing the module on first use
+def analysis_function(name, function=None):
+    plugin = ANALYSIS_PLUGINS[name]
+    module = importlib.import_module(plugin['module'])
+    return getattr(module, function or plugin['render'])
+
+# Canonical columns to load: the required ones plus every column the given analyses (default: the enabled
+# ones) or `extra` read, in schema order
+def required_columns(names=None, extra=()):
+    names = enabled_analyses() if names is None else names
+    needed = set(REQUIRED_COLUMNS) | set(extra)
+    for name in names:
+        needed.update(ANALYSIS_PLUGINS[name]['columns'])
+    return [column for column in COLUMN_KINDS if column in needed]
@@ -0,0 +1,38 @@
+import numpy as np
+import plotly.express as px
+import streamlit as st
+from utils.elasticity import RECENT_DAYS
+
+def price_elasticity_analysis(price_points, price_response, selected_products):
+    st.markdown("<h1 style='text-align: center; color: green;'>Price Elasticity</h1>", unsafe_allow_html=True)
+    st.caption("Log-log fit of daily quantity on selling price per product, within each store. "
+               "An elasticity of -1.5 means a 10% price cut sells about 15% more units.")
+
+    elasticities = price_response['elasticity']
+    elasticities = elasticities[elasticities['productName'].isin(selected_products)]
+    fitted = elasticities.dropna(subset=['elasticity'])
+    if fitted.empty:
+        st.info("None of the selected products has enough price variation to estimate an elasticity.")
+    else:
+        fig = px.histogram(fitted, x='elasticity', nbins=40, title="Elasticity of the selected products")
+        st.plotly_chart(fig, use_container_width=True)
+
+        product = st.selectbox("Product", fitted.sort_values(by='price_points', ascending=False)['productName'], key="elasticity_product")
+        points = price_points[price_points['productName'] == product]
+        fig = px.scatter(points.assign(log_price=np.log(points['price']), log_quantity=np.log(points['quantity'])),
+                         x='log_price', y='log_quantity', color='storeName', opacity=0.6,
+                         title=f"{product}: daily quantity against price (log-log)")
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(elasticities.sort_values(by='elasticity'), use_container_width=True, hide_index=True)
+
+    # Recent repricing that cost margin
+    changes = price_response['margin_changes']
+    if changes.empty:
+        return
+    cuts = changes[changes['margin_cut'] & changes['productName'].isin(selected_products)]
+    st.subheader(f"Price changes that cut margin (last {RECENT_DAYS} days against the {RECENT_DAYS} before)")
+    if cuts.empty:
+        st.success("No selected product lost margin after a price change.")
+    else:
+        st.dataframe(cuts.drop(columns='margin_cut'), use_container_width=True, hide_index=True)
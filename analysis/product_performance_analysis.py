@@ -1,48 +1,89 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from analysis.display import show_table
+from utils.approximate import estimate_totals
 
-def product_performance_analysis(filtered_data, selected_products, selected_stores):
-    st.markdown("<h1 style='text-align: center; color: blue;'>Product Performance Analysis</h1>", unsafe_allow_html=True)
-
-    # Calculate total selling and cost prices for the filtered data
-    filtered_data['total_selling_price'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_cost_price'] = filtered_data['costPrice'] * filtered_data['quantity']
+# With approximate=True, filtered_data is a stratified sample and totals carry *_ci interval columns
+def compute_product_performance(filtered_data, selected_products, selected_stores, approximate=False):
+    # Calculate total selling and cost prices for the filtered data (input is treated as read-only)
+    total_selling_price = filtered_data['sellingPrice'] * filtered_data['quantity']
+    total_cost_price = filtered_data['costPrice'] * filtered_data['quantity']
 
     # Calculate overall total sales and profit based on the filtered data
-    overall_total_selling_price = filtered_data['total_selling_price'].sum()
-    overall_total_cost_price = filtered_data['total_cost_price'].sum()
+    if approximate:
+        overall = estimate_totals(filtered_data, [], {
+            'total_selling_price': total_selling_price,
+            'total_cost_price': total_cost_price,
+        })
+        overall_total_selling_price = overall['total_selling_price'].iloc[0]
+        overall_total_cost_price = overall['total_cost_price'].iloc[0]
+    else:
+        overall_total_selling_price = total_selling_price.sum()
+        overall_total_cost_price = total_cost_price.sum()
     overall_profit = overall_total_selling_price - overall_total_cost_price
 
     # Filter data for selected products and stores
-    filtered_data = filtered_data[filtered_data['productName'].isin(selected_products) & filtered_data['storeName'].isin(selected_stores)]
+    mask = filtered_data['productName'].isin(selected_products) & filtered_data['storeName'].isin(selected_stores)
 
     # Aggregate the data based on each unique productName and storeName
-    aggregated_data = (
-        filtered_data.groupby(['productName', 'storeName'], as_index=False)
-        .agg(
-            total_selling_price=('total_selling_price', 'sum'),
-            total_cost_price=('total_cost_price', 'sum'),
-            total_quantity=('quantity', 'sum'),
-            store_count=('storeName', 'nunique')
+    if approximate:
+        aggregated_data = estimate_totals(filtered_data[mask], ['productName', 'storeName'], {
+            'total_selling_price': total_selling_price[mask],
+            'total_cost_price': total_cost_price[mask],
+            'total_quantity': filtered_data['quantity'][mask],
+            'profit': (total_selling_price - total_cost_price)[mask],
+        }).assign(store_count=1).sort_values(by='total_selling_price', ascending=False)
+    else:
+        lines = pd.DataFrame({
+            'productName': filtered_data['productName'],
+            'storeName': filtered_data['storeName'],
+            'total_selling_price': total_selling_price,
+            'total_cost_price': total_cost_price,
+            'quantity': filtered_data['quantity'],
+        })[mask]
+        aggregated_data = (
+            lines.groupby(['productName', 'storeName'], as_index=False)
+            .agg(
+                total_selling_price=('total_selling_price', 'sum'),
+                total_cost_price=('total_cost_price', 'sum'),
+                total_quantity=('quantity', 'sum'),
+                store_count=('storeName', 'nunique')
+            )
+            .sort_values(by='total_selling_price', ascending=False)
         )
-        .sort_values(by='total_selling_price', ascending=False)
-    )
 
     # Calculate profit and add it to the aggregated data
     aggregated_data['profit'] = aggregated_data['total_selling_price'] - aggregated_data['total_cost_price']
 
-    # Calculate profit margin and format it as a percentage
+    # Calculate profit margin as a percentage (formatted only when displayed)
     aggregated_data['profit_margin'] = (aggregated_data['profit'] / aggregated_data['total_selling_price']) * 100
-    aggregated_data['profit_margin'] = aggregated_data['profit_margin'].apply(lambda x: f"{x:.2f}%")
 
     # Calculate contribution percentages based on overall totals
     aggregated_data['sales_contribution'] = (aggregated_data['total_selling_price'] / overall_total_selling_price) * 100
     aggregated_data['profit_contribution'] = (aggregated_data['profit'] / overall_profit) * 100
 
-    # Format contribution percentages for better readability
-    aggregated_data['sales_contribution'] = aggregated_data['sales_contribution'].apply(lambda x: f"{x:.2f}%")
-    aggregated_data['profit_contribution'] = aggregated_data['profit_contribution'].apply(lambda x: f"{x:.2f}%")
+    return aggregated_data
+
+# The exact table of a sidebar selection (start_date, end_date, stores, products), cached in the dataset's
+# FilterCache; callers get a shallow copy (copy-on-write)
+def selection_product_performance(filter_cache, selection):
+    _, _, stores, products = selection
+    return filter_cache.derived('product_performance', *selection,
+                                lambda rows: compute_product_performance(rows, products, stores)).copy(deep=False)
+
+# `filtered_data` is the by_product slice of `selection` in filter_cache (or a sample of it with approximate=True);
+# only exact tables are cached, and only with a filter cache
+def product_performance_analysis(filtered_data, selected_products, selected_stores, approximate=False, filter_cache=None, selection=None):
+    st.markdown("<h1 style='text-align: center; color: blue;'>Product Performance Analysis</h1>", unsafe_allow_html=True)
+
+    if approximate:
+        st.caption("Approximate mode: figures are estimated from a stratified sample; *_ci columns give the ±95% interval.")
+
+    if filter_cache is None or approximate:
+        aggregated_data = compute_product_performance(filtered_data, selected_products, selected_stores, approximate)
+    else:
+        aggregated_data = selection_product_performance(filter_cache, selection)
 
     # Chart options for customization in the sidebar
     chart_type = st.sidebar.selectbox("Select Chart Type", ["Bar Chart", "Line Chart", "Area Chart"], key="chart_type_selector")
@@ -97,4 +138,4 @@ def product_performance_analysis(filtered_data, selected_products, selected_stor
     st.markdown("<h4 style='text-align: center; color: blue;'>Selected Product and Store Dataframe</h4>", unsafe_allow_html=True)
 
     # Display the aggregated data with contribution percentages
-    st.write(aggregated_data)
+    show_table(aggregated_data)
@@ -1,31 +1,29 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from analysis.display import show_table
 
-def profit_margin_analysis(data, selected_products):
-    st.markdown("<h1 style='text-align: center; color: green;'>Profit Analysis by Product</h1>", unsafe_allow_html=True)
-
-    # Filter data for selected products
-    filtered_data = data[data['productName'].isin(selected_products)]
-
-    # Ensure sellingPrice, costPrice, and quantity are numeric
-    filtered_data['sellingPrice'] = pd.to_numeric(filtered_data['sellingPrice'], errors='coerce')
-    filtered_data['costPrice'] = pd.to_numeric(filtered_data['costPrice'], errors='coerce')
-    filtered_data['quantity'] = pd.to_numeric(filtered_data['quantity'], errors='coerce')
+# Totals and margins per selected product
+def compute_profit_margin(data, selected_products):
+    # Filter data for selected products; input is treated as read-only
+    mask = data['productName'].isin(selected_products)
+    product_names = data['productName'][mask]
 
-    # Calculate total selling price and total cost price by multiplying by quantity
-    filtered_data['total_sellingPrice'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_costPrice'] = filtered_data['costPrice'] * filtered_data['quantity']
+    # sellingPrice, costPrice and quantity are validated as numeric at load time
+    selling_price = data['sellingPrice'][mask]
+    cost_price = data['costPrice'][mask]
+    quantity = data['quantity'][mask]
 
     # Calculate profit margin per product (unit-based, without multiplying by quantity)
-    filtered_data['profit_margin'] = ((filtered_data['sellingPrice'] - filtered_data['costPrice']) / 
-                                       filtered_data['sellingPrice']) * 100
-
-    # Round profit margin and add percentage symbol
-    filtered_data['profit_margin'] = filtered_data['profit_margin'].round(2).astype(str) + '%'
-
-    # Group by productName and sum the total sellingPrice and total costPrice
-    product_grouped = (filtered_data.groupby('productName')
+    unit_profit_margin = ((selling_price - cost_price) / selling_price) * 100
+
+    # Group by productName and sum the total sellingPrice and total costPrice (price multiplied by quantity)
+    product_grouped = (pd.DataFrame({
+                           'productName': product_names,
+                           'total_sellingPrice': selling_price * quantity,
+                           'total_costPrice': cost_price * quantity,
+                       })
+                       .groupby('productName')
                        .agg({'total_sellingPrice': 'sum', 'total_costPrice': 'sum'})
                        .reset_index())
 
@@ -33,14 +31,28 @@ def profit_margin_analysis(data, selected_products):
     product_grouped['avg_profit_margin'] = ((product_grouped['total_sellingPrice'] - product_grouped['total_costPrice']) / 
                                              product_grouped['total_sellingPrice']) * 100
 
-    # Round avg_profit_margin and add percentage symbol
-    product_grouped['avg_profit_margin'] = product_grouped['avg_profit_margin'].round(2).astype(str) + '%'
+    # For each product, add the profit margin (calculated per unit) of its first line
+    product_grouped['profit_margin'] = product_grouped['productName'].map(unit_profit_margin.groupby(product_names).first())
+
+    return product_grouped
+
+# The table of a sidebar selection (start_date, end_date, stores, products), cached in the dataset's FilterCache;
+# callers get a shallow copy (copy-on-write)
+def selection_profit_margin(filter_cache, selection):
+    products = selection[3]
+    return filter_cache.derived('profit_margin', *selection, lambda rows: compute_profit_margin(rows, products)).copy(deep=False)
+
+# `data` is the by_product slice of `selection` in filter_cache; without a filter cache the table is not cached
+def profit_margin_analysis(data, selected_products, filter_cache=None, selection=None):
+    st.markdown("<h1 style='text-align: center; color: green;'>Profit Analysis by Product</h1>", unsafe_allow_html=True)
 
-    # For each product, add the profit margin (calculated per unit) by merging the unique profit margin per product
-    product_grouped['profit_margin'] = filtered_data.drop_duplicates(subset='productName')['profit_margin'].values
+    if filter_cache is None:
+        product_grouped = compute_profit_margin(data, selected_products)
+    else:
+        product_grouped = selection_profit_margin(filter_cache, selection)
 
     # Display data table with all required features, including total_sellingPrice, total_costPrice, and profit_margin
-    st.dataframe(product_grouped)
+    show_table(product_grouped)
 
     # Sidebar options for chart customization
     st.sidebar.subheader("Profit Margin Chart Settings")
@@ -58,7 +70,7 @@ def profit_margin_analysis(data, selected_products):
         
         # Add data labels if checkbox is selected
         if show_data_labels:
-            fig.update_traces(text=product_grouped['avg_profit_margin'], textposition="inside")
+            fig.update_traces(texttemplate="%{y:.2f}%", textposition="inside")
             
     elif chart_type == "Scatter Plot":
         fig = px.scatter(product_grouped, x='productName', y='avg_profit_margin', title="Profit Margin by Product",
@@ -66,6 +78,6 @@ def profit_margin_analysis(data, selected_products):
 
         # Add data labels if checkbox is selected
         if show_data_labels:
-            fig.update_traces(text=product_grouped['avg_profit_margin'], textposition="top center")
+            fig.update_traces(texttemplate="%{y:.2f}%", textposition="top center")
 
     st.plotly_chart(fig, use_container_width=True)
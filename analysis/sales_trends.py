@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from utils.time_series import select_series, series_metrics, metrics_frame
+
+METRICS = {"Sales": "total_sales", "Quantity": "total_quantity"}
+
+VIEWS = {
+    "Daily": "daily",
+    "7-day rolling": "rolling_7",
+    "28-day rolling": "rolling_28",
+    "Cumulative": "cumulative",
+}
+
+# Per-series summary over the selected range: totals, trailing 7/28-day sums at the end date and
+# the same period one year earlier
+def compute_trend_summary(labels, metrics):
+    if metrics['daily'].shape[1] == 0:
+        return labels.assign(total=0.0, last_7_days=0.0, last_28_days=0.0, last_year_total=np.nan, yoy_change=np.nan)
+
+    total = metrics['cumulative'][:, -1]
+    last_year_total = metrics['last_year_cumulative'][:, -1]
+    # Without any last-year day in range there is nothing to compare against
+    has_last_year = ~np.isnan(metrics['last_year']).all(axis=1)
+    last_year_total = np.where(has_last_year, last_year_total, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yoy_change = np.where(last_year_total > 0, (total - last_year_total) / last_year_total * 100, np.nan)
+
+    return labels.assign(
+        total=total,
+        last_7_days=metrics['rolling_7'][:, -1],
+        last_28_days=metrics['rolling_28'][:, -1],
+        last_year_total=last_year_total,
+        yoy_change=yoy_change,
+    ).sort_values(by='total', ascending=False)
+
+def sales_trends_analysis(daily_cube, selected_products, selected_stores, start_date, end_date):
+    st.markdown("<h1 style='text-align: center; color: green;'>Sales Trends</h1>", unsafe_allow_html=True)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        metric_label = st.selectbox("Metric", list(METRICS), key="sales_trends_metric")
+    with col2:
+        view_label = st.selectbox("View", list(VIEWS), key="sales_trends_view")
+    with col3:
+        level = st.selectbox("Series", ["Product", "Product and store"], key="sales_trends_level")
+    with col4:
+        top_n = st.number_input("Series to chart", min_value=1, max_value=50, value=10, step=1, key="sales_trends_top_n")
+
+    rows = select_series(daily_cube, selected_products, selected_stores)
+    labels, dates, metrics = series_metrics(
+        daily_cube, METRICS[metric_label], rows, "product" if level == "Product" else "product_store", start_date, end_date
+    )
+
+    if len(labels) == 0 or len(dates) == 0:
+        st.warning("No sales in the selected range for the selected products and stores.")
+        return
+
+    summary = compute_trend_summary(labels, metrics)
+    charted = summary.index[:int(top_n)].to_numpy()
+
+    view = VIEWS[view_label]
+    chart_data = metrics_frame(labels, dates, metrics, rows=charted, names=[view])
+    if level != "Product":
+        chart_data['series'] = chart_data['productName'] + " @ " + chart_data['storeName']
+    else:
+        chart_data['series'] = chart_data['productName']
+
+    fig = px.line(chart_data, x='orderDate', y=view, color='series',
+                  title=f"{metric_label}: {view_label.lower()} (top {len(charted)} series)",
+                  labels={view: metric_label, 'orderDate': 'Date'})
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Same days one year earlier, summed over the charted series
+    comparison = pd.DataFrame({
+        'orderDate': dates,
+        'This year': metrics['daily'][charted].sum(axis=0),
+        'Same day last year': np.nansum(metrics['last_year'][charted], axis=0),
+    }).melt(id_vars='orderDate', var_name='period', value_name=metric_label)
+    fig_yoy = px.line(comparison, x='orderDate', y=metric_label, color='period',
+                      title="Charted series against the same calendar day last year")
+    st.plotly_chart(fig_yoy, use_container_width=True)
+
+    st.dataframe(summary, use_container_width=True, hide_index=True)
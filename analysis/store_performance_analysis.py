@@ -1,35 +1,52 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from analysis.display import styler_formats
+from utils.approximate import estimate_totals
+from utils.schema import clean_text
+from utils.store_similarity import SIMILARITY_BASES, DEFAULT_STORE_CLUSTERS, compute_store_clusters
 
 # Load the GPS coordinates from the CSV file
 def load_coordinates(file_path="gps_co_ordinates/co_ordinates.csv"):
     gps_df = pd.read_csv(file_path)
+    # Store names are trimmed at load time (utils.schema.clean_text); trim the join key the same way
+    gps_df['storeName'] = clean_text(gps_df['storeName'])
     return gps_df[['storeName', 'latitude', 'longitude']]
 
-def store_performance_analysis(data, date_filtered_data, selected_products, selected_stores):
-    st.markdown("<h1 style='text-align: center; color: green;'>Stores Performance</h1>", unsafe_allow_html=True)
-
+# With approximate=True, both frames are stratified samples and totals carry *_ci interval columns;
+# distinct_counts (per-store HyperLogLog estimates) is merged in when given
+def compute_store_performance(data, date_filtered_data, selected_products, selected_stores, approximate=False, distinct_counts=None):
     # Calculate sales for all products by store (using entire data, not just filtered data)
-    all_products_store_sales = date_filtered_data.groupby('storeName').agg(
-        total_store_sales=('sellingPrice', lambda x: (x * date_filtered_data.loc[x.index, 'quantity']).sum())
-    ).reset_index()
-
-    # Filter data for selected products (formerly categories)
-    filtered_data = data[data['productName'].isin(selected_products)]  # Change categoryName to productName
-    filtered_data['total_selling_price'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_cost_price'] = filtered_data['costPrice'] * filtered_data['quantity']
-    filtered_data['profit'] = filtered_data['total_selling_price'] - filtered_data['total_cost_price']
+    store_line_sales = date_filtered_data['sellingPrice'] * date_filtered_data['quantity']
+    if approximate:
+        all_products_store_sales = estimate_totals(date_filtered_data, ['storeName'], {
+            'total_store_sales': store_line_sales
+        })[['storeName', 'total_store_sales']]
+    else:
+        all_products_store_sales = (
+            store_line_sales.groupby(date_filtered_data['storeName']).sum()
+            .rename('total_store_sales').reset_index()
+        )
 
-    # Filter data for selected stores
-    filtered_data = filtered_data[filtered_data['storeName'].isin(selected_stores)]
+    # Filter data for selected products (formerly categories) and selected stores; input is treated as read-only
+    mask = data['productName'].isin(selected_products) & data['storeName'].isin(selected_stores)
+    total_selling_price = (data['sellingPrice'] * data['quantity'])[mask]
+    profit = total_selling_price - (data['costPrice'] * data['quantity'])[mask]
 
     # Aggregate data by storeName for filtered data
-    store_performance = filtered_data.groupby('storeName').agg(
-        total_selling_price=('total_selling_price', 'sum'),
-        total_quantity=('quantity', 'sum'),
-        profit=('profit', 'sum'),
-    ).reset_index()
+    if approximate:
+        store_performance = estimate_totals(data[mask], ['storeName'], {
+            'total_selling_price': total_selling_price,
+            'total_quantity': data['quantity'][mask],
+            'profit': profit,
+        })
+    else:
+        store_performance = pd.DataFrame({
+            'storeName': data['storeName'][mask],
+            'total_selling_price': total_selling_price,
+            'total_quantity': data['quantity'][mask],
+            'profit': profit,
+        }).groupby('storeName', as_index=False).sum()
 
     # Sort the DataFrame by total_selling_price in descending order
     store_performance = store_performance.sort_values(by='total_selling_price', ascending=False)
@@ -37,22 +54,62 @@ def store_performance_analysis(data, date_filtered_data, selected_products, sele
     # Merge with all_products_store_sales to get total store sales (from the entire dataset, not just filtered products)
     store_performance = store_performance.merge(all_products_store_sales, on='storeName', how='left')
 
-    # Ensure the relevant columns are numeric
-    store_performance['total_selling_price'] = pd.to_numeric(store_performance['total_selling_price'], errors='coerce')
-    store_performance['total_store_sales'] = pd.to_numeric(store_performance['total_store_sales'], errors='coerce')
-
     # Calculate the contribution percentage of total_selling_price to total_store_sales
     store_performance['contribution_percentage'] = (
         (store_performance['total_selling_price'] / store_performance['total_store_sales']) * 100
     )
 
-    # Format contribution_percentage for better readability (2 decimals)
-    store_performance['contribution_percentage'] = store_performance['contribution_percentage'].apply(lambda x: f"{x:.2f}%")
-
-    # Format profit contribution for better readability
+    # Profit contribution of each store (percentages are formatted only when displayed)
     overall_profit = store_performance['profit'].sum()
     store_performance['profit_contribution'] = (store_performance['profit'] / overall_profit) * 100
-    store_performance['profit_contribution'] = store_performance['profit_contribution'].apply(lambda x: f"{x:.2f}%")
+
+    if distinct_counts is not None:
+        store_performance = store_performance.merge(distinct_counts, on='storeName', how='left')
+
+    return store_performance
+
+# Store clusters by assortment or sales mix, from the dataset's sparse store x product matrix
+def store_similarity_section(store_matrix):
+    st.markdown("<h3 style='text-align: center; color: blue;'>Store Similarity</h3>", unsafe_allow_html=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        basis = st.selectbox("Compare stores by", SIMILARITY_BASES, format_func=lambda name: name.replace('_', ' ').capitalize(),
+                             key="store_similarity_basis")
+    with col2:
+        n_clusters = st.number_input("Store clusters", min_value=1, max_value=max(1, len(store_matrix['stores'])),
+                                     value=min(DEFAULT_STORE_CLUSTERS, max(1, len(store_matrix['stores']))), step=1,
+                                     key="store_similarity_clusters")
+
+    store_clusters, similarity = compute_store_clusters(store_matrix, int(n_clusters), basis)
+    st.caption("Cosine similarity of the stores' product revenue (sales mix) or of the products they sell (assortment), "
+               "over the whole dataset; stores are grouped by average-linkage clustering.")
+    fig = px.imshow(similarity, zmin=0, zmax=1, color_continuous_scale='Greens', title="Store-to-store cosine similarity")
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(store_clusters.sort_values(by=['cluster', 'storeName']), use_container_width=True, hide_index=True)
+    return store_clusters
+
+# The exact table of a sidebar selection (start_date, end_date, stores, products), from the dataset and its date
+# slice in the dataset's FilterCache, cached there; callers get a shallow copy (copy-on-write)
+def selection_store_performance(filter_cache, selection):
+    start_date, end_date, stores, products = selection
+    return filter_cache.derived('store_performance', *selection, lambda rows: compute_store_performance(
+        filter_cache.data, filter_cache.by_date(start_date, end_date), products, stores)).copy(deep=False)
+
+# `data` is the dataset of filter_cache and `date_filtered_data` its date slice of `selection` (or samples of both
+# with approximate=True); only exact tables are cached, and only with a filter cache
+def store_performance_analysis(data, date_filtered_data, selected_products, selected_stores, approximate=False, distinct_counts=None,
+                               store_matrix=None, filter_cache=None, selection=None):
+    st.markdown("<h1 style='text-align: center; color: green;'>Stores Performance</h1>", unsafe_allow_html=True)
+
+    if approximate:
+        st.caption("Approximate mode: figures are estimated from a stratified sample; *_ci columns give the ±95% interval. "
+                   "Distinct invoice and product counts are HyperLogLog estimates.")
+
+    if filter_cache is None or approximate:
+        store_performance = compute_store_performance(data, date_filtered_data, selected_products, selected_stores, approximate, distinct_counts)
+    else:
+        store_performance = selection_store_performance(filter_cache, selection)
 
     # Sidebar options for chart customization
     st.sidebar.subheader("Store Performance Chart Settings")
@@ -104,34 +161,16 @@ def store_performance_analysis(data, date_filtered_data, selected_products, sele
 
     st.markdown("<h4 style='text-align: center; color: green;'>Store performance dataframe</h4>", unsafe_allow_html=True)
 
-    # Conditional formatting for negative and positive sales_difference_percentage
+    # Conditional formatting for negative and positive contribution_percentage
     def format_contribution_percentage(val):
-        if isinstance(val, str) and val.endswith('%'):
-            percentage = float(val[:-1])
-            if percentage < 0:
-                return 'color: red'
-            else:
-                return 'color: green'
-        return ''
-
-    # Ensure numeric columns are correctly formatted (convert to numeric if necessary)
-    store_performance['total_selling_price'] = pd.to_numeric(store_performance['total_selling_price'], errors='coerce')
-    store_performance['profit'] = pd.to_numeric(store_performance['profit'], errors='coerce')
-    store_performance['total_store_sales'] = pd.to_numeric(store_performance['total_store_sales'], errors='coerce')
+        if pd.isna(val):
+            return ''
+        return 'color: red' if val < 0 else 'color: green'
 
-    # Round the relevant columns to 2 decimal places
-    store_performance['total_selling_price'] = store_performance['total_selling_price'].round(2)
-    store_performance['profit'] = store_performance['profit'].round(2)
-    store_performance['total_store_sales'] = store_performance['total_store_sales'].round(2)
-
-    # Apply formatting to these columns (keeping them numeric)
-    store_performance['total_selling_price'] = store_performance['total_selling_price'].apply(lambda x: f"{x:.2f}")
-    store_performance['profit'] = store_performance['profit'].apply(lambda x: f"{x:.2f}")
-    store_performance['total_store_sales'] = store_performance['total_store_sales'].apply(lambda x: f"{x:.2f}")
-
-
-    # Display data table with conditional formatting
-    st.dataframe(store_performance.style.applymap(format_contribution_percentage, subset=['contribution_percentage']))
+    # Display data table with conditional formatting; store_performance stays numeric, only the cells are formatted
+    st.dataframe(store_performance.style
+                 .map(format_contribution_percentage, subset=['contribution_percentage'])
+                 .format(styler_formats(store_performance), na_rep=''))
 
     # Load GPS coordinates for stores from CSV file
     gps_df = load_coordinates()
@@ -139,16 +178,20 @@ def store_performance_analysis(data, date_filtered_data, selected_products, sele
     # Merge preloaded GPS coordinates with store_performance
     store_performance = store_performance.merge(gps_df, on='storeName', how='left')
 
+    # Colour the map by store cluster when the store x product matrix is available
+    color_column = 'storeName'
+    if store_matrix is not None:
+        store_clusters = store_similarity_section(store_matrix)
+        store_performance = store_performance.merge(store_clusters[['storeName', 'cluster']], on='storeName', how='left')
+        color_column = 'cluster'
+
     # Filter out stores without valid latitude and longitude
     store_performance = store_performance.dropna(subset=['latitude', 'longitude'])
 
     # Separate section for map visualization
     st.markdown("<h3 style='text-align: center; color: blue;'>Store Location Map</h3>", unsafe_allow_html=True)
 
-    # Ensure numeric columns are correctly formatted (convert to numeric if necessary)
-    store_performance['total_selling_price'] = pd.to_numeric(store_performance['total_selling_price'], errors='coerce')
-
-    # Ensure that total_selling_price is numeric before calculating size
+    # Stores without sales in the selection get the smallest marker
     size_variable = store_performance['total_selling_price'].fillna(0)
     
     # Now proceed with the scatter_mapbox plot using this separate size_variable
@@ -158,9 +201,9 @@ def store_performance_analysis(data, date_filtered_data, selected_products, sele
         lon='longitude',
         size=size_variable,
         size_max=50,
-        color='storeName',
+        color=color_column,
         hover_name='storeName', 
-        hover_data={'storeName': True, 'total_selling_price': True},
+        hover_data={'storeName': True, 'total_selling_price': True, color_column: True},
         title="Store Locations",
         zoom=5,
     )
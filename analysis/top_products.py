@@ -6,18 +6,25 @@ def top_products_analysis(data, selected_categories):
     st.markdown("<h1 style='text-align: center; color: green;'>Top Product Analysis by Category</h1>", unsafe_allow_html=True)
 
     # Filter data for selected categories
-    filtered_data = data[data['categoryName'].isin(selected_categories)]
-
-    # Calculate profit and profit margin (per item)
-    filtered_data['profit'] = filtered_data['sellingPrice'] - filtered_data['costPrice']
-    filtered_data['profit_margin'] = (filtered_data['profit'] / filtered_data['sellingPrice']) * 100
-
-    # Calculate total selling price and cost by multiplying with quantity
-    filtered_data['total_selling_price'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_cost_price'] = filtered_data['costPrice'] * filtered_data['quantity']
+    mask = data['categoryName'].isin(selected_categories)
+
+    # Calculate profit and profit margin (per item) in a frame of their own; the input is treated as read-only
+    profit = data['sellingPrice'] - data['costPrice']
+    lines = pd.DataFrame({
+        'productId': data['productId'],
+        'productName': data['productName'],
+        'categoryName': data['categoryName'],
+        'brandName': data['brandName'],
+        'profit': profit,
+        'profit_margin': (profit / data['sellingPrice']) * 100,
+        # Total selling price and cost, multiplied with quantity
+        'total_selling_price': data['sellingPrice'] * data['quantity'],
+        'total_cost_price': data['costPrice'] * data['quantity'],
+        'quantity': data['quantity'],
+    })[mask]
 
     # Group by productId, productName, categoryName, and brandName to calculate total sales, profit, cost, and quantity
-    top_products = (filtered_data.groupby(['productId', 'productName', 'categoryName', 'brandName'])
+    top_products = (lines.groupby(['productId', 'productName', 'categoryName', 'brandName'])
                     .agg({
                         'total_selling_price': 'sum', 
                         'total_cost_price': 'sum',
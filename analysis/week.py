@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from utils.data_loader import calendar_labels
 
 def weekly_sales_analysis(data, selected_brands_sidebar, top_brands):
     st.markdown("<h1 style='text-align: center; color: green;'>Weekly Sales</h1>", unsafe_allow_html=True)
@@ -10,38 +11,35 @@ def weekly_sales_analysis(data, selected_brands_sidebar, top_brands):
         st.warning("Please upload data and select at least one brand.")
         return
 
-    # Filter data for the selected brands (sidebar filter)
+    # Filter data for the selected brands (sidebar filter) as a row mask, so no full copy of the input is made
+    mask = pd.Series(True, index=data.index)
     if len(selected_brands_sidebar) > 0:
-        filtered_data = data[data['brandName'].isin(selected_brands_sidebar)]
-    else:
-        filtered_data = data
+        mask &= data['brandName'].isin(selected_brands_sidebar)
 
     # Further filter data based on top N brands if top_brands is provided
     if top_brands:
-        filtered_data = filtered_data[filtered_data['brandName'].isin(top_brands)]
+        mask &= data['brandName'].isin(top_brands)
 
     # Check if filtered data is empty
-    if filtered_data.empty:
+    if not mask.any():
         st.warning("No sales data available for the selected brands.")
         return
 
-    # Extract the day of the week and month from orderDate
-    filtered_data['day'] = filtered_data['orderDate'].dt.day_name()
-    filtered_data['month'] = filtered_data['orderDate'].dt.month_name()
-
-    # Calculate total selling price by multiplying sellingPrice with quantity
-    filtered_data['total_selling_price'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_cost_price'] = filtered_data['costPrice'] * filtered_data['quantity']
+    # Derived columns go into a narrow frame of their own (only the selected rows); the input is treated as read-only
+    lines = pd.DataFrame({
+        'brandName': data['brandName'],
+        'categoryName': data['categoryName'],
+        'quantity': data['quantity'],
+        # Day of the week, month and week of the month from orderDate
+        **calendar_labels(data['orderDate']),
+        # Total selling and cost price per line (price multiplied by quantity)
+        'total_selling_price': data['sellingPrice'] * data['quantity'],
+        'total_cost_price': data['costPrice'] * data['quantity'],
+    })[mask]
 
     # Aggregate sales data based on brand, month, and dynamic week label
-    filtered_data['month_year'] = filtered_data['orderDate'].dt.to_period('M') 
-    filtered_data['week_number'] = filtered_data.groupby('month_year')['orderDate'].transform(
-        lambda x: (x.dt.day - 1) // 7 + 1 
-    )
-    filtered_data['week_label'] = 'Week ' + filtered_data['week_number'].astype(str)
-    
     weekly_sales_by_week = (
-        filtered_data.groupby(['month', 'brandName', 'week_label'], as_index=False)
+        lines.groupby(['month', 'brandName', 'week_label'], as_index=False)
         .agg(
             total_selling_price=('total_selling_price', 'sum'),
             total_cost_price=('total_cost_price', 'sum'),
@@ -0,0 +1,52 @@
+import plotly.express as px
+import streamlit as st
+from utils.data_loader import DAY_NAMES
+from utils.weekday_hour import weekday_hour_stacks, peak_slots
+
+METRICS = {"Revenue": "revenue", "Quantity": "quantity"}
+LEVELS = {"Store": "store", "Product": "product"}
+
+# Peak weekday and hour of every store or product, busiest first
+def compute_peak_table(stack, metric, level_label):
+    peaks = peak_slots(stack, metric)
+    peaks['peak_weekday'] = [DAY_NAMES[day] for day in peaks['peak_weekday']]
+    return peaks.rename(columns={'key': level_label}).sort_values(by='total', ascending=False, ignore_index=True)
+
+def weekday_hour_analysis(filtered_data, slots):
+    st.markdown("<h1 style='text-align: center; color: green;'>Weekday x Hour Heatmap</h1>", unsafe_allow_html=True)
+
+    stacks = weekday_hour_stacks(filtered_data, slots)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric_label = st.selectbox("Metric", list(METRICS), key="weekday_hour_metric")
+    with col2:
+        level_label = st.selectbox("Heatmap per", list(LEVELS), key="weekday_hour_level")
+    stack, metric = stacks[LEVELS[level_label]], METRICS[metric_label]
+
+    if len(stack['keys']) == 0:
+        st.warning("No sales with a known date and time for the selected criteria.")
+        return
+
+    # Busiest keys first; "All" sums every heatmap in the stack
+    peaks = compute_peak_table(stack, metric, level_label)
+    with col3:
+        chosen = st.selectbox(level_label, ["All"] + peaks[level_label].tolist(), key="weekday_hour_key")
+    if chosen == "All":
+        grid = stack[metric].sum(axis=0)
+    else:
+        grid = stack[metric][stack['keys'].tolist().index(chosen)]
+
+    fig = px.imshow(
+        grid,
+        x=list(range(24)),
+        y=DAY_NAMES,
+        aspect='auto',
+        color_continuous_scale='Greens',
+        labels={'x': 'Hour', 'y': 'Weekday', 'color': metric_label},
+        title=f"{metric_label} by weekday and hour: {chosen}",
+    )
+    fig.update_xaxes(tickmode='linear', tick0=0, dtick=1)
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(peaks, use_container_width=True, hide_index=True)
@@ -2,41 +2,38 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+from utils.data_loader import calendar_labels
 
-def weekly_sales_analysis(data, selected_products_sidebar, top_products):
-    st.markdown("<h1 style='text-align: center; color: green;'>Weekly Sales by Product</h1>", unsafe_allow_html=True)
-
-    # Ensure that data and top_products are available
-    if data is None or (selected_products_sidebar is None and top_products is None):
-        st.warning("Please upload data and select at least one product.")
-        return
-
-    # Filter data for the selected products (sidebar filter)
+# Day, week and month tables of the selected products, or None when no rows match
+def compute_weekly_sales(data, selected_products_sidebar, top_products):
+    # Filter data for the selected products (sidebar filter) as a row mask, so no full copy of the input is made
+    mask = pd.Series(True, index=data.index)
     if len(selected_products_sidebar) > 0:
-        filtered_data = data[data['productName'].isin(selected_products_sidebar)]
-    else:
-        filtered_data = data
+        mask &= data['productName'].isin(selected_products_sidebar)
 
     # Further filter data based on top N products if top_products is provided
     if top_products:
-        filtered_data = filtered_data[filtered_data['productName'].isin(top_products)]
+        mask &= data['productName'].isin(top_products)
 
     # Check if filtered data is empty
-    if filtered_data.empty:
-        st.warning("No sales data available for the selected products.")
-        return
-
-    # Extract the day of the week and month from orderDate
-    filtered_data['day'] = filtered_data['orderDate'].dt.day_name()
-    filtered_data['month'] = filtered_data['orderDate'].dt.month_name()
-
-    # Calculate total selling price by multiplying sellingPrice with quantity
-    filtered_data['total_selling_price'] = filtered_data['sellingPrice'] * filtered_data['quantity']
-    filtered_data['total_cost_price'] = filtered_data['costPrice'] * filtered_data['quantity']
+    if not mask.any():
+        return None
+
+    # Derived columns go into a narrow frame of their own (only the selected rows); the input is treated as read-only
+    lines = pd.DataFrame({
+        'productName': data['productName'],
+        'brandName': data['brandName'],
+        'quantity': data['quantity'],
+        # Day of the week, month and week of the month from orderDate
+        **calendar_labels(data['orderDate']),
+        # Total selling and cost price per line (price multiplied by quantity)
+        'total_selling_price': data['sellingPrice'] * data['quantity'],
+        'total_cost_price': data['costPrice'] * data['quantity'],
+    })[mask]
 
     # Aggregate sales data based on unique productName and day of the week
     weekly_sales = (
-        filtered_data.groupby(['month', 'productName', 'day'], as_index=False)
+        lines.groupby(['month', 'productName', 'day'], as_index=False)
         .agg(
             total_selling_price=('total_selling_price', 'sum'),
             total_cost_price=('total_cost_price', 'sum'),
@@ -55,7 +52,7 @@ def weekly_sales_analysis(data, selected_products_sidebar, top_products):
     ).reset_index()
 
     weekly_sales_data = (
-        filtered_data.groupby(['day', 'productName'], as_index=False)
+        lines.groupby(['day', 'productName'], as_index=False)
         .agg(
             total_selling_price=('total_selling_price', 'sum'),
             total_cost_price=('total_cost_price', 'sum'),
@@ -66,14 +63,8 @@ def weekly_sales_analysis(data, selected_products_sidebar, top_products):
     )
 
     # Aggregate sales data based on product, month, and dynamic week label
-    filtered_data['month_year'] = filtered_data['orderDate'].dt.to_period('M') 
-    filtered_data['week_number'] = filtered_data.groupby('month_year')['orderDate'].transform(
-        lambda x: (x.dt.day - 1) // 7 + 1 
-    )
-    filtered_data['week_label'] = 'Week ' + filtered_data['week_number'].astype(str)
-   
     weekly_sales_by_week = (
-        filtered_data.groupby(['month', 'productName', 'week_label'], as_index=False)
+        lines.groupby(['month', 'productName', 'week_label'], as_index=False)
         .agg(
             total_selling_price=('total_selling_price', 'sum'),
             total_cost_price=('total_cost_price', 'sum'),
@@ -91,6 +82,34 @@ def weekly_sales_analysis(data, selected_products_sidebar, top_products):
         fill_value=0
     ).reset_index()
 
+    return weekly_sales_data, sales_by_day, sales_by_week
+
+# The tables of a sidebar selection (start_date, end_date, stores, products), cached in the dataset's FilterCache
+# per selection and product filters; callers get shallow copies (copy-on-write)
+def selection_weekly_sales(filter_cache, selection, selected_products_sidebar, top_products):
+    extra = (frozenset(selected_products_sidebar), frozenset(top_products or []))
+    tables = filter_cache.derived('weekly_sales', *selection,
+                                  lambda rows: compute_weekly_sales(rows, selected_products_sidebar, top_products), extra)
+    return None if tables is None else tuple(table.copy(deep=False) for table in tables)
+
+# `data` is the by_product slice of `selection` in filter_cache; without a filter cache the tables are not cached
+def weekly_sales_analysis(data, selected_products_sidebar, top_products, filter_cache=None, selection=None):
+    st.markdown("<h1 style='text-align: center; color: green;'>Weekly Sales by Product</h1>", unsafe_allow_html=True)
+
+    # Ensure that data and top_products are available
+    if data is None or (selected_products_sidebar is None and top_products is None):
+        st.warning("Please upload data and select at least one product.")
+        return
+
+    if filter_cache is None:
+        tables = compute_weekly_sales(data, selected_products_sidebar, top_products)
+    else:
+        tables = selection_weekly_sales(filter_cache, selection, selected_products_sidebar, top_products)
+    if tables is None:
+        st.warning("No sales data available for the selected products.")
+        return
+    weekly_sales_data, sales_by_day, sales_by_week = tables
+
     # Calculate weekly sales growth percentage
     sales_by_week_growth = sales_by_week.copy()
     week_columns = sales_by_week.columns[2:]
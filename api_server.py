@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import tornado.web
+
+from utils.data_loader import load_data
+from utils.dataset_registry import DatasetRegistry, fingerprint_bytes
+from utils.filter_cache import FilterCache
+from analysis.plugins import analysis_function
+
+DEFAULT_PORT = 8600
+
+# Products analysed when the request names none, as in the sidebar
+DEFAULT_TOP_PRODUCTS = 250
+
+# Responses kept per process, and threads computing them
+DEFAULT_CACHE_ENTRIES = 256
+DEFAULT_WORKERS = 4
+
+# Affinity combinations returned per response
+AFFINITY_ROWS = 1_000
+
+# The analyses' functions are resolved on first use, like the app's plugins, so importing this module does not
+# load their charting dependencies. Tables come from the dataset's FilterCache, shared with the app's sessions.
+def _daily(data, filtered, view):
+    return analysis_function('daily_sales', 'selection_daily_sales')(view['filter_cache'], view['selection'])
+
+def _hourly(data, filtered, view):
+    return analysis_function('hourly_sales', 'selection_hourly_sales')(view['filter_cache'], view['selection'])[1]
+
+def _stores(data, filtered, view):
+    return analysis_function('store_performance', 'selection_store_performance')(view['filter_cache'], view['selection'])
+
+def _products(data, filtered, view):
+    return analysis_function('product_performance', 'selection_product_performance')(view['filter_cache'], view['selection'])
+
+def _affinity(data, filtered, view):
+    if not {'invoice', 'productId'}.issubset(filtered.columns):
+        raise tornado.web.HTTPError(400, reason="The dataset has no invoice and productId columns")
+    _, cooccurrence_df, product_name_map = analysis_function('affinity', 'selection_cooccurrence')(view['filter_cache'], view['selection'])
+    table = cooccurrence_df.head(AFFINITY_ROWS).copy()
+    for column in [column for column in table.columns if column.startswith('product_')]:
+        table[column] = table[column].map(product_name_map)
+    return table
+
+# Aggregates served under /<name>, each computed from (dataset, filtered rows, resolved view)
+AGGREGATES = {
+    'daily': _daily,
+    'hourly': _hourly,
+    'stores': _stores,
+    'products': _products,
+    'affinity': _affinity,
+}
+
+# The sidebar filters a request resolves to: start_date/end_date (default: the dataset's range), stores and
+# products (repeated or comma-separated; default: every store and the top_products best sellers)
+def resolve_view(defaults, arguments):
+    def values(name):
+        return [value for raw in arguments.get(name, []) for value in raw.decode().split(',') if value]
+
+    def date(name, default):
+        raw = values(name)
+        if not raw:
+            return default
+        try:
+            return pd.Timestamp(raw[0]).normalize()
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"{name} must be a date such as 2024-03-31, not '{raw[0]}'")
+
+    top_products = DEFAULT_TOP_PRODUCTS
+    if values('top_products'):
+        raw = values('top_products')[0]
+        if not raw.isdigit() or int(raw) == 0:
+            raise tornado.web.HTTPError(400, reason=f"top_products must be a positive integer, not '{raw}'")
+        top_products = int(raw)
+    return {
+        'start_date': date('start_date', defaults['start_date']),
+        'end_date': date('end_date', defaults['end_date']),
+        'stores': sorted(values('stores')) or defaults['stores'],
+        'products': sorted(values('products')) or defaults['products'][:top_products],
+    }
+
+# Dataset-wide defaults of resolve_view, computed once per dataset: full date range, stores and products by rows
+def view_defaults(data):
+    return {
+        'start_date': pd.to_datetime(data['orderDate'].min().date()),
+        'end_date': pd.to_datetime(data['orderDate'].max().date()),
+        'stores': data['storeName'].value_counts().index.tolist(),
+        'products': data['productName'].value_counts().index.tolist(),
+    }
+
+# Serves the aggregates of datasets registered in a DatasetRegistry. Responses are cached per dataset,
+# aggregate and resolved filters; concurrent identical requests wait on one computation, which runs on a
+# thread pool so the event loop keeps serving.
+class AggregateService:
+    def __init__(self, registry, default_dataset=None, max_entries=DEFAULT_CACHE_ENTRIES, workers=DEFAULT_WORKERS):
+        self.registry = registry
+        self.default_dataset = default_dataset or (lambda: None)
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-aggregate")
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._pending = {}
+
+    def _lease(self, fingerprint):
+        fingerprint = fingerprint or self.default_dataset()
+        lease = None if fingerprint is None else self.registry.acquire_loaded(fingerprint)
+        if lease is None:
+            raise tornado.web.HTTPError(404, reason="Unknown dataset; list them at /datasets")
+        return lease
+
+    # Runs on the pool: the filtered slices come from the dataset's shared FilterCache, the same one the app's
+    # sidebar uses. The body is cached before the pending entry is dropped, so no request recomputes it.
+    def _compute(self, key, lease, name, view):
+        try:
+            filter_cache = lease.resource('filter_cache', FilterCache)
+            filtered = filter_cache.by_product(view['start_date'], view['end_date'], view['stores'], view['products'])
+            view = dict(view, filter_cache=filter_cache, selection=(view['start_date'], view['end_date'], view['stores'], view['products']))
+            body = AGGREGATES[name](lease.data, filtered, view).to_json(orient='records', date_format='iso')
+            with self._lock:
+                self._responses[key] = body
+                while len(self._responses) > self.max_entries:
+                    self._responses.popitem(last=False)
+            return body
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    async def response(self, name, fingerprint, arguments):
+        lease = self._lease(fingerprint)
+        try:
+            view = resolve_view(lease.resource('api_view_defaults', view_defaults), arguments)
+            key = (lease.fingerprint, name, view['start_date'], view['end_date'], tuple(view['stores']), tuple(view['products']))
+            with self._lock:
+                if key in self._responses:
+                    self._responses.move_to_end(key)
+                    return self._responses[key]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._compute, key, lease, name, view)
+            # Shielded: a client hanging up must not cancel a computation other requests wait on
+            return await asyncio.shield(pending)
+        finally:
+            lease.release()
+
+    def datasets(self):
+        return {
+            'default': self.default_dataset(),
+            'datasets': [{'dataset': fingerprint, 'rows': rows} for fingerprint, rows in self.registry.datasets().items()],
+        }
+
+class DatasetsHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def get(self):
+        self.write(self.service.datasets())
+
+class AggregateHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    async def get(self, name):
+        body = await self.service.response(name, self.get_argument('dataset', None), self.request.query_arguments)
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.write(body)
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.finish(json.dumps({'error': self._reason}))
+
+def make_app(service):
+    return tornado.web.Application([
+        (r"/datasets", DatasetsHandler, {'service': service}),
+        (rf"/({'|'.join(AGGREGATES)})", AggregateHandler, {'service': service}),
+    ])
+
+# Serve the API on a daemon thread with its own event loop (used by the Streamlit app, sharing its registry)
+def start_api_server(service, port=DEFAULT_PORT, address="127.0.0.1"):
+    started = threading.Event()
+
+    def run():
+        async def serve():
+            make_app(service).listen(port, address=address)
+            started.set()
+            await asyncio.Event().wait()
+        asyncio.run(serve())
+
+    threading.Thread(target=run, name="aggregate-api", daemon=True).start()
+    started.wait(timeout=10)
+    return service
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard's daily, hourly, store, product and affinity aggregates as JSON")
+    parser.add_argument("csv", nargs="+", help="Sales exports to serve; the first is the default dataset")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--address", default="127.0.0.1")
+    args = parser.parse_args(argv)
+
+    registry = DatasetRegistry()
+    leases = []
+    for path in args.csv:
+        with open(path, 'rb') as handle:
+            fingerprint = fingerprint_bytes(handle.read())
+        leases.append(registry.acquire(fingerprint, lambda: load_data(path)))
+        print(f"{path}: dataset {fingerprint}")
+
+    service = AggregateService(registry, default_dataset=lambda: leases[0].fingerprint)
+
+    async def serve():
+        make_app(service).listen(args.port, address=args.address)
+        print(f"Serving on http://{args.address}:{args.port}")
+        await asyncio.Event().wait()
+    asyncio.run(serve())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,68 +1,188 @@
+import io
+import os
 import streamlit as st
 import pandas as pd
 from utils.data_loader import load_data
-from analysis.weekly_sales import weekly_sales_analysis
-from analysis.store_performance_analysis import store_performance_analysis
-from analysis.hourly_sales import hourly_sales_analysis
-from analysis.category_breakdown import category_breakdown_analysis
-from analysis.profit_margin_analysis import profit_margin_analysis
-from analysis.top_products import top_products_analysis
-from analysis.category_comparison import category_comparison_analysis
-from analysis.product_performance_analysis import product_performance_analysis
-from analysis.daily_sales_analysis import daily_sales_analysis
-from analysis.affinity_analysis import affinity_analysis
+from utils.filter_cache import FilterCache
+from utils.dataset_registry import DatasetRegistry, fingerprint_bytes
+from utils.background_loader import BackgroundLoader
+from analysis.plugins import analysis_function, is_enabled, required_columns
+from analysis.export_panel import export_panel
+from utils.schema import quarantine_summary
+from utils.time_series import build_daily_cube
+from utils.forecasting import forecast_cube
+from utils.store_similarity import build_store_product_matrix
+from utils.classification import ALL_STORES, classify_products, products_in_classes
+from utils.warm_start import latest_dataset
+from utils.partitioned_store import PartitionedStore, estimate_parsed_bytes, memory_budget
+from utils.elasticity import price_points, price_response
+from utils.hierarchy import build_hierarchy_rollup
+from utils.baskets import basket_table, basket_rollup
+from utils.weekday_hour import weekday_hour_slots, rows_slots
+from utils.approximate import build_approximate_view, filter_sample, approximate_distinct_counts, approximate_distinct_total
 
 
+# Analyses treat their inputs as read-only; copy-on-write keeps column selections and slices lazy views
+pd.set_option("mode.copy_on_write", True)
+
 # Page configuration
 st.set_page_config(page_title="Product Analysis Dashboard", layout="wide")
 
-# Load and preprocess data
-@st.cache_data
+# Seconds between progress updates while a file loads in the background
+LOAD_POLL_SECONDS = 1
+
+# Canonical columns read from uploads: those of the enabled analyses, plus invoices for approximate mode's
+# distinct-invoice sketches
+LOAD_COLUMNS = required_columns(extra=['invoice'])
+
+# Environment variable that makes the app serve the JSON API (api_server.py) on that port from its own process
+API_PORT_ENV = "SALES_API_PORT"
+
+# Products analysed by default (the most frequently sold ones)
+DEFAULT_TOP_PRODUCTS = 250
+
+# Whole-dataset tables, built once per dataset and shared through its registry entry. Factories get the
+# data and a lookup for the other tables.
+DATASET_RESOURCES = {
+    # Rolling and last-year figures need days outside the date filter, so the cube covers the whole dataset
+    'daily_cube': lambda data, resource: build_daily_cube(data),
+    # Classes per store and across stores
+    'product_classes': lambda data, resource: classify_products(resource('daily_cube')),
+    # One batched fit covers every product and store; the selection only filters the table
+    'demand_forecast': lambda data, resource: forecast_cube(resource('daily_cube')),
+    # Sparse store x product revenue
+    'store_product_matrix': lambda data, resource: build_store_product_matrix(data),
+    # Weekday x hour slot of every row, for the heatmaps
+    'weekday_hour_slots': lambda data, resource: weekday_hour_slots(data) if 'time' in data.columns else None,
+    # Basket figures per store, day and hour, from one reduction per invoice
+    'basket_rollup': lambda data, resource: basket_rollup(basket_table(data)) if 'invoice' in data.columns else None,
+    # Quantity per product, store, day and price, and the elasticities fitted on it in one batch
+    'price_points': lambda data, resource: price_points(data),
+    'price_response': lambda data, resource: price_response(resource('price_points')),
+    # Sales, cost and quantity per category/brand/product path, store and day, for the drill-down
+    'hierarchy_rollup': lambda data, resource: build_hierarchy_rollup(data) if {'categoryName', 'brandName'}.issubset(data.columns) else None,
+}
+
+# Analyses each whole-dataset table is built for: precomputing skips tables no enabled analysis reads, and
+# the page builds them only when such an analysis (or the ABC/XYZ sidebar filter) asks for them
+RESOURCE_ANALYSES = {
+    'daily_cube': ['sales_trends', 'anomalies', 'demand_forecast', 'abc_xyz'],
+    'product_classes': ['abc_xyz'],
+    'demand_forecast': ['demand_forecast'],
+    'store_product_matrix': ['store_performance'],
+    'weekday_hour_slots': ['weekday_hour'],
+    'basket_rollup': ['baskets'],
+    'price_points': ['price_elasticity'],
+    'price_response': ['price_elasticity'],
+    'hierarchy_rollup': ['drilldown'],
+}
+
+def resource_enabled(name):
+    return any(is_enabled(analysis) for analysis in RESOURCE_ANALYSES.get(name, []))
+
+# One registry per server process: sessions opening the same file share one parsed, memory-mapped copy
+@st.cache_resource
+def get_dataset_registry():
+    return DatasetRegistry()
+
+# Files being parsed in the background, keyed by fingerprint, so sessions uploading the same file share one load
+@st.cache_resource
+def get_background_loads():
+    return {}
+
+# A whole-dataset table from DATASET_RESOURCES, shared through the lease. None for a loading preview: the
+# preview grows on every rerun, so the panels reading these tables wait for the load to finish
+def dataset_resource(lease, data, name):
+    def resource(other):
+        return dataset_resource(lease, data, other)
+    if lease is None:
+        return None
+    return lease.resource(name, lambda _: DATASET_RESOURCES[name](data, resource))
+
+# Parse each distinct payload once per process. Returns (lease, loader): a payload that is already registered
+# gets a lease straight away, otherwise it is parsed on a background worker. `on_loaded(lease)` runs on the
+# worker after registration, before the load reports done.
+def open_dataset(payload, fingerprint, on_loaded=None):
+    registry = get_dataset_registry()
+    if fingerprint in registry:
+        return registry.acquire(fingerprint, lambda: load_data(io.BytesIO(payload), LOAD_COLUMNS)), None
+
+    loads = get_background_loads()
+
+    # Runs on the worker once every chunk is parsed: register the dataset with its schema report and build its filter index
+    def register(data, report):
+        loaded_lease = registry.acquire(fingerprint, lambda: data)
+        loaded_lease.resource('schema_report', lambda _: report)
+        loaded_lease.resource('filter_cache', FilterCache)
+        if on_loaded is not None:
+            on_loaded(loaded_lease)
+        loads.pop(fingerprint, None)
+        return loaded_lease
+
+    loader = loads.get(fingerprint)
+    if loader is None or loader.error is not None:
+        loader = loads[fingerprint] = BackgroundLoader(payload, register, columns=LOAD_COLUMNS)
+    return None, loader.start()
+
+# Load and preprocess an uploaded file, reusing this session's lease when the file has not changed
 def load_optimized_data(file):
-    return load_data(file)
-# Filter data with date range and category filter (same handling for datetime as in brandName analysis)
-@st.cache_data
-def filter_data(_data, products, stores, start_date, end_date):
-    if start_date is not None:
-        start_date = pd.to_datetime(start_date, utc=True)
-    if end_date is not None:
-        end_date = pd.to_datetime(end_date, utc=True)
+    payload = file.getvalue()
+    fingerprint = fingerprint_bytes(payload)
+    lease = st.session_state.dataset_lease
+    if lease is not None and lease.fingerprint == fingerprint:
+        return lease, None
+    if lease is not None:
+        lease.release()
+    return open_dataset(payload, fingerprint)
 
-    _data['orderDate'] = pd.to_datetime(_data['orderDate'], utc=True)
-    
-    # Filter data based on selected date range, products, and stores
-    mask = (_data['orderDate'] >= start_date) & (_data['orderDate'] <= end_date) & \
-           (_data['productName'].isin(products)) & (_data['storeName'].isin(stores))
-    filtered_data = _data[mask]
-    
-    return filtered_data
+# Swap a finished background load for this session's own lease on the registered dataset
+def finish_data_load(loader):
+    loaded_lease = loader.result
+    return get_dataset_registry().acquire(loaded_lease.fingerprint, lambda: loaded_lease.data)
 
-# Filter data by date range only (same datetime handling as in brandName analysis)
-@st.cache_data
-def filter_data_by_date(_data, start_date, end_date):
-    if start_date is not None:
-        start_date = pd.to_datetime(start_date, utc=True)
-    if end_date is not None:
-        end_date = pd.to_datetime(end_date, utc=True)
+# Loading progress in the sidebar. Reruns the app once the first rows can be previewed and again when loading finishes
+@st.fragment(run_every=LOAD_POLL_SECONDS)
+def loading_progress(loader, preview_rows):
+    progress = loader.progress()
+    st.progress(progress['fraction'], text=f"{progress['phase'].capitalize()}: {progress['rows']:,} rows parsed")
+    if loader.done or (preview_rows == 0 and progress['rows'] > 0):
+        st.rerun()
 
-    _data['orderDate'] = pd.to_datetime(_data['orderDate'], utc=True)
+# Filter data with date range, product and store filters, reusing cached date and store slices
+def filter_data(filter_cache, products, stores, start_date, end_date):
+    return filter_cache.by_product(start_date, end_date, stores, products)
 
-    # Filter data based on selected date range only 
-    mask = (_data['orderDate'] >= start_date) & (_data['orderDate'] <= end_date)
-    date_filtered_data = _data[mask]
+# Filter data by date range only (shares the cached date slice with filter_data)
+def filter_data_by_date(filter_cache, start_date, end_date):
+    date_filtered_data = filter_cache.by_date(start_date, end_date)
 
     # Aggregate by products (instead of category)
-    product_aggregated = date_filtered_data.groupby('productName').agg(
-        total_sales=('sellingPrice', lambda x: (x * date_filtered_data.loc[x.index, 'quantity']).sum()),
-        total_cost=('costPrice', lambda x: (x * date_filtered_data.loc[x.index, 'quantity']).sum()),
-        total_quantity=('quantity', 'sum')
-    ).reset_index()
+    product_aggregated = pd.DataFrame({
+        'productName': date_filtered_data['productName'],
+        'total_sales': date_filtered_data['sellingPrice'] * date_filtered_data['quantity'],
+        'total_cost': date_filtered_data['costPrice'] * date_filtered_data['quantity'],
+        'total_quantity': date_filtered_data['quantity'],
+    }).groupby('productName', as_index=False).sum()
     
     product_aggregated['profit'] = product_aggregated['total_sales'] - product_aggregated['total_cost']
     product_aggregated['profit_margin'] = (product_aggregated['profit'] / product_aggregated['total_sales']) * 100
     
     return date_filtered_data, product_aggregated
 
+# Layout used for the upload and the rows quarantined at load time
+def show_schema_report(report):
+    if report is None:
+        return
+    quarantine = report['quarantine']
+    if report['renamed']:
+        st.caption(f"Columns mapped from the '{report['layout']}' layout.")
+    if len(quarantine) == 0:
+        return
+    with st.expander(f"Quarantined rows: {len(quarantine):,} of {report['rows']:,}"):
+        st.dataframe(quarantine_summary(report), hide_index=True, use_container_width=True)
+        st.download_button("Download quarantined rows", quarantine.to_csv(index=False), file_name="quarantined_rows.csv",
+                           mime="text/csv")
+
 # Cache category list
 @st.cache_data
 def get_top_products(data, n=10):
@@ -73,24 +193,180 @@ def get_top_products(data, n=10):
 def get_top_stores(data, n=10):
     return data['storeName'].value_counts().head(n).index.tolist()
 
+# Render an enabled analysis, importing its module on first use
+def render_analysis(name, *args, **kwargs):
+    if is_enabled(name):
+        analysis_function(name)(*args, **kwargs)
+
+# Sidebar defaults before any filter is touched: the full date range (as whole days, like the date inputs),
+# the top products and every store
+def default_view(data):
+    n_products = data['productName'].nunique()
+    return {
+        'start_date': pd.to_datetime(data['orderDate'].min().date()),
+        'end_date': pd.to_datetime(data['orderDate'].max().date()),
+        'products': get_top_products(data, n=min(DEFAULT_TOP_PRODUCTS, n_products)),
+        'stores': get_top_stores(data, n=data['storeName'].nunique()),
+    }
+
+# Plugins whose tables depend only on the sidebar selection, and the function caching them in the FilterCache
+SELECTION_TABLES = {
+    'product_performance': 'selection_product_performance',
+    'daily_sales': 'selection_daily_sales',
+    'store_performance': 'selection_store_performance',
+    'hourly_sales': 'selection_hourly_sales',
+    'profit_margin': 'selection_profit_margin',
+}
+
+# Build every whole-dataset table and the cached tables of the default view, so the first page view after
+# a warm start is served from cache
+def precompute_default_view(lease):
+    data = lease.data
+    for name in DATASET_RESOURCES:
+        if resource_enabled(name):
+            dataset_resource(lease, data, name)
+
+    view = default_view(data)
+    filter_cache = lease.resource('filter_cache', FilterCache)
+    selection = (view['start_date'], view['end_date'], view['stores'], view['products'])
+    filtered_data = filter_data(filter_cache, view['products'], view['stores'], view['start_date'], view['end_date'])
+    filter_data_by_date(filter_cache, view['start_date'], view['end_date'])
+    # The panels' per-selection tables, as the page computes them before any sidebar filter is touched
+    for name, function in SELECTION_TABLES.items():
+        if is_enabled(name):
+            analysis_function(name, function)(filter_cache, selection)
+    if is_enabled('weekly_sales'):
+        analysis_function('weekly_sales', 'selection_weekly_sales')(filter_cache, selection, [], view['products'])
+    if {'invoice', 'productId', 'time'}.issubset(filtered_data.columns):
+        if is_enabled('affinity'):
+            analysis_function('affinity', 'selection_cooccurrence')(filter_cache, selection)
+        if is_enabled('association_rules'):
+            analysis_function('association_rules', 'selection_rule_model')(filter_cache, selection)
+
+# The newest CSV in the warm-start directory, parsed and precomputed once per server process on a background
+# worker. The lease held by the finished load keeps the dataset registered for as long as the server runs.
+@st.cache_resource
+def get_warm_start():
+    path = latest_dataset()
+    if path is None:
+        return None
+    with open(path, 'rb') as handle:
+        payload = handle.read()
+    fingerprint = fingerprint_bytes(payload)
+    lease, loader = open_dataset(payload, fingerprint, on_loaded=precompute_default_view)
+    if lease is not None:
+        precompute_default_view(lease)
+    return {'path': path, 'fingerprint': fingerprint, 'lease': lease, 'loader': loader}
+
+# With $SALES_API_PORT set, the JSON API runs in this process so it serves the datasets and cached tables the
+# app's sessions share; requests without a dataset get the warm-start one. Started once per process.
+@st.cache_resource
+def get_api_server(_warm_start):
+    port = os.environ.get(API_PORT_ENV)
+    if not port:
+        return None
+    # Imported only when serving, so the app's cold start does not load the API
+    from api_server import AggregateService, start_api_server
+    default_dataset = (lambda: _warm_start['fingerprint']) if _warm_start is not None else None
+    return start_api_server(AggregateService(get_dataset_registry(), default_dataset), int(port))
+
+# Uploads parsed into month x store partitions on disk, keyed by fingerprint and shared by every session
+@st.cache_resource(show_spinner="The file is larger than the memory budget; partitioning it by month and store on disk...")
+def get_partitioned_store(fingerprint, _payload):
+    partitioned_store = PartitionedStore()
+    partitioned_store.ingest(_payload, LOAD_COLUMNS)
+    return partitioned_store
+
+# The partitioned store of an upload whose parsed size would exceed the memory budget, or None to load it in
+# memory as usual. Decided once per uploaded file.
+def partitioned_upload(file):
+    file_id, partitioned_store = st.session_state.partitioned_upload
+    if file_id == file.file_id:
+        return partitioned_store
+    payload = file.getvalue()
+    budget = memory_budget()
+    if budget is not None and estimate_parsed_bytes(payload, LOAD_COLUMNS) > budget:
+        partitioned_store = get_partitioned_store(fingerprint_bytes(payload), payload)
+    else:
+        partitioned_store = None
+    st.session_state.partitioned_upload = (file.file_id, partitioned_store)
+    return partitioned_store
+
+# This session's lease on the warm-start dataset, or the load to wait for
+def open_warm_dataset(warm_start):
+    lease = st.session_state.dataset_lease
+    if lease is not None:
+        lease.release()
+    loader = warm_start['loader']
+    if loader is not None and not loader.done:
+        return None, loader
+    return get_dataset_registry().acquire(warm_start['fingerprint'], lambda: load_data(warm_start['path'], LOAD_COLUMNS)), None
+
+
 # Initialize session state
-if 'data' not in st.session_state:
-    st.session_state.data = None
+if 'dataset_lease' not in st.session_state:
+    st.session_state.dataset_lease = None
+    st.session_state.background_load = None
     st.session_state.last_upload = None
+    st.session_state.partitioned_upload = (None, None)
 
 # Sidebar layout
 with st.sidebar:
     uploaded_file = st.file_uploader("Upload CSV file", type="csv")
+
+# Uploads too large to parse in memory get the partitioned, out-of-core view instead
+partitioned_store = partitioned_upload(uploaded_file) if uploaded_file else None
+if partitioned_store is not None:
+    # Imported only for oversized uploads, so other sessions do not load its charting dependencies
+    from analysis.out_of_core_analysis import out_of_core_analysis
+    show_schema_report(partitioned_store.report)
+    out_of_core_analysis(partitioned_store)
+    st.stop()
+
+with st.sidebar:
+    # Without an upload, open the dataset the server warm-started from (if it loaded). The first run of the
+    # app in this process starts the warm-up either way.
+    warm_start = get_warm_start()
+    get_api_server(warm_start)
+    if uploaded_file or (warm_start is not None and warm_start['loader'] is not None and warm_start['loader'].error is not None):
+        warm_start = None
     
-    if uploaded_file:
-        if st.session_state.last_upload != uploaded_file.name:
-            with st.spinner('Loading data...'):
-                st.session_state.data = load_optimized_data(uploaded_file)
-                st.session_state.last_upload = uploaded_file.name
+    if uploaded_file or warm_start is not None:
+        if uploaded_file and st.session_state.last_upload != uploaded_file.file_id:
+            st.session_state.dataset_lease, st.session_state.background_load = load_optimized_data(uploaded_file)
+            st.session_state.last_upload = uploaded_file.file_id
+            if st.session_state.dataset_lease is not None:
+                st.success("Data loaded successfully!")
+        elif warm_start is not None and st.session_state.last_upload != warm_start['path']:
+            st.session_state.dataset_lease, st.session_state.background_load = open_warm_dataset(warm_start)
+            st.session_state.last_upload = warm_start['path']
+        if warm_start is not None:
+            st.caption(f"Showing {os.path.basename(warm_start['path'])}; upload a file to analyse another.")
+
+        background_load = st.session_state.background_load
+        if background_load is not None and background_load.done:
+            st.session_state.background_load = None
+            if background_load.error is not None:
+                st.session_state.last_upload = None
+                st.error(f"Could not load the file: {background_load.error}")
+                st.stop()
+            st.session_state.dataset_lease = finish_data_load(background_load)
             st.success("Data loaded successfully!")
-        
-        data = st.session_state.data
-        
+
+        dataset_lease = st.session_state.dataset_lease
+        if dataset_lease is not None:
+            data = dataset_lease.data
+            filter_cache = dataset_lease.resource('filter_cache', FilterCache)
+            show_schema_report(dataset_lease.resource('schema_report', lambda _: None))
+        else:
+            # Still loading: analyse the rows parsed so far
+            data = background_load.preview()
+            loading_progress(background_load, 0 if data is None else len(data))
+            if data is None:
+                st.stop()
+            filter_cache = FilterCache(data)
+
+
         min_date = data['orderDate'].min()
         max_date = data['orderDate'].max()
         
@@ -112,7 +388,7 @@ with st.sidebar:
             "Select number of top products to analyze",
             min_value=1, 
             max_value=n_products_available, 
-            value=min(250, n_products_available),
+            value=min(DEFAULT_TOP_PRODUCTS, n_products_available),
             step=1
         )
 
@@ -138,20 +414,76 @@ with st.sidebar:
             options=top_stores
         )
 
+        # Narrow the analyses to products of the chosen ABC/XYZ classes, e.g. "A-class items in store X"
+        class_scope = st.selectbox("Classify products within", [ALL_STORES] + top_stores)
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_abc = st.multiselect("ABC class", ['A', 'B', 'C'], disabled=dataset_lease is None)
+        with col2:
+            selected_xyz = st.multiselect("XYZ class", ['X', 'Y', 'Z'], disabled=dataset_lease is None)
+
+        approximate_mode = st.checkbox(
+            "Approximate mode",
+            value=False,
+            help="Estimate product, daily and store figures from a stratified sample by store and day, "
+                 "with 95% confidence intervals. Distinct counts use HyperLogLog sketches.",
+            disabled=dataset_lease is None
+        ) and dataset_lease is not None
+
 
 # Ensure that top_categories, selected_categories_sidebar, top_stores, and selected_stores_sidebar are defined before using them
-if uploaded_file:
+if uploaded_file or warm_start is not None:
     # Use selected categories and stores from the sidebar if any are chosen, otherwise default to top categories and stores
     selected_products = selected_product_sidebar if selected_product_sidebar else top_products
     selected_stores = selected_stores_sidebar if selected_stores_sidebar else top_stores
+    if dataset_lease is not None and (selected_abc or selected_xyz):
+        product_classes = dataset_resource(dataset_lease, data, 'product_classes')
+        class_products = set(products_in_classes(product_classes, class_scope, selected_abc, selected_xyz))
+        selected_products = [product for product in selected_products if product in class_products]
+        if class_scope != ALL_STORES:
+            selected_stores = [class_scope]
 
     # Filter data based on selected categories, stores, and date range
-    filtered_data = filter_data(data, selected_products, selected_stores, start_date, end_date)
+    filtered_data = filter_data(filter_cache, selected_products, selected_stores, start_date, end_date)
+    # The same filters as the key of the tables cached in the FilterCache
+    selection = (start_date, end_date, selected_stores, selected_products)
     
-    date_filtered_data, category_aggregated = filter_data_by_date(data, start_date, end_date)
+    date_filtered_data, category_aggregated = filter_data_by_date(filter_cache, start_date, end_date)
 
     st.sidebar.markdown(f"**Data points:** {len(filtered_data):,}")
 
+    # Tables are only computed when exported
+    export_sources = {
+        "Filtered data": lambda: filtered_data,
+        "Product performance": lambda: analysis_function('product_performance', 'selection_product_performance')(
+            filter_cache, selection),
+    }
+    if dataset_lease is not None:
+        export_sources["Demand forecast"] = lambda: analysis_function('demand_forecast', 'compute_demand_forecast')(
+            dataset_resource(dataset_lease, data, 'demand_forecast'), selected_products, selected_stores)
+        export_sources["ABC/XYZ classes"] = lambda: dataset_resource(dataset_lease, data, 'product_classes')
+    if {'invoice', 'productId'}.issubset(filtered_data.columns):
+        export_sources["Product co-occurrence"] = lambda: analysis_function('affinity', 'cooccurrence_export_chunks')(
+            filtered_data, filter_cache, selection)
+    export_panel(export_sources)
+
+    if dataset_lease is None:
+        st.info(f"Showing a preview of the first {len(data):,} rows while the rest of the file loads. "
+                "Analyses refresh, and the trend, forecast, class, heatmap, basket, drill-down and price panels "
+                "appear, when loading finishes.")
+
+    if approximate_mode:
+        approximate_view = dataset_lease.resource('approximate_view', build_approximate_view)
+        sample_filtered = filter_sample(approximate_view, selected_products, selected_stores, start_date, end_date)
+        sample_date_filtered = filter_sample(approximate_view, None, None, start_date, end_date)
+        distinct_counts = approximate_distinct_counts(approximate_view, selected_stores, start_date, end_date)
+
+        invoices, invoices_ci = approximate_distinct_total(approximate_view, 'invoice_registers', selected_stores, start_date, end_date)
+        products, products_ci = approximate_distinct_total(approximate_view, 'product_registers', selected_stores, start_date, end_date)
+        st.sidebar.markdown(f"**Sampled rows:** {len(sample_filtered):,}")
+        st.sidebar.markdown(f"**Distinct invoices:** ≈{invoices:,.0f} ± {invoices_ci:,.0f}")
+        st.sidebar.markdown(f"**Distinct products:** ≈{products:,.0f} ± {products_ci:,.0f}")
+
     try:
         with st.spinner('Analyzing data...'):
             if len(filtered_data) > 0:
@@ -169,19 +501,50 @@ if uploaded_file:
                 overall_analysis['profit_margin'] = (overall_analysis['profit'] / (overall_analysis['total_sales'] + overall_analysis['total_cost'])) * 100
 
                 # Run all analyses with filtered_data based on selected categories, stores, or top categories/stores by default
-                product_performance_analysis(filtered_data, selected_products, selected_stores)
+                if approximate_mode:
+                    render_analysis('product_performance', sample_filtered, selected_products, selected_stores, approximate=True)
+                else:
+                    render_analysis('product_performance', filtered_data, selected_products, selected_stores, filter_cache=filter_cache, selection=selection)
                 # Ensure to pass the filtered data (filtered_data) and selected products to the analysis
-                weekly_sales_analysis(filtered_data, selected_product_sidebar, top_products)
-                daily_sales_analysis(filtered_data, selected_products, selected_stores)
-                store_performance_analysis(data, date_filtered_data, selected_products, selected_stores)
-                hourly_sales_analysis(filtered_data, selected_products, selected_stores)
-                # category_breakdown_analysis(filtered_data, selected_categories)
-                profit_margin_analysis(filtered_data, selected_products)
-                # top_products_analysis(filtered_data, selected_categories)
+                render_analysis('weekly_sales', filtered_data, selected_product_sidebar, top_products, filter_cache=filter_cache, selection=selection)
+                if approximate_mode:
+                    render_analysis('daily_sales', sample_filtered, selected_products, selected_stores, approximate=True)
+                    render_analysis('store_performance', approximate_view['sample'], sample_date_filtered, selected_products, selected_stores,
+                                    approximate=True, distinct_counts=distinct_counts)
+                else:
+                    render_analysis('daily_sales', filtered_data, selected_products, selected_stores, filter_cache=filter_cache, selection=selection)
+                    if is_enabled('store_performance'):
+                        store_matrix = dataset_resource(dataset_lease, data, 'store_product_matrix')
+                        render_analysis('store_performance', data, date_filtered_data, selected_products, selected_stores, store_matrix=store_matrix,
+                                        filter_cache=filter_cache, selection=selection)
+                if dataset_lease is not None and resource_enabled('daily_cube'):
+                    daily_cube = dataset_resource(dataset_lease, data, 'daily_cube')
+                    render_analysis('sales_trends', daily_cube, selected_products, selected_stores, start_date, end_date)
+                    render_analysis('anomalies', daily_cube, selected_products, selected_stores, start_date, end_date)
+                    if is_enabled('demand_forecast'):
+                        demand_forecast = dataset_resource(dataset_lease, data, 'demand_forecast')
+                        render_analysis('demand_forecast', daily_cube, demand_forecast, selected_products, selected_stores)
+                    if is_enabled('abc_xyz'):
+                        render_analysis('abc_xyz', dataset_resource(dataset_lease, data, 'product_classes'), class_scope, selected_products)
+                render_analysis('hourly_sales', filtered_data, selected_products, selected_stores, filter_cache=filter_cache, selection=selection)
+                if dataset_lease is not None and is_enabled('weekday_hour') and 'time' in data.columns:
+                    slots = dataset_resource(dataset_lease, data, 'weekday_hour_slots')
+                    render_analysis('weekday_hour', filtered_data, rows_slots(slots, data.index, filtered_data))
+                if dataset_lease is not None and is_enabled('baskets') and 'invoice' in data.columns:
+                    baskets = dataset_resource(dataset_lease, data, 'basket_rollup')
+                    render_analysis('baskets', baskets, selected_stores, start_date, end_date)
+                if dataset_lease is not None and is_enabled('drilldown') and {'categoryName', 'brandName'}.issubset(data.columns):
+                    hierarchy_rollup = dataset_resource(dataset_lease, data, 'hierarchy_rollup')
+                    render_analysis('drilldown', hierarchy_rollup, selected_stores, start_date, end_date)
+                if dataset_lease is not None and is_enabled('price_elasticity'):
+                    render_analysis('price_elasticity', dataset_resource(dataset_lease, data, 'price_points'),
+                                    dataset_resource(dataset_lease, data, 'price_response'), selected_products)
+                render_analysis('profit_margin', filtered_data, selected_products, filter_cache=filter_cache, selection=selection)
                 # Affinity Analysis
                 if {'invoice', 'productId', 'time'}.issubset(filtered_data.columns):
                     st.markdown("<h1 style='text-align: center; color: green;'>Buying pattern analysis</h1>", unsafe_allow_html=True)
-                    affinity_analysis(filtered_data)
+                    render_analysis('affinity', filtered_data, filter_cache, selection)
+                    render_analysis('association_rules', filtered_data, filter_cache=filter_cache, selection=selection)
                 else:
                     st.warning("The dataset must contain 'invoice', 'productId', and 'time' columns for affinity analysis.")
 
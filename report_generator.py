@@ -0,0 +1,227 @@
+import argparse
+import html
+import os
+import re
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from utils.data_loader import load_data
+from utils.shared_frame import dump_frame, load_frame
+from analysis.store_performance_analysis import load_coordinates, compute_store_performance
+from analysis.product_performance_analysis import compute_product_performance
+from analysis.daily_sales_analysis import compute_daily_sales
+from analysis.hourly_sales import compute_hourly_sales
+from analysis.affinity_analysis import compute_cooccurrence
+
+# Number of rows shown per table in a report
+TABLE_ROWS = 25
+
+# Directory of the memory-mapped dataset, set once per worker process
+_shared_directory = None
+
+def _init_worker(shared_directory):
+    global _shared_directory
+    _shared_directory = shared_directory
+
+def _slugify(name):
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').lower() or 'store'
+
+# Build every table and chart for one store; each chart is (title, kind, frame, x, y)
+def build_store_sections(store_data, store_name):
+    products = store_data['productName'].dropna().unique().tolist()
+    stores = [store_name]
+
+    store_table = compute_store_performance(store_data, store_data, products, stores)
+
+    product_table = compute_product_performance(store_data, products, stores).head(TABLE_ROWS)
+
+    daily_sales = compute_daily_sales(store_data, products)
+    daily_totals = daily_sales.groupby('orderDate', as_index=False)[['total_sales', 'total_quantity', 'profit']].sum()
+
+    _, hourly_totals = compute_hourly_sales(store_data, products, stores)
+
+    _, cooccurrence_df, product_name_map = compute_cooccurrence(store_data)
+    affinity_table = cooccurrence_df.head(TABLE_ROWS).copy()
+    for col in [col for col in affinity_table.columns if col.startswith('product_')]:
+        affinity_table[col] = affinity_table[col].map(product_name_map)
+
+    return [
+        ("Store Performance", store_table, None),
+        ("Product Performance", product_table,
+         ("Top Products by Sales", "bar", product_table, 'productName', 'total_selling_price')),
+        ("Daily Sales", daily_totals,
+         ("Daily Sales", "line", daily_totals, 'orderDate', 'total_sales')),
+        ("Hourly Sales", hourly_totals,
+         ("Hourly Sales", "bar", hourly_totals, 'hour', 'total_selling_price')),
+        ("Frequently Bought Together", affinity_table, None),
+    ]
+
+def _format_cell(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+def write_html_report(store_name, sections, path):
+    import plotly.express as px
+
+    parts = [
+        "<html><head><meta charset='utf-8'>",
+        f"<title>{html.escape(store_name)}</title>",
+        "<style>body{font-family:sans-serif;margin:24px} table{border-collapse:collapse;font-size:12px}"
+        " td,th{border:1px solid #ccc;padding:3px 6px}</style>",
+        "</head><body>",
+        f"<h1 style='color: green;'>{html.escape(store_name)}</h1>",
+    ]
+    include_plotlyjs = 'cdn'
+    for title, table, chart in sections:
+        parts.append(f"<h2 style='color: green;'>{html.escape(title)}</h2>")
+        if chart is not None and not chart[2].empty:
+            chart_title, kind, frame, x, y = chart
+            plot = px.bar if kind == "bar" else px.line
+            fig = plot(frame, x=x, y=y, title=chart_title)
+            parts.append(fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs))
+            include_plotlyjs = False
+        parts.append(table.to_html(index=False, formatters={c: _format_cell for c in table.columns}))
+    parts.append("</body></html>")
+
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("\n".join(parts))
+
+def _latin1(text):
+    # The core fpdf fonts only cover latin-1
+    return str(text).replace("₹", "Rs.").encode("latin-1", "replace").decode("latin-1")
+
+def _pdf_table(pdf, table):
+    if table.empty:
+        pdf.set_font("Arial", "I", 8)
+        pdf.cell(0, 6, "No data", ln=1)
+        return
+
+    width = (pdf.w - pdf.l_margin - pdf.r_margin) / len(table.columns)
+    max_chars = max(int(width / 1.6), 4)
+
+    pdf.set_font("Arial", "B", 7)
+    for col in table.columns:
+        pdf.cell(width, 5, _latin1(col)[:max_chars], border=1)
+    pdf.ln()
+
+    pdf.set_font("Arial", "", 7)
+    for row in table.itertuples(index=False):
+        for value in row:
+            pdf.cell(width, 5, _latin1(_format_cell(value))[:max_chars], border=1)
+        pdf.ln()
+
+def write_pdf_report(store_name, sections, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from fpdf import FPDF
+
+    pdf = FPDF(orientation="L", unit="mm", format="A4")
+    pdf.set_auto_page_break(True, margin=12)
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, _latin1(store_name), ln=1)
+
+    chart_directory = tempfile.mkdtemp()
+    try:
+        for index, (title, table, chart) in enumerate(sections):
+            pdf.set_font("Arial", "B", 12)
+            pdf.cell(0, 8, _latin1(title), ln=1)
+            if chart is not None and not chart[2].empty:
+                chart_title, kind, frame, x, y = chart
+                fig, ax = plt.subplots(figsize=(11, 3.5))
+                labels = frame[x].astype(str)
+                if kind == "bar":
+                    ax.bar(labels, frame[y], color="tab:green")
+                else:
+                    ax.plot(labels, frame[y], color="tab:green")
+                ax.set_title(chart_title)
+                ax.tick_params(axis='x', labelrotation=90, labelsize=6)
+                if len(labels) > 40:
+                    ax.set_xticks(ax.get_xticks()[::max(len(labels) // 40, 1)])
+                fig.tight_layout()
+                image_path = os.path.join(chart_directory, f"chart_{index}.png")
+                fig.savefig(image_path, dpi=120)
+                plt.close(fig)
+                pdf.image(image_path, w=pdf.w - pdf.l_margin - pdf.r_margin)
+            _pdf_table(pdf, table)
+            pdf.ln(4)
+        pdf.output(path, "F")
+    finally:
+        shutil.rmtree(chart_directory, ignore_errors=True)
+
+# Runs in a worker process against the memory-mapped dataset
+def render_store_report(store_name, start_date, end_date, report_format, output_dir):
+    store_data = load_frame(_shared_directory, partition=store_name)
+
+    if start_date is not None:
+        store_data = store_data[store_data['orderDate'] >= start_date]
+    if end_date is not None:
+        store_data = store_data[store_data['orderDate'] <= end_date]
+
+    if store_data.empty:
+        return store_name, None
+
+    sections = build_store_sections(store_data.reset_index(drop=True), store_name)
+
+    path = os.path.join(output_dir, f"{_slugify(store_name)}.{report_format}")
+    if report_format == "pdf":
+        write_pdf_report(store_name, sections, path)
+    else:
+        write_html_report(store_name, sections, path)
+    return store_name, path
+
+def generate_reports(csv_path, output_dir, report_format="pdf", workers=None,
+                     start_date=None, end_date=None, coordinates_path="gps_co_ordinates/co_ordinates.csv"):
+    os.makedirs(output_dir, exist_ok=True)
+    stores = load_coordinates(coordinates_path)['storeName'].dropna().unique().tolist()
+
+    start_date = pd.to_datetime(start_date) if start_date else None
+    end_date = pd.to_datetime(end_date) if end_date else None
+
+    # Parse once in the parent; workers memory-map the column files instead of re-reading the CSV
+    shared_directory = tempfile.mkdtemp(prefix="tns_reports_")
+    try:
+        dump_frame(load_data(csv_path), shared_directory, partition_column='storeName')
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared_directory,)) as executor:
+            futures = [
+                executor.submit(render_store_report, store, start_date, end_date, report_format, output_dir)
+                for store in stores
+            ]
+            for future in as_completed(futures):
+                store_name, path = future.result()
+                results[store_name] = path
+                print(f"{store_name}: {path if path else 'no sales in range, skipped'}")
+        return results
+    finally:
+        shutil.rmtree(shared_directory, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render per-store analysis reports for every store in co_ordinates.csv")
+    parser.add_argument("csv", help="Sales export to report on")
+    parser.add_argument("--format", choices=["pdf", "html"], default="pdf")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--start-date", default=None)
+    parser.add_argument("--end-date", default=None)
+    parser.add_argument("--coordinates", default="gps_co_ordinates/co_ordinates.csv")
+    args = parser.parse_args(argv)
+
+    results = generate_reports(args.csv, args.output_dir, args.format, args.workers,
+                               args.start_date, args.end_date, args.coordinates)
+    written = sum(path is not None for path in results.values())
+    print(f"Wrote {written} of {len(results)} store reports to {args.output_dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
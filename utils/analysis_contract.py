@@ -0,0 +1,117 @@
+import sys
+import tempfile
+import tracemalloc
+import pandas as pd
+from streamlit import config
+from streamlit.logger import set_log_level
+from utils.data_loader import load_data
+from utils.shared_frame import dump_frame, load_frame
+from analysis.product_performance_analysis import product_performance_analysis
+from analysis.weekly_sales import weekly_sales_analysis
+from analysis.daily_sales_analysis import daily_sales_analysis
+from analysis.store_performance_analysis import store_performance_analysis
+from analysis.hourly_sales import hourly_sales_analysis
+from analysis.category_breakdown import category_breakdown_analysis
+from analysis.profit_margin_analysis import profit_margin_analysis
+from analysis.top_products import top_products_analysis
+from analysis.category_comparison import category_comparison_analysis
+from analysis.affinity_analysis import affinity_analysis
+from analysis.association_rules import association_rules_analysis
+
+# Largest traced allocation peak an analysis may reach, as a fraction of its input's in-memory size,
+# on top of a fixed allowance for chart and table rendering that does not grow with the data
+MAX_PEAK_RATIO = 0.75
+RENDER_ALLOWANCE_BYTES = 32 * 1024 ** 2
+
+# Memory an analysis may still hold once it returns (result tables go out of scope with the call)
+MAX_RETAINED_RATIO = 0.05
+
+# Every analysis called the way main.py calls it, with the defaults the sidebar would supply
+def contract_cases(data):
+    products = data['productName'].value_counts().index.tolist()
+    stores = data['storeName'].value_counts().index.tolist()
+    brands = data['brandName'].dropna().unique().tolist()
+    categories = data['categoryName'].dropna().unique().tolist()
+    return {
+        'product_performance': lambda frame: product_performance_analysis(frame, products, stores),
+        'weekly_sales': lambda frame: weekly_sales_analysis(frame, [], products),
+        'daily_sales': lambda frame: daily_sales_analysis(frame, products, stores),
+        'store_performance': lambda frame: store_performance_analysis(frame, frame, products, stores),
+        'hourly_sales': lambda frame: hourly_sales_analysis(frame, products, stores),
+        'category_breakdown': lambda frame: category_breakdown_analysis(frame, brands),
+        'profit_margin': lambda frame: profit_margin_analysis(frame, products),
+        'top_products': lambda frame: top_products_analysis(frame, categories),
+        'category_comparison': lambda frame: category_comparison_analysis(frame, categories),
+        'affinity': lambda frame: affinity_analysis(frame),
+        'association_rules': lambda frame: association_rules_analysis(frame),
+    }
+
+# Columns, dtypes and a content hash of a frame, to compare before and after an analysis runs
+def frame_state(data):
+    return {
+        'columns': list(data.columns),
+        'dtypes': data.dtypes.astype(str).tolist(),
+        'rows': len(data),
+        'hash': int(pd.util.hash_pandas_object(data.astype(str), index=True).sum()),
+    }
+
+# Run each analysis on a read-only, memory-mapped copy of the dataset (as the app serves it) and
+# report analyses that change their input or allocate close to a copy of it
+def check_contract(data, cases=None, max_peak_ratio=MAX_PEAK_RATIO, max_retained_ratio=MAX_RETAINED_RATIO):
+    with tempfile.TemporaryDirectory(prefix="tns_contract_") as directory:
+        dump_frame(data, directory)
+        frozen = load_frame(directory)
+        # Measured on the writable original: pandas cannot walk read-only object arrays for deep usage
+        input_bytes = data.memory_usage(deep=True).sum()
+
+        results = []
+        for name, run in (cases or contract_cases(frozen)).items():
+            before = frame_state(frozen)
+            error = None
+            retained, peak = 0, 0
+            try:
+                # The first call pays for lazy imports, chart templates and Streamlit caches; only the second is measured
+                run(frozen)
+                tracemalloc.start()
+                try:
+                    run(frozen)
+                    retained, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            after = frame_state(frozen)
+
+            violations = []
+            if error:
+                violations.append(error)
+            for key in ('columns', 'dtypes', 'rows', 'hash'):
+                if before[key] != after[key]:
+                    violations.append(f"input {key} changed")
+            if peak > max_peak_ratio * input_bytes + RENDER_ALLOWANCE_BYTES:
+                violations.append(f"peak allocation {peak / input_bytes:.2f}x the input")
+            if retained > max_retained_ratio * input_bytes + RENDER_ALLOWANCE_BYTES:
+                violations.append(f"retains {retained / input_bytes:.2f}x the input after returning")
+
+            results.append({
+                'analysis': name,
+                'peak_ratio': round(peak / input_bytes, 3),
+                'retained_ratio': round(retained / input_bytes, 3),
+                'violations': violations,
+            })
+
+    return pd.DataFrame(results)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m utils.analysis_contract <sales.csv>")
+
+    # Analyses run without a Streamlit server; silence the bare-mode warnings for every widget call
+    # (the config is parsed first, since parsing resets every Streamlit logger to logger.level)
+    config.get_config_options()
+    set_log_level("error")
+    pd.set_option("mode.copy_on_write", True)
+
+    report = check_contract(load_data(sys.argv[1]))
+    print(report.to_string(index=False))
+    sys.exit(1 if report['violations'].map(len).any() else 0)
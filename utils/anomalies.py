@@ -0,0 +1,75 @@
+import warnings
+import numpy as np
+import pandas as pd
+from utils.time_series import cube_group_sums, cube_rows
+
+# Each day is compared with the same weekday in the previous weeks
+DEFAULT_BASELINE_WEEKS = 8
+
+# Robust z-score beyond which a day is flagged
+DEFAULT_THRESHOLD = 3.5
+
+# Floor of the robust spread, as a fraction of the baseline median, so series that barely vary are not
+# flagged for ordinary small changes
+MIN_RELATIVE_SCALE = 0.1
+
+# Series processed at a time; bounds the (weeks, series, days) baseline window in memory
+DEFAULT_BLOCK_ROWS = 2048
+
+# Robust seasonal z-scores of every row of a (series, days) matrix. Each day's baseline is the median of the
+# same weekday over the previous `weeks` weeks; the spread is the MAD of the series' residuals over its whole
+# active history (floored at MIN_RELATIVE_SCALE of the baseline). Returns (baseline, z-score), NaN where the
+# baseline is incomplete or zero.
+def seasonal_robust_zscores(matrix, weeks=DEFAULT_BASELINE_WEEKS, block_rows=DEFAULT_BLOCK_ROWS):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n_series, n_days = matrix.shape
+    baseline = np.full(matrix.shape, np.nan)
+    zscores = np.full(matrix.shape, np.nan)
+    first_day = 7 * weeks
+    if n_days <= first_day:
+        return baseline, zscores
+
+    for start in range(0, n_series, block_rows):
+        block = matrix[start:start + block_rows]
+        # The same weekday 1..weeks weeks earlier, stacked on a leading axis and sorted there for the median
+        window = np.stack([block[:, first_day - 7 * lag:n_days - 7 * lag] for lag in range(1, weeks + 1)])
+        window.sort(axis=0)
+        median = (window[(weeks - 1) // 2] + window[weeks // 2]) / 2
+
+        active = median > 0
+        residual = block[:, first_day:] - median
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            # Series never active in the block have an all-NaN residual row
+            warnings.simplefilter('ignore', RuntimeWarning)
+            spread = 1.4826 * np.nanmedian(np.where(active, np.abs(residual), np.nan), axis=1, keepdims=True)
+            scale = np.maximum(np.nan_to_num(spread), MIN_RELATIVE_SCALE * median)
+            z = np.where(active, residual / scale, np.nan)
+        baseline[start:start + block_rows, first_day:] = median
+        zscores[start:start + block_rows, first_day:] = z
+    return baseline, zscores
+
+# Series of the selected cube rows (all rows by default): summed per store (level="store") or kept per
+# product and store. Returns (labels frame, matrix).
+def anomaly_series(cube, metric, level="store", rows=None):
+    rows = np.arange(len(cube['products'])) if rows is None else np.asarray(rows)
+    if level != "store":
+        return pd.DataFrame({'productName': cube['products'][rows], 'storeName': cube['stores'][rows]}), cube_rows(cube, metric, rows)
+
+    stores, matrix = cube_group_sums(cube, metric, rows, cube['stores'][rows])
+    return pd.DataFrame({'storeName': stores}), matrix
+
+# Flagged days of the selected series, strongest first
+def detect_anomalies(cube, metric='total_sales', level="store", rows=None, threshold=DEFAULT_THRESHOLD, weeks=DEFAULT_BASELINE_WEEKS):
+    labels, matrix = anomaly_series(cube, metric, level, rows)
+    baseline, zscores = seasonal_robust_zscores(matrix, weeks)
+    with np.errstate(invalid='ignore'):
+        series, days = np.nonzero(np.abs(zscores) >= threshold)
+
+    flagged = labels.iloc[series].reset_index(drop=True)
+    flagged['orderDate'] = cube['dates'][days]
+    flagged['value'] = matrix[series, days]
+    flagged['baseline'] = baseline[series, days]
+    flagged['z_score'] = zscores[series, days]
+    flagged['direction'] = np.where(flagged['z_score'] < 0, 'drop', 'spike')
+    order = np.argsort(-np.abs(flagged['z_score'].to_numpy()), kind='stable')
+    return flagged.iloc[order].reset_index(drop=True)
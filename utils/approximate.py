@@ -0,0 +1,246 @@
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+# Rows kept by the stratified sample; estimates run on this many rows regardless of dataset size
+DEFAULT_SAMPLE_ROWS = 200_000
+
+# Every stratum keeps at least this many rows so its variance can be estimated
+MIN_ROWS_PER_STRATUM = 30
+
+# Sample strata are store x period, the finest of these periods (day, week, month, year) whose strata can all
+# get MIN_ROWS_PER_STRATUM rows within the sample budget
+STRATUM_PERIODS = ['D', 'W', 'M', 'Y']
+
+# HyperLogLog precision: 2**p registers per sketch, relative standard error 1.04 / sqrt(2**p)
+DEFAULT_HLL_PRECISION = 10
+
+# Bytes of registers per distinct-count kind across all (store, day) sketches; the precision is lowered (not
+# below MIN_HLL_PRECISION) until the sketches fit
+DEFAULT_HLL_BUDGET_BYTES = 32 * 1024 ** 2
+MIN_HLL_PRECISION = 6
+
+class HyperLogLog:
+    def __init__(self, precision=DEFAULT_HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    def add(self, values):
+        index, rank = _hll_index_and_rank(values, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def estimate(self):
+        return _hll_estimate(self.registers[np.newaxis, :])[0]
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+def _bit_length(values):
+    # Exact bit length of uint64 values, split into 32-bit halves so the float conversion is lossless
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+def _hll_index_and_rank(values, precision):
+    hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = hashes & np.uint64((1 << (64 - precision)) - 1)
+    # Position of the leftmost 1-bit in the remaining 64 - p bits
+    rank = (64 - precision) - _bit_length(remainder) + 1
+    return index, rank.astype(np.uint8)
+
+def _hll_estimate(registers):
+    # Row-wise HyperLogLog estimate with the small-range (linear counting) correction
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.power(2.0, -registers.astype(np.float64)).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+# One sketch per group in a single pass: returns a (n_groups, 2**p) register matrix
+def hll_registers_by_group(values, group_codes, n_groups, precision=DEFAULT_HLL_PRECISION):
+    m = 1 << precision
+    registers = np.zeros(n_groups * m, dtype=np.uint8)
+    valid = pd.notna(values).to_numpy() if isinstance(values, pd.Series) else pd.notna(values)
+    index, rank = _hll_index_and_rank(np.asarray(values)[valid], precision)
+    np.maximum.at(registers, np.asarray(group_codes)[valid] * m + index, rank)
+    return registers.reshape(n_groups, m)
+
+# Store x period stratum of every row, at the finest of STRATUM_PERIODS with at most max_strata strata
+def _stratum_codes(data, order_day, max_strata):
+    naive_day = order_day.dt.tz_localize(None) if order_day.dt.tz is not None else order_day
+    for period in STRATUM_PERIODS:
+        start = naive_day if period == 'D' else naive_day.dt.to_period(period).dt.start_time
+        codes = pd.DataFrame({'storeName': data['storeName'], 'period': start}).groupby(
+            ['storeName', 'period'], sort=False, dropna=False).ngroup().to_numpy()
+        if codes.max(initial=-1) < max_strata:
+            break
+    return codes
+
+# Draw a sample of at most max_rows rows stratified by store and period, keeping each stratum's population and
+# sample sizes. Each stratum gets min_per_stratum rows (or all of its rows) and the rest of the budget is
+# split in proportion to the rows left, so the sample size does not grow with the number of strata.
+def stratified_sample(data, max_rows=DEFAULT_SAMPLE_ROWS, min_per_stratum=MIN_ROWS_PER_STRATUM, seed=0):
+    order_day = data['orderDate'].dt.normalize()
+    codes = _stratum_codes(data, order_day, max(max_rows // min_per_stratum, 1))
+
+    population = np.bincount(codes)
+    if len(data) <= max_rows:
+        sample_sizes = population
+    else:
+        # Coarsened strata can still outnumber the budget (stores alone); the floor then shrinks to fit
+        floor = np.minimum(population, min(min_per_stratum, max_rows // len(population)))
+        remaining = population - floor
+        extra = np.floor((max_rows - floor.sum()) * remaining / max(remaining.sum(), 1))
+        sample_sizes = np.maximum(floor + extra.astype(np.int64), 1)
+
+    # Rank rows inside their stratum in a random order and keep the first n_h of each
+    rng = np.random.default_rng(seed)
+    permutation = rng.permutation(len(data))
+    rank = pd.Series(codes[permutation]).groupby(codes[permutation]).cumcount().to_numpy()
+    keep = np.sort(permutation[rank < sample_sizes[codes[permutation]]])
+
+    sample = data.iloc[keep].reset_index(drop=True)
+    kept_codes = codes[keep]
+    return sample.assign(
+        orderDay=order_day.iloc[keep].to_numpy(),
+        stratum=kept_codes,
+        stratum_size=population[kept_codes],
+        stratum_sample_size=sample_sizes[kept_codes],
+        sample_weight=population[kept_codes] / sample_sizes[kept_codes],
+    )
+
+# Build the sample and per-(store, day) distinct-count sketches once per dataset. The sketch precision drops
+# with the number of (store, day) cells so the registers stay within hll_budget bytes per kind.
+def build_approximate_view(data, max_rows=DEFAULT_SAMPLE_ROWS, precision=DEFAULT_HLL_PRECISION, seed=0, hll_budget=DEFAULT_HLL_BUDGET_BYTES):
+    strata = pd.DataFrame({'storeName': data['storeName'], 'orderDay': data['orderDate'].dt.normalize()})
+    grouped = strata.groupby(['storeName', 'orderDay'], sort=False, dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    strata_index = grouped.size().reset_index()[['storeName', 'orderDay']]
+    while precision > MIN_HLL_PRECISION and len(strata_index) << precision > hll_budget:
+        precision -= 1
+
+    return {
+        'sample': stratified_sample(data, max_rows=max_rows, seed=seed),
+        'strata': strata_index,
+        'invoice_registers': hll_registers_by_group(data['invoice'], codes, len(strata_index), precision),
+        'product_registers': hll_registers_by_group(data['productName'], codes, len(strata_index), precision),
+        'relative_error': 1.04 / np.sqrt(1 << precision),
+        'population_rows': len(data),
+    }
+
+def _align_timezone(value, reference):
+    # Compare sidebar dates against orderDay whether or not the column is timezone-aware
+    value = pd.Timestamp(value)
+    tz = reference.dt.tz
+    if tz is not None and value.tzinfo is None:
+        return value.tz_localize(tz)
+    if tz is None and value.tzinfo is not None:
+        return value.tz_localize(None)
+    return value
+
+def _date_mask(order_day, start_date, end_date):
+    mask = np.ones(len(order_day), dtype=bool)
+    if start_date is not None:
+        mask &= (order_day >= _align_timezone(start_date, order_day)).to_numpy()
+    if end_date is not None:
+        mask &= (order_day <= _align_timezone(end_date, order_day)).to_numpy()
+    return mask
+
+def _strata_mask(view, stores, start_date, end_date):
+    strata = view['strata']
+    return strata['storeName'].isin(stores).to_numpy() & _date_mask(strata['orderDay'], start_date, end_date)
+
+# Apply the sidebar filters to the sample; products or stores of None keep everything
+def filter_sample(view, products, stores, start_date, end_date):
+    sample = view['sample']
+    mask = _date_mask(sample['orderDay'], start_date, end_date)
+    if products is not None:
+        mask &= sample['productName'].isin(products).to_numpy()
+    if stores is not None:
+        mask &= sample['storeName'].isin(stores).to_numpy()
+    return sample[mask]
+
+# Distinct invoices and products per store for a date range, by merging the stratum sketches
+def approximate_distinct_counts(view, stores, start_date, end_date):
+    mask = _strata_mask(view, stores, start_date, end_date)
+    selected = view['strata'][mask]
+    rows = np.flatnonzero(mask)
+    store_codes, store_names = pd.factorize(selected['storeName'])
+
+    counts = pd.DataFrame({'storeName': store_names})
+    for name, key in (('distinct_invoices', 'invoice_registers'), ('distinct_products', 'product_registers')):
+        registers = view[key][rows]
+        merged = np.zeros((len(store_names), registers.shape[1]), dtype=np.uint8)
+        np.maximum.at(merged, store_codes, registers)
+        estimate = _hll_estimate(merged) if len(store_names) else np.array([])
+        counts[name] = np.round(estimate)
+        counts[f'{name}_ci'] = np.round(estimate * view['relative_error'] * 1.96)
+    return counts
+
+# Distinct count over all selected stores and days; `key` is 'invoice_registers' or 'product_registers'
+def approximate_distinct_total(view, key, stores, start_date, end_date):
+    mask = _strata_mask(view, stores, start_date, end_date)
+    if not mask.any():
+        return 0.0, 0.0
+    estimate = _hll_estimate(view[key][mask].max(axis=0)[np.newaxis, :])[0]
+    return estimate, estimate * view['relative_error'] * 1.96
+
+# Horvitz-Thompson totals per group with stratified-sampling confidence intervals
+# `values` maps output column names to line-level Series aligned with `sample`
+def estimate_totals(sample, by, values, confidence=0.95):
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    parts = {column: sample[column] for column in by}
+    parts['stratum'] = sample['stratum']
+    parts['stratum_size'] = sample['stratum_size']
+    parts['stratum_sample_size'] = sample['stratum_sample_size']
+    for name, series in values.items():
+        parts[name] = series
+        parts[f'{name}__sq'] = series ** 2
+
+    grouped = pd.DataFrame(parts).groupby(by + ['stratum'], sort=False, observed=True, dropna=False).agg(
+        {**{name: 'sum' for name in values},
+         **{f'{name}__sq': 'sum' for name in values},
+         'stratum_size': 'first',
+         'stratum_sample_size': 'first'}
+    )
+
+    population = grouped['stratum_size'].to_numpy(dtype=np.float64)
+    sampled = grouped['stratum_sample_size'].to_numpy(dtype=np.float64)
+    finite_population = 1 - sampled / population
+
+    estimates = {}
+    for name in values:
+        total = grouped[name].to_numpy(dtype=np.float64)
+        squares = grouped[f'{name}__sq'].to_numpy(dtype=np.float64)
+        mean = total / sampled
+        # Within-stratum variance of y * 1[group]; rows of other groups in the stratum count as zeros
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(sampled > 1, (squares - sampled * mean ** 2) / (sampled - 1), 0.0)
+        variance = np.clip(variance, 0, None)
+        estimates[name] = total * population / sampled
+        estimates[f'{name}__var'] = population ** 2 * finite_population * variance / sampled
+
+    per_stratum = pd.DataFrame(estimates, index=grouped.index)
+    if by:
+        result = per_stratum.groupby(level=list(range(len(by))), sort=False).sum()
+    else:
+        result = per_stratum.sum().to_frame().T
+
+    # Each estimate is followed by its confidence-interval half width
+    columns = {}
+    for name in values:
+        columns[name] = result[name]
+        columns[f'{name}_ci'] = z * np.sqrt(result[f'{name}__var'])
+    result = pd.DataFrame(columns, index=result.index)
+
+    return result.reset_index() if by else result.reset_index(drop=True)
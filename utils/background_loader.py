@@ -0,0 +1,126 @@
+import io
+import threading
+import pandas as pd
+from utils.data_loader import load_data_with_report
+from utils.schema import apply_schema, detect_layout, merge_reports, source_columns, source_dtypes
+
+# Rows parsed per chunk. The first chunk is kept small so the app has a preview to analyse within a second or so
+DEFAULT_CHUNK_ROWS = 50_000
+DEFAULT_FIRST_CHUNK_ROWS = 5_000
+
+# Phases reported while a file is ingested
+CSV_READ = "CSV read"
+DATE_PARSE = "date parse"
+TIME_PARSE = "time parse"
+INDEX_BUILD = "index build"
+DONE = "done"
+
+# Parses an uploaded CSV on a worker thread in chunks, reporting the current phase and rows parsed.
+# Each chunk is mapped to the canonical schema and validated as it arrives. The chunks parsed so far can
+# be analysed through `preview()`; once every chunk is parsed the whole frame and the merged schema report
+# are handed to `finish(data, report)` (registering and indexing it) and its return value becomes `result`.
+# With `columns`, only the source columns mapping to those canonical columns are read.
+class BackgroundLoader:
+    def __init__(self, payload, finish, chunk_rows=DEFAULT_CHUNK_ROWS, first_chunk_rows=DEFAULT_FIRST_CHUNK_ROWS, columns=None):
+        self._payload = payload
+        self._finish = finish
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self.first_chunk_rows = first_chunk_rows
+        self._lock = threading.Lock()
+        self._thread = None
+        self._done = threading.Event()
+        self._chunks = []
+        self._reports = []
+        self._preview = None
+        self.phase = CSV_READ
+        self.rows = 0
+        self.bytes_read = 0
+        self.total_bytes = len(payload)
+        self.result = None
+        self.error = None
+
+    # Start the worker; calling it again (another session joining the same load) is a no-op
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="background-data-load", daemon=True)
+                self._thread.start()
+        return self
+
+    def _set_phase(self, phase):
+        with self._lock:
+            self.phase = phase
+
+    def _run(self):
+        try:
+            buffer = io.BytesIO(self._payload)
+            # The layout and key dtypes come from the header, so every chunk is read and mapped the same way
+            header = pd.read_csv(buffer, nrows=0).columns
+            buffer.seek(0)
+            layout, usecols = (detect_layout(header), None) if self.columns is None else source_columns(header, self.columns)
+            with pd.read_csv(buffer, chunksize=self.chunk_rows, usecols=usecols, dtype=source_dtypes(header, layout)) as reader:
+                size = self.first_chunk_rows
+                while True:
+                    try:
+                        chunk = reader.get_chunk(size)
+                    except StopIteration:
+                        break
+                    size = self.chunk_rows
+
+                    chunk, report = apply_schema(chunk, layout, on_phase=self._set_phase)
+                    with self._lock:
+                        self._chunks.append(chunk)
+                        self._reports.append(report)
+                        self.rows += len(chunk)
+                        self.bytes_read = buffer.tell()
+                        self.phase = CSV_READ
+
+            # The preview stays available while the full frame is registered and indexed
+            self._set_phase(INDEX_BUILD)
+            with self._lock:
+                chunks = list(self._chunks)
+            # A header-only file yields no chunks
+            if chunks:
+                data, report = pd.concat(chunks, ignore_index=True), merge_reports(self._reports)
+            else:
+                data, report = load_data_with_report(io.BytesIO(self._payload), self.columns)
+            del chunks
+            self.result = self._finish(data, report)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._lock:
+                self._chunks, self._reports, self._preview, self._payload = [], [], None, None
+                self.phase = DONE
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    # Everything parsed so far as one frame (None before the first chunk or once loading is over)
+    def preview(self):
+        with self._lock:
+            chunks = list(self._chunks)
+            preview = self._preview
+        if not chunks:
+            return None
+        if preview is None or len(preview) != sum(len(chunk) for chunk in chunks):
+            preview = pd.concat(chunks, ignore_index=True)
+            with self._lock:
+                if self._chunks:
+                    self._preview = preview
+        return preview
+
+    def progress(self):
+        with self._lock:
+            fraction = self.bytes_read / self.total_bytes if self.total_bytes else 1.0
+            return {
+                'phase': self.phase,
+                'rows': self.rows,
+                'fraction': 1.0 if self.phase == DONE else min(fraction, 1.0),
+            }
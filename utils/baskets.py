@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from utils.data_loader import row_hours
+
+# Per-basket figures summed by the rollups; averages divide them by the basket count
+BASKET_METRICS = ['basket_value', 'basket_size', 'item_count', 'basket_margin']
+
+# One row per invoice from a single grouped reduction over the line items: value (selling price x quantity),
+# size (distinct products), item count (units) and margin, with the store, day and hour (NaN without a time
+# column) of its first line
+def basket_table(data):
+    invoices = data['invoice'].to_numpy(dtype=object)
+    codes, labels = pd.factorize(invoices)
+    valid = codes >= 0
+    codes = codes[valid]
+    n_baskets = len(labels)
+
+    quantity = data['quantity'].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+    selling = data['sellingPrice'].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+    cost = data['costPrice'].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+    value = np.nan_to_num(selling * quantity)
+    margin = np.nan_to_num((selling - cost) * quantity)
+
+    # Distinct products per basket: count the distinct (basket, product) pairs
+    product_codes, products = pd.factorize(data['productName'].to_numpy(dtype=object)[valid])
+    pairs = np.unique(codes.astype(np.int64) * (len(products) + 1) + (product_codes + 1))
+    size = np.bincount(pairs // (len(products) + 1), minlength=n_baskets)
+
+    # pd.factorize numbers invoices in order of appearance, so each basket's first line is where its code first occurs
+    _, first = np.unique(codes, return_index=True)
+    first_rows = np.flatnonzero(valid)[first]
+
+    return pd.DataFrame({
+        'invoice': labels,
+        'storeName': data['storeName'].to_numpy(dtype=object)[first_rows],
+        'orderDate': data['orderDate'].iloc[first_rows].dt.normalize().to_numpy(),
+        'hour': row_hours(data).iloc[first_rows].to_numpy(dtype=np.float64, na_value=np.nan),
+        'basket_value': np.bincount(codes, weights=value, minlength=n_baskets),
+        'basket_size': size,
+        'item_count': np.bincount(codes, weights=np.nan_to_num(quantity), minlength=n_baskets),
+        'basket_margin': np.bincount(codes, weights=margin, minlength=n_baskets),
+    })
+
+# Basket counts and summed basket figures per store, day and hour (baskets without a time get hour -1).
+# Small enough that every store-hour view is a filter and a sum over it, not another pass over the lines.
+def basket_rollup(baskets):
+    keys = baskets[['storeName', 'orderDate']].assign(hour=baskets['hour'].fillna(-1).astype(np.int8))
+    grouped = baskets[BASKET_METRICS].groupby([keys['storeName'], keys['orderDate'], keys['hour']], sort=True)
+    rollup = grouped.sum()
+    rollup.insert(0, 'baskets', grouped.size())
+    return rollup.reset_index()
+
+# Average basket figures of the selected stores between start and end, per the `by` columns of the rollup
+# (default: store and hour; empty for a single overall row)
+def average_baskets(rollup, stores, start_date, end_date, by=('storeName', 'hour')):
+    selected = rollup[rollup['storeName'].isin(stores) & rollup['orderDate'].between(start_date, end_date)]
+    columns = ['baskets'] + BASKET_METRICS
+    if by:
+        totals = selected.groupby(list(by), sort=True)[columns].sum()
+    else:
+        totals = selected[columns].sum().to_frame().T
+    averages = totals[BASKET_METRICS].div(totals['baskets'], axis=0).add_prefix('avg_')
+    return pd.concat([totals[['baskets']], averages], axis=1).reset_index(drop=not by)
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from utils.time_series import DEFAULT_BLOCK_ROWS
+
+# Cumulative revenue share bounds: A up to 80%, B up to 95%, C the rest
+ABC_THRESHOLDS = (0.80, 0.95)
+
+# Coefficient of variation bounds of weekly demand: X up to 0.5, Y up to 1.0, Z above (or no demand)
+XYZ_THRESHOLDS = (0.5, 1.0)
+
+# Weeks of demand used for the variability measure
+DEFAULT_XYZ_WEEKS = 26
+
+ALL_STORES = "All stores"
+
+# ABC class of each item within its group, from one sort by (group, revenue descending) and one cumulative sum.
+# An item is A while the share of the items ranked above it is still under the A bound, and so on.
+def abc_classes(revenue, group_codes, thresholds=ABC_THRESHOLDS):
+    order = np.lexsort((-revenue, group_codes))
+    sorted_revenue = revenue[order]
+    sorted_groups = group_codes[order]
+
+    running = np.cumsum(sorted_revenue)
+    group_starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, len(order)])
+    offset = np.repeat(running[group_starts] - sorted_revenue[group_starts], group_sizes)
+    group_total = np.repeat(np.add.reduceat(sorted_revenue, group_starts) if len(order) else [], group_sizes)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cumulative_share = np.where(group_total > 0, (running - offset) / group_total, 1.0)
+        share_before = np.where(group_total > 0, (running - offset - sorted_revenue) / group_total, 1.0)
+        revenue_share = np.where(group_total > 0, sorted_revenue / group_total, 0.0)
+
+    sorted_classes = np.select([share_before < thresholds[0], share_before < thresholds[1]], ['A', 'B'], 'C')
+    sorted_classes[sorted_revenue <= 0] = 'C'
+
+    classes = np.empty(len(order), dtype=object)
+    classes[order] = sorted_classes
+    shares = np.empty(len(order))
+    shares[order] = revenue_share
+    cumulative = np.empty(len(order))
+    cumulative[order] = cumulative_share
+    return classes, shares, cumulative
+
+# Coefficient of variation of weekly demand per row of a (series, days) matrix, over the last `weeks` full weeks
+def weekly_demand_cv(daily_quantity, weeks=DEFAULT_XYZ_WEEKS):
+    weeks = min(weeks, daily_quantity.shape[1] // 7)
+    if weeks == 0:
+        return np.full(daily_quantity.shape[0], np.nan)
+    weekly = daily_quantity[:, -weeks * 7:].reshape(daily_quantity.shape[0], weeks, 7).sum(axis=2)
+    mean = weekly.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(mean > 0, weekly.std(axis=1) / mean, np.nan)
+
+# weekly_demand_cv of a sparse (series, days) matrix, densifying a block of rows of the last weeks at a time
+def sparse_weekly_demand_cv(daily_quantity, weeks=DEFAULT_XYZ_WEEKS, block_rows=DEFAULT_BLOCK_ROWS):
+    recent = daily_quantity[:, max(daily_quantity.shape[1] - weeks * 7, 0):].tocsr()
+    demand_cv = np.empty(recent.shape[0])
+    for start in range(0, recent.shape[0], block_rows):
+        demand_cv[start:start + block_rows] = weekly_demand_cv(recent[start:start + block_rows].toarray(), weeks)
+    return demand_cv
+
+def xyz_classes(demand_cv, thresholds=XYZ_THRESHOLDS):
+    return np.select([demand_cv <= thresholds[0], demand_cv <= thresholds[1]], ['X', 'Y'], 'Z').astype(object)
+
+# ABC/XYZ classes of every product within every store, plus every product across all stores (storeName "All stores"),
+# from the daily cube's product x store series
+def classify_products(cube, weeks=DEFAULT_XYZ_WEEKS):
+    revenue = np.asarray(cube['values']['total_sales'].sum(axis=1)).ravel()
+    quantity = cube['values']['total_quantity']
+
+    # Product totals across stores: one sparse product x series matrix sums the store series
+    product_codes, products = pd.factorize(cube['products'], sort=True)
+    to_products = sp.csr_matrix(
+        (np.ones(len(product_codes)), (product_codes, np.arange(len(product_codes)))),
+        shape=(len(products), len(product_codes)),
+    )
+
+    store_codes, _ = pd.factorize(cube['stores'])
+    frames = []
+    for names, stores, group_codes, item_revenue, item_quantity in (
+        (cube['products'], cube['stores'], store_codes, revenue, quantity),
+        (np.asarray(products, dtype=object), np.full(len(products), ALL_STORES, dtype=object),
+         np.zeros(len(products), dtype=np.int64), to_products @ revenue, to_products @ quantity),
+    ):
+        abc, share, cumulative = abc_classes(np.asarray(item_revenue, dtype=np.float64), group_codes)
+        demand_cv = sparse_weekly_demand_cv(item_quantity, weeks)
+        xyz = xyz_classes(demand_cv)
+        frames.append(pd.DataFrame({
+            'productName': names,
+            'storeName': stores,
+            'revenue': item_revenue,
+            'revenue_share': share * 100,
+            'cumulative_share': cumulative * 100,
+            'demand_cv': demand_cv,
+            'abc': abc,
+            'xyz': xyz,
+            'class': abc + xyz,
+        }))
+
+    classes = pd.concat(frames, ignore_index=True)
+    return classes.sort_values(by=['storeName', 'revenue'], ascending=[True, False], ignore_index=True)
+
+# Products of the given classes within one store (or ALL_STORES); empty class lists mean any class
+def products_in_classes(classes, store, abc=(), xyz=()):
+    rows = classes['storeName'] == store
+    if abc:
+        rows &= classes['abc'].isin(abc)
+    if xyz:
+        rows &= classes['xyz'].isin(xyz)
+    return classes.loc[rows, 'productName'].tolist()
@@ -1,20 +1,49 @@
+import calendar
+import numpy as np
 import pandas as pd
-import streamlit as st
+from utils.schema import apply_schema, detect_layout, source_columns, source_dtypes
 
-def load_data(uploaded_file):
-    data = pd.read_csv(uploaded_file)
-    data['orderDate'] = pd.to_datetime(data['orderDate'], errors='coerce', dayfirst=True)
-    data['time'] = data['time'].apply(parse_time_dynamic)
-    return data
+def load_data(uploaded_file, columns=None):
+    return load_data_with_report(uploaded_file, columns)[0]
 
-def parse_time_dynamic(time_str):
-    try:
-        return pd.to_datetime(time_str, format='%H:%M:%S.%fZ').time()
-    except ValueError:
-        try:
-            return pd.to_datetime(time_str, format='%H:%M:%S').time()
-        except ValueError:
-            try:
-                return pd.to_datetime(time_str, format='%H:%M').time()
-            except ValueError:
-                return None
+# Read an export in any registered layout (utils.schema); returns the canonical, validated frame and the
+# schema report (layout used and quarantined rows). With `columns`, only the source columns mapping to
+# those canonical columns are read.
+def load_data_with_report(uploaded_file, columns=None):
+    header = pd.read_csv(uploaded_file, nrows=0).columns
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+    layout, usecols = (detect_layout(header), None) if columns is None else source_columns(header, columns)
+    return apply_schema(pd.read_csv(uploaded_file, usecols=usecols, dtype=source_dtypes(header, layout)), layout)
+
+# Vectorized hour of day from parsed time values (datetime.time or "HH:MM:SS" strings); <NA> where unknown
+def hour_of_day(time_values):
+    elapsed = pd.to_timedelta(pd.Series(time_values).astype(str).str.rstrip('Z'), errors='coerce')
+    return (elapsed // pd.Timedelta(hours=1)).astype('Int64')
+
+# Hour of day of every row of a loaded frame, <NA> where unknown: its eventHour codes when it has them,
+# otherwise parsed from the time column
+def row_hours(data):
+    if 'eventHour' in data:
+        hours = data['eventHour']
+        return hours.astype('Int64').mask(hours < 0)
+    if 'time' in data:
+        return hour_of_day(data['time'])
+    return pd.Series(pd.NA, index=data.index, dtype='Int64')
+
+DAY_NAMES = list(calendar.day_name)
+MONTH_NAMES = list(calendar.month_name)[1:]
+WEEK_LABELS = [f"Week {week}" for week in range(1, 6)]
+
+# Day name, month name and week-of-month label ("Week 1" = days 1-7) for a datetime Series.
+# Each label is looked up from a short list, so rows share one string per label; missing dates stay None
+def calendar_labels(dates):
+    def lookup(codes, names):
+        labels = np.array(names + [None], dtype=object)
+        return pd.Series(labels[codes.fillna(-1).astype(int).to_numpy()], index=dates.index)
+
+    return {
+        'day': lookup(dates.dt.dayofweek, DAY_NAMES),
+        'month': lookup(dates.dt.month - 1, MONTH_NAMES),
+        'week_label': lookup((dates.dt.day - 1) // 7, WEEK_LABELS),
+    }
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from utils.shared_frame import dump_frame, load_frame
+
+# Unreferenced datasets kept around for a quick re-open before they are evicted
+DEFAULT_MAX_IDLE = 2
+
+def fingerprint_bytes(payload):
+    return hashlib.blake2b(payload, digest_size=20).hexdigest()
+
+# Process-wide registry of parsed datasets keyed by content fingerprint. Every session that opens
+# the same file gets the same read-only, memory-mapped frame; entries are reference counted by
+# session leases and evicted once unreferenced and beyond `max_idle`.
+class DatasetRegistry:
+    def __init__(self, storage_dir=None, max_idle=DEFAULT_MAX_IDLE):
+        self.storage_dir = storage_dir or tempfile.mkdtemp(prefix="tns_datasets_")
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._idle = OrderedDict()
+        self._loading = {}
+        self._building = {}
+
+    def __contains__(self, fingerprint):
+        with self._lock:
+            return fingerprint in self._entries
+
+    # A lease on the dataset if it is registered (checked and taken under one lock), otherwise None
+    def acquire_loaded(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return None
+            entry['refcount'] += 1
+            entry['last_used'] = time.time()
+            self._idle.pop(fingerprint, None)
+            return DatasetLease(self, fingerprint)
+
+    # Return a lease on the dataset, parsing it with `loader()` only if no session has it yet
+    def acquire(self, fingerprint, loader):
+        while True:
+            with self._lock:
+                entry = self._entries.get(fingerprint)
+                if entry is not None:
+                    entry['refcount'] += 1
+                    entry['last_used'] = time.time()
+                    self._idle.pop(fingerprint, None)
+                    return DatasetLease(self, fingerprint)
+
+                loading = self._loading.get(fingerprint)
+                if loading is None:
+                    loading = self._loading[fingerprint] = threading.Event()
+                    break
+
+            # Another session is parsing the same file; wait for it instead of parsing twice
+            loading.wait()
+
+        try:
+            directory = os.path.join(self.storage_dir, fingerprint)
+            dump_frame(loader(), directory)
+            data = load_frame(directory)
+            with self._lock:
+                self._entries[fingerprint] = {
+                    'data': data,
+                    'directory': directory,
+                    'refcount': 1,
+                    'last_used': time.time(),
+                    'resources': {},
+                }
+            return DatasetLease(self, fingerprint)
+        finally:
+            with self._lock:
+                self._loading.pop(fingerprint).set()
+
+    def release(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return
+            entry['refcount'] -= 1
+            if entry['refcount'] > 0:
+                return
+            self._idle[fingerprint] = entry
+            evicted = []
+            while len(self._idle) > self.max_idle:
+                stale, _ = self._idle.popitem(last=False)
+                evicted.append(self._entries.pop(stale)['directory'])
+
+        # Open memory maps stay valid after their files are unlinked
+        for directory in evicted:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def data(self, fingerprint):
+        with self._lock:
+            return self._entries[fingerprint]['data']
+
+    # Per-dataset derived objects (filter caches, samples) shared by every session on the dataset, each built once
+    def resource(self, fingerprint, name, factory):
+        key = (fingerprint, name)
+        while True:
+            with self._lock:
+                entry = self._entries[fingerprint]
+                if name in entry['resources']:
+                    return entry['resources'][name]
+
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = threading.Event()
+                    break
+
+            # Another session is building the same resource; wait for it instead of building twice
+            building.wait()
+
+        try:
+            value = factory(entry['data'])
+            with self._lock:
+                return entry['resources'].setdefault(name, value)
+        finally:
+            with self._lock:
+                self._building.pop(key).set()
+
+    # Rows of every registered dataset, by fingerprint
+    def datasets(self):
+        with self._lock:
+            return {fingerprint: len(entry['data']) for fingerprint, entry in self._entries.items()}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'datasets': len(self._entries),
+                'idle': len(self._idle),
+                'references': sum(entry['refcount'] for entry in self._entries.values()),
+            }
+
+# A session's reference to a registry dataset; released explicitly or when the session is garbage collected
+class DatasetLease:
+    def __init__(self, registry, fingerprint):
+        self.registry = registry
+        self.fingerprint = fingerprint
+        self._finalizer = weakref.finalize(self, registry.release, fingerprint)
+
+    @property
+    def data(self):
+        return self.registry.data(self.fingerprint)
+
+    def resource(self, name, factory):
+        return self.registry.resource(self.fingerprint, name, factory)
+
+    def release(self):
+        self._finalizer()
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Products need at least this many price points (after removing each series' mean) to get an elasticity
+MIN_PRICE_POINTS = 8
+
+# Relative spread of log prices below which a product is treated as never repriced
+MIN_LOG_PRICE_SPREAD = 1e-3
+
+# Margin check: the last RECENT_DAYS of the dataset against the RECENT_DAYS before them
+RECENT_DAYS = 28
+
+# Average price moves smaller than this (relative) are not counted as price changes
+MIN_PRICE_CHANGE = 0.02
+
+# Quantity, revenue and margin sold per product, store, day and selling price. Lines without a positive
+# price or quantity cannot enter a log-log fit and are dropped.
+def price_points(data):
+    valid = (data['sellingPrice'] > 0) & (data['quantity'] > 0) & data['orderDate'].notna()
+    lines = pd.DataFrame({
+        'productName': data['productName'],
+        'storeName': data['storeName'],
+        'orderDate': data['orderDate'].dt.normalize(),
+        'price': data['sellingPrice'],
+        'quantity': data['quantity'],
+        'revenue': data['sellingPrice'] * data['quantity'],
+        'margin': (data['sellingPrice'] - data['costPrice']) * data['quantity'],
+    })[valid]
+    grouped = lines.groupby(['productName', 'storeName', 'orderDate', 'price'], sort=True, observed=True)
+    return grouped[['quantity', 'revenue', 'margin']].sum().reset_index()
+
+# Log-log price elasticity of every product in one batched least-squares pass:
+#   log(quantity) = store effect + elasticity * log(price)
+# per product, fitted by removing each product x store series' means and then solving every product's
+# one-variable normal equation from grouped sums (bincounts), so no regression is run per product.
+def fit_elasticities(points):
+    log_price = np.log(points['price'].to_numpy(dtype=np.float64))
+    log_quantity = np.log(points['quantity'].to_numpy(dtype=np.float64))
+    product_codes, products = pd.factorize(points['productName'], sort=True)
+    series_codes = points.groupby(['productName', 'storeName'], sort=True).ngroup().to_numpy()
+    n_products, n_series = len(products), series_codes.max() + 1 if len(series_codes) else 0
+
+    def grouped_sum(codes, values, size):
+        return np.bincount(codes, weights=values, minlength=size)
+
+    # Store fixed effects: centre both logs within each product x store series
+    series_points = np.bincount(series_codes, minlength=n_series)
+    x = log_price - (grouped_sum(series_codes, log_price, n_series) / series_points)[series_codes]
+    y = log_quantity - (grouped_sum(series_codes, log_quantity, n_series) / series_points)[series_codes]
+
+    sxx = grouped_sum(product_codes, x * x, n_products)
+    sxy = grouped_sum(product_codes, x * y, n_products)
+    syy = grouped_sum(product_codes, y * y, n_products)
+    n_points = np.bincount(product_codes, minlength=n_products)
+    n_stores = np.bincount(product_codes[np.unique(series_codes, return_index=True)[1]], minlength=n_products)
+    dof = n_points - n_stores - 1
+
+    fitted = (sxx > MIN_LOG_PRICE_SPREAD ** 2 * n_points) & (dof >= MIN_PRICE_POINTS - 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        elasticity = np.where(fitted, sxy / sxx, np.nan)
+        residual = np.maximum(syy - elasticity * sxy, 0)
+        std_error = np.where(fitted, np.sqrt(residual / np.maximum(dof, 1) / sxx), np.nan)
+        r_squared = np.where(fitted & (syy > 0), 1 - residual / syy, np.nan)
+
+    return pd.DataFrame({
+        'productName': products,
+        'elasticity': elasticity,
+        'std_error': std_error,
+        'r_squared': r_squared,
+        'price_points': n_points,
+        'stores': n_stores,
+        'response': np.select([elasticity < -1, elasticity <= 0], ['elastic', 'inelastic'], np.where(fitted, 'positive', 'not enough price variation')),
+    })
+
+# Average price and margin per day of every product over the last RECENT_DAYS against the RECENT_DAYS before.
+# Products whose price moved by more than MIN_PRICE_CHANGE while their daily margin fell are flagged.
+def margin_changes(points, elasticities, recent_days=RECENT_DAYS):
+    if points.empty:
+        return pd.DataFrame()
+    last_day = points['orderDate'].max()
+    age = (last_day - points['orderDate']) // pd.Timedelta(days=1)
+    period = np.select([age < recent_days, age < 2 * recent_days], ['recent', 'previous'], 'older')
+
+    windows = points[period != 'older'].assign(period=period[period != 'older'])
+    totals = windows.groupby(['productName', 'period'], sort=True)[['quantity', 'revenue', 'margin']].sum().unstack('period')
+    if totals.empty or 'recent' not in totals['revenue'] or 'previous' not in totals['revenue']:
+        return pd.DataFrame()
+
+    changes = pd.DataFrame({
+        'previous_price': totals['revenue']['previous'] / totals['quantity']['previous'],
+        'recent_price': totals['revenue']['recent'] / totals['quantity']['recent'],
+        'previous_daily_margin': totals['margin']['previous'] / recent_days,
+        'recent_daily_margin': totals['margin']['recent'] / recent_days,
+    }).dropna(subset=['previous_price', 'recent_price'])
+    changes['price_change'] = changes['recent_price'] / changes['previous_price'] - 1
+    changes['margin_change'] = changes['recent_daily_margin'] - changes['previous_daily_margin']
+    changes['margin_cut'] = (changes['price_change'].abs() > MIN_PRICE_CHANGE) & (changes['margin_change'] < 0)
+
+    changes = changes.reset_index().merge(elasticities[['productName', 'elasticity', 'response']], on='productName', how='left')
+    return changes.sort_values(by='margin_change', ignore_index=True)
+
+# Elasticities and margin changes of every product, built once per dataset
+def price_response(points):
+    elasticities = fit_elasticities(points)
+    return {'elasticity': elasticities, 'margin_changes': margin_changes(points, elasticities)}
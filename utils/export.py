@@ -0,0 +1,139 @@
+import gzip
+import os
+import re
+import pandas as pd
+
+# Rows serialized at a time; memory use depends on this, not on the size of the output
+DEFAULT_EXPORT_CHUNK_ROWS = 100_000
+
+# Server-side directory exports are written to
+EXPORT_DIRECTORY = "exports"
+
+# Excel's row limit per sheet (including the header); longer outputs continue on further sheets
+EXCEL_MAX_ROWS = 1_048_576
+
+EXPORT_FORMATS = {
+    'CSV (gzip)': 'csv.gz',
+    'Parquet': 'parquet',
+    'Excel': 'xlsx',
+}
+
+# Consecutive row slices of a frame (views under copy-on-write, so nothing is copied up front)
+def frame_chunks(frame, chunk_rows=DEFAULT_EXPORT_CHUNK_ROWS):
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+def _write_csv_gz(chunks, path):
+    with gzip.open(path, 'wt', compresslevel=6, newline='') as handle:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(handle, header=header, index=False)
+            header = False
+
+# Rows of an object column looked at to infer its Parquet type
+SCHEMA_SAMPLE_ROWS = 1_000
+
+# Parquet schema of a whole frame, from its dtypes; object columns take the type of their first non-missing
+# values (strings when there are none), so no chunk's own missing or mixed values decide a column's type
+def parquet_schema(frame):
+    import pyarrow as pa
+
+    fields = []
+    for column in frame.columns:
+        series = frame[column]
+        if series.dtype == object:
+            values = series.dropna().iloc[:SCHEMA_SAMPLE_ROWS]
+            field_type = pa.infer_type(values.to_numpy()) if len(values) else pa.string()
+        else:
+            field_type = pa.Schema.from_pandas(series.iloc[:0].to_frame(), preserve_index=False).field(0).type
+        fields.append(pa.field(str(column), pa.string() if pa.types.is_null(field_type) else field_type))
+    return pa.schema(fields)
+
+# Every chunk is converted to one schema: `schema` (e.g. parquet_schema of the exported frame) or, for a
+# stream of chunks, the first chunk's schema with empty columns as strings and integers widened to floats,
+# since later chunks may hold missing values
+def _write_parquet(chunks, path, schema=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                if schema is None:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    for position, field in enumerate(schema):
+                        if pa.types.is_null(field.type):
+                            schema = schema.set(position, field.with_type(pa.string()))
+                        elif pa.types.is_integer(field.type):
+                            schema = schema.set(position, field.with_type(pa.float64()))
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _write_xlsx(chunks, path):
+    from openpyxl import Workbook
+
+    # Write-only workbooks stream rows to a temporary file instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, header = None, 0, None
+    for chunk in chunks:
+        if header is None:
+            header = [str(column) for column in chunk.columns]
+        # Excel has no NaN/NaT: missing values become empty cells
+        values = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+        for row in values:
+            if sheet is None or sheet_rows == EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+                sheet.append(header)
+                sheet_rows = 1
+            sheet.append(row)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet("Sheet1").append(header or [])
+    workbook.save(path)
+
+WRITERS = {
+    'csv.gz': _write_csv_gz,
+    'parquet': _write_parquet,
+    'xlsx': _write_xlsx,
+}
+
+def export_path(name, extension, directory=EXPORT_DIRECTORY):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').lower() or 'export'
+    stamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(directory, f"{slug}_{stamp}.{extension}")
+
+# Write a frame, or any iterable of frames with the same columns, to `path` chunk by chunk.
+# The format comes from the extension (.csv.gz, .parquet or .xlsx). Returns the number of rows written.
+def export_chunks(chunks, path):
+    extension = next((extension for extension in WRITERS if path.endswith('.' + extension)), None)
+    if extension is None:
+        raise ValueError(f"Unsupported export format for '{path}'; use one of: {', '.join(WRITERS)}")
+    options = {}
+    if isinstance(chunks, pd.DataFrame):
+        if extension == 'parquet':
+            options['schema'] = parquet_schema(chunks)
+        chunks = frame_chunks(chunks)
+
+    rows = [0]
+
+    def counted(chunks):
+        for chunk in chunks:
+            rows[0] += len(chunk)
+            yield chunk
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write next to the target and rename, so a failed export never leaves a truncated file behind
+    partial = path + '.partial'
+    try:
+        WRITERS[extension](counted(chunks), partial, **options)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return rows[0]
@@ -0,0 +1,192 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.schema import event_time
+
+# Slices kept per level of the hierarchy
+DEFAULT_MAX_ENTRIES = 8
+
+# Sidebar filter results cached as a hierarchy: date range -> stores -> products.
+# Each level is computed from the already-narrowed slice of the level above, so changing only the
+# stores reuses the date slice and changing only the products reuses the store slice.
+# Levels cache row positions (8 bytes a row); the frames taken from them are kept in a separate LRU bounded
+# by bytes, by default the dataset's own (shallow) size, so the cache never holds more than about one copy.
+# Results derived from the slices (see derived) have an LRU of their own, by default bounded by twice that size:
+# the tables of one selection (co-occurrence counts above all) can together exceed the slice they come from.
+class FilterCache:
+    def __init__(self, data, max_entries=DEFAULT_MAX_ENTRIES, max_frame_bytes=None, max_derived_bytes=None):
+        self.data = data
+        self.max_entries = max_entries
+        # Taken frames share the dataset's strings, so their shallow size is what they add
+        self.max_frame_bytes = int(data.memory_usage(index=False).sum()) if max_frame_bytes is None else max_frame_bytes
+        self.max_derived_bytes = 2 * self.max_frame_bytes if max_derived_bytes is None else max_derived_bytes
+        self._lock = threading.Lock()
+        self._levels = {'date': OrderedDict(), 'store': OrderedDict(), 'product': OrderedDict(), 'time': OrderedDict()}
+        self._frames = OrderedDict()
+        self._frame_bytes = 0
+        self._derived = OrderedDict()
+        self._derived_bytes = 0
+        self._codes = {}
+        self._sorted_events = None
+
+        # Sort row positions by orderDate once so any date range is two binary searches
+        order_dates = data['orderDate']
+        self._timezone = order_dates.dt.tz
+        valid = np.flatnonzero(order_dates.notna().to_numpy())
+        dates = order_dates.values[valid]
+        order = np.argsort(dates, kind='stable')
+        self._sorted_positions = valid[order]
+        self._sorted_dates = dates[order]
+
+    def _bound(self, value):
+        # Sidebar dates are naive; compare them in the column's timezone
+        value = pd.Timestamp(value)
+        if self._timezone is not None:
+            if value.tzinfo is None:
+                value = value.tz_localize(self._timezone)
+            value = value.tz_convert('UTC').tz_localize(None)
+        elif value.tzinfo is not None:
+            value = value.tz_localize(None)
+        return value.to_datetime64()
+
+    # Codes of a text column (factorized on first use) and the codes of `values` in it
+    def _column_codes(self, column, values):
+        with self._lock:
+            if column not in self._codes:
+                self._codes[column] = pd.factorize(self.data[column])
+        codes, labels = self._codes[column]
+        wanted = labels.get_indexer(pd.Index(list(values)))
+        return codes, wanted[wanted >= 0]
+
+    def _cached(self, level, key, compute):
+        entries = self._levels[level]
+        with self._lock:
+            if key in entries:
+                entries.move_to_end(key)
+                return entries[key]
+
+        result = compute()
+
+        with self._lock:
+            entries[key] = result
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        return result
+
+    # The rows at `positions`, in dataset order, from the byte-bounded frame LRU
+    def _frame(self, level, key, positions):
+        with self._lock:
+            if (level, key) in self._frames:
+                self._frames.move_to_end((level, key))
+                return self._frames[(level, key)]
+
+        # A slice of every row is the dataset itself (positions are sorted and unique)
+        if len(positions) == len(self.data):
+            return self.data
+        frame = self.data.take(positions)
+        size = int(frame.memory_usage(index=False).sum())
+
+        with self._lock:
+            if (level, key) not in self._frames and size <= self.max_frame_bytes:
+                self._frames[(level, key)] = frame
+                self._frame_bytes += size
+                while self._frame_bytes > self.max_frame_bytes:
+                    _, evicted = self._frames.popitem(last=False)
+                    self._frame_bytes -= int(evicted.memory_usage(index=False).sum())
+        return frame
+
+    def _date_positions(self, start_date, end_date):
+        def compute():
+            low = 0 if start_date is None else np.searchsorted(self._sorted_dates, self._bound(start_date), side='left')
+            high = len(self._sorted_dates) if end_date is None else np.searchsorted(self._sorted_dates, self._bound(end_date), side='right')
+            # Keep the original row order of the dataset
+            return np.sort(self._sorted_positions[low:high])
+
+        return self._cached('date', (start_date, end_date), compute)
+
+    def _store_positions(self, start_date, end_date, stores):
+        def compute():
+            positions = self._date_positions(start_date, end_date)
+            codes, wanted = self._column_codes('storeName', stores)
+            return positions[np.isin(codes[positions], wanted)]
+
+        return self._cached('store', (start_date, end_date, frozenset(stores)), compute)
+
+    def _product_positions(self, start_date, end_date, stores, products):
+        def compute():
+            positions = self._store_positions(start_date, end_date, stores)
+            codes, wanted = self._column_codes('productName', products)
+            return positions[np.isin(codes[positions], wanted)]
+
+        return self._cached('product', (start_date, end_date, frozenset(stores), frozenset(products)), compute)
+
+    def by_date(self, start_date, end_date):
+        key = (start_date, end_date)
+        return self._frame('date', key, self._date_positions(start_date, end_date))
+
+    # Rows with start <= eventTime < end, to the minute or finer; naive bounds are local times (see
+    # utils.schema.event_time). The eventTime order is sorted on first use.
+    def by_time(self, start, end):
+        key = (pd.Timestamp(start), pd.Timestamp(end))
+
+        def compute():
+            with self._lock:
+                if self._sorted_events is None:
+                    events = self.data['eventTime'].to_numpy(dtype=np.int64)
+                    order = np.argsort(events, kind='stable')
+                    self._sorted_events = (order, events[order])
+            order, events = self._sorted_events
+            low, high = np.searchsorted(events, [event_time(start), event_time(end)], side='left')
+            return np.sort(order[low:high])
+
+        return self._frame('time', key, self._cached('time', key, compute))
+
+    def by_store(self, start_date, end_date, stores):
+        key = (start_date, end_date, frozenset(stores))
+        return self._frame('store', key, self._store_positions(start_date, end_date, stores))
+
+    def by_product(self, start_date, end_date, stores, products):
+        key = (start_date, end_date, frozenset(stores), frozenset(products))
+        return self._frame('product', key, self._product_positions(start_date, end_date, stores, products))
+
+    # `compute(slice)` of a by_product slice (e.g. co-occurrence counts), cached per name, filter and `extra`
+    # (hashable; any other argument the result depends on) so every session and API request on the dataset
+    # shares one result. Results are counted against max_derived_bytes; one larger than that is not kept.
+    def derived(self, name, start_date, end_date, stores, products, compute, extra=()):
+        key = (name, start_date, end_date, frozenset(stores), frozenset(products), extra)
+        with self._lock:
+            if key in self._derived:
+                self._derived.move_to_end(key)
+                return self._derived[key][0]
+
+        result = compute(self.by_product(start_date, end_date, stores, products))
+        size = result_bytes(result)
+
+        with self._lock:
+            if key not in self._derived and size <= self.max_derived_bytes:
+                self._derived[key] = (result, size)
+                self._derived_bytes += size
+                while self._derived_bytes > self.max_derived_bytes:
+                    _, (_, evicted_size) = self._derived.popitem(last=False)
+                    self._derived_bytes -= evicted_size
+        return result
+
+# Shallow size of a derived result: frames, series, indexes, arrays and sparse matrices, also inside tuples,
+# lists and dicts. Strings shared with the dataset are not counted, as for the taken frames.
+def result_bytes(result):
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return int(np.sum(result.memory_usage(index=True)))
+    if isinstance(result, pd.Index):
+        return int(result.memory_usage())
+    if isinstance(result, np.ndarray):
+        return int(result.nbytes)
+    if isinstance(result, dict):
+        # Name maps hold the dataset's strings; only the slots and any nested tables count
+        return sum(result_bytes(value) for value in result.values() if not isinstance(value, str)) + 64 * len(result)
+    if isinstance(result, (tuple, list)):
+        return sum(result_bytes(value) for value in result)
+    # Sparse matrices (CSR/CSC/COO) by their component arrays
+    parts = [getattr(result, name, None) for name in ('data', 'indices', 'indptr', 'row', 'col')]
+    return sum(int(part.nbytes) for part in parts if isinstance(part, np.ndarray))
@@ -0,0 +1,103 @@
+import itertools
+import numpy as np
+import pandas as pd
+from utils.time_series import cube_blocks
+
+# Day-of-week seasonality
+SEASON_LENGTH = 7
+DEFAULT_HORIZON = 7
+
+# Days of history each series is fitted on
+DEFAULT_HISTORY_DAYS = 182
+
+# Smoothing parameters tried for every series; each series keeps the combination with the lowest
+# one-step-ahead squared error
+SMOOTHING_GRID = {
+    'alpha': (0.05, 0.2, 0.5),
+    'beta': (0.0, 0.05),
+    'gamma': (0.05, 0.2, 0.4),
+}
+
+# Additive Holt-Winters (level, trend, day-of-week season) run over every series and every parameter
+# combination at once. `history` is (series, days); alpha/beta/gamma are (combinations,) arrays.
+# The loop is over days only: each step updates a (combinations, series) state with array operations.
+# Returns the one-step-ahead SSE (combinations, series) and the forecast (combinations, series, horizon).
+def holt_winters_batch(history, alpha, beta, gamma, horizon=DEFAULT_HORIZON, season_length=SEASON_LENGTH):
+    n_days = history.shape[1]
+    alpha, beta, gamma = (np.asarray(value, dtype=np.float64)[:, None] for value in (alpha, beta, gamma))
+
+    # Initial state from the first two seasons
+    first = history[:, :season_length].mean(axis=1)
+    second = history[:, season_length:2 * season_length].mean(axis=1)
+    level = np.broadcast_to(first, alpha.shape[:1] + first.shape).copy()
+    trend = np.broadcast_to((second - first) / season_length, level.shape).copy()
+    season = np.broadcast_to((history[:, :season_length] - first[:, None]).T, (len(alpha), season_length) + first.shape).copy()
+
+    sse = np.zeros(level.shape)
+    for day in range(season_length, n_days):
+        observed = history[:, day]
+        slot = day % season_length
+        seasonal = season[:, slot]
+        error = observed - (level + trend + seasonal)
+        sse += error * error
+
+        previous_level = level
+        level = alpha * (observed - seasonal) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+        season[:, slot] = gamma * (observed - level) + (1 - gamma) * seasonal
+
+    steps = np.arange(1, horizon + 1)
+    slots = (n_days + steps - 1) % season_length
+    forecast = level[..., None] + trend[..., None] * steps + np.moveaxis(season[:, slots], 1, -1)
+    return sse, forecast
+
+# Next-`horizon`-day forecasts for every row of a (series, days) matrix, e.g. the daily cube's quantities.
+# Series are fitted on their last `history_days` days; negative forecasts are clipped to 0.
+def forecast_matrix(matrix, horizon=DEFAULT_HORIZON, history_days=DEFAULT_HISTORY_DAYS):
+    history = np.asarray(matrix, dtype=np.float64)[:, -history_days:]
+    n_series, n_days = history.shape
+
+    # Too little history for two seasons: repeat the recent daily mean
+    if n_days < 2 * SEASON_LENGTH:
+        mean = history.mean(axis=1) if n_days else np.zeros(n_series)
+        return {
+            'forecast': np.repeat(mean[:, None], horizon, axis=1),
+            'alpha': np.full(n_series, np.nan),
+            'beta': np.full(n_series, np.nan),
+            'gamma': np.full(n_series, np.nan),
+            'rmse': np.full(n_series, np.nan),
+        }
+
+    combinations = np.array(list(itertools.product(*SMOOTHING_GRID.values())))
+    sse, forecasts = holt_winters_batch(history, combinations[:, 0], combinations[:, 1], combinations[:, 2], horizon)
+
+    best = sse.argmin(axis=0)
+    series = np.arange(n_series)
+    return {
+        'forecast': np.clip(forecasts[best, series], 0, None),
+        'alpha': combinations[best, 0],
+        'beta': combinations[best, 1],
+        'gamma': combinations[best, 2],
+        'rmse': np.sqrt(sse[best, series] / (n_days - SEASON_LENGTH)),
+    }
+
+# Demand forecast table for every product x store series of a daily cube: one row per series with a
+# column per forecast day, the week's total, the chosen smoothing parameters and the in-sample RMSE
+# The series are fitted a block at a time, densifying only their last history_days days
+def forecast_cube(cube, metric='total_quantity', horizon=DEFAULT_HORIZON, history_days=DEFAULT_HISTORY_DAYS):
+    blocks = [forecast_matrix(block, horizon, history_days) for _, block in cube_blocks(cube, metric, days=history_days)]
+    if blocks:
+        fitted = {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+    else:
+        fitted = forecast_matrix(np.zeros((0, 0)), horizon, history_days)
+    last_day = cube['dates'][-1] if len(cube['dates']) else pd.Timestamp.today().normalize()
+    forecast_dates = pd.date_range(last_day + pd.Timedelta(days=1), periods=horizon, freq='D')
+
+    table = pd.DataFrame({'productName': cube['products'], 'storeName': cube['stores']})
+    days = pd.DataFrame(fitted['forecast'], columns=[date.strftime('%Y-%m-%d') for date in forecast_dates])
+    table = pd.concat([table, days], axis=1)
+    table['forecast_total'] = fitted['forecast'].sum(axis=1)
+    for name in ('alpha', 'beta', 'gamma', 'rmse'):
+        table[name] = fitted[name]
+    table.attrs['forecast_dates'] = forecast_dates
+    return table
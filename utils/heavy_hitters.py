@@ -0,0 +1,66 @@
+import heapq
+
+# Space-Saving heavy-hitters summary (Metwally et al.) holding at most `capacity` counters
+# Every reported count overestimates the true count by at most its error, and error <= total / capacity,
+# so any item seen more than total / capacity times is guaranteed to be in the summary
+class SpaceSaving:
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # Lazy min-heap of (count, item); stale entries are skipped and the heap is rebuilt when it grows
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, item, weight=1):
+        self.total += weight
+        counts = self.counts
+
+        if item in counts:
+            counts[item] += weight
+        elif len(counts) < self.capacity:
+            counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, item))
+        else:
+            # Replace the current minimum; its count becomes the newcomer's maximum overestimate
+            minimum_item, minimum_count = self._pop_minimum()
+            del counts[minimum_item]
+            del self.errors[minimum_item]
+            counts[item] = minimum_count + weight
+            self.errors[item] = minimum_count
+            heapq.heappush(self._heap, (counts[item], item))
+
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, key) for key, count in counts.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def _pop_minimum(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self.counts.get(item)
+            if current == count:
+                return item, count
+            if current is not None:
+                # Count grew since this entry was pushed; re-queue it with the live value
+                heapq.heappush(self._heap, (current, item))
+
+    @property
+    def max_error(self):
+        return self.total / self.capacity
+
+    # Top-k items as (item, count, error); the true count lies in [count - error, count]
+    def top(self, k=None):
+        ranked = sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)
+        if k is not None:
+            ranked = ranked[:k]
+        return [(item, count, self.errors[item]) for item, count in ranked]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Drill-down levels, from the top
+HIERARCHY_LEVELS = ['categoryName', 'brandName', 'productName']
+
+# Label of lines without a category or brand
+UNKNOWN_LABEL = "Unknown"
+
+HIERARCHY_METRICS = ['total_sales', 'total_cost', 'total_quantity']
+
+# Sales, cost and quantity per (category, brand, product) path, store and day, built once per dataset.
+# Cells are sorted by day, so a date range is two binary searches; any store and date selection is then one
+# bincount per metric over the cells, never a pass over the line items.
+def build_hierarchy_rollup(data):
+    order_days = data['orderDate'].dt.normalize()
+    if order_days.dt.tz is not None:
+        order_days = order_days.dt.tz_localize(None)
+    valid = order_days.notna().to_numpy()
+
+    levels = pd.DataFrame({level: data[level].fillna(UNKNOWN_LABEL) for level in HIERARCHY_LEVELS})[valid]
+    path_codes = levels.groupby(HIERARCHY_LEVELS, sort=True).ngroup().to_numpy()
+    paths = levels.drop_duplicates().sort_values(HIERARCHY_LEVELS, ignore_index=True)
+    store_codes, stores = pd.factorize(data['storeName'].to_numpy(dtype=object)[valid], sort=True)
+
+    days = order_days[valid]
+    first_day = days.min() if len(days) else pd.Timestamp(0)
+    day_codes = ((days - first_day) // pd.Timedelta(days=1)).to_numpy()
+    n_days = int(day_codes.max()) + 1 if len(day_codes) else 0
+
+    # One cell per day, path and store: day-major keys sort the cells by day
+    keys = (day_codes.astype(np.int64) * len(paths) + path_codes) * len(stores) + store_codes
+    cells, cell_codes = np.unique(keys, return_inverse=True)
+    line_values = {
+        'total_sales': (data['sellingPrice'] * data['quantity'])[valid].to_numpy(dtype=np.float64, na_value=0),
+        'total_cost': (data['costPrice'] * data['quantity'])[valid].to_numpy(dtype=np.float64, na_value=0),
+        'total_quantity': data['quantity'][valid].to_numpy(dtype=np.float64, na_value=0),
+    }
+
+    return {
+        'paths': paths,
+        'stores': np.asarray(stores, dtype=object),
+        'first_day': first_day,
+        'n_days': n_days,
+        'day': cells // (len(paths) * len(stores)),
+        'path': (cells // len(stores)) % len(paths),
+        'store': cells % len(stores),
+        'values': {metric: np.bincount(cell_codes, weights=weights, minlength=len(cells)) for metric, weights in line_values.items()},
+    }
+
+# Totals of every (category, brand, product) path for the selected stores between start and end (inclusive)
+def hierarchy_totals(rollup, stores, start_date, end_date):
+    start_day = (pd.Timestamp(start_date).normalize() - rollup['first_day']) // pd.Timedelta(days=1)
+    end_day = (pd.Timestamp(end_date).normalize() - rollup['first_day']) // pd.Timedelta(days=1)
+    low, high = np.searchsorted(rollup['day'], [start_day, end_day + 1])
+
+    path = rollup['path'][low:high]
+    selected = np.isin(rollup['store'][low:high], np.flatnonzero(pd.Index(rollup['stores']).isin(stores)))
+    totals = rollup['paths'].copy()
+    for metric in HIERARCHY_METRICS:
+        totals[metric] = np.bincount(path[selected], weights=rollup['values'][metric][low:high][selected], minlength=len(totals))
+    return totals
+
+# One level of the drill-down: `totals` of the paths under `parents` ({level: label} of the levels above)
+# summed per label of `level`, largest sales first
+def level_table(totals, level, parents=None):
+    mask = np.ones(len(totals), dtype=bool)
+    for parent, label in (parents or {}).items():
+        mask &= (totals[parent] == label).to_numpy()
+    table = totals[mask].groupby(level, sort=False)[HIERARCHY_METRICS].sum()
+    table = table[table['total_quantity'] != 0].sort_values(by='total_sales', ascending=False).reset_index()
+
+    table['profit'] = table['total_sales'] - table['total_cost']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['profit_margin'] = table['profit'] / table['total_sales'] * 100
+        table['sales_share'] = table['total_sales'] / table['total_sales'].sum() * 100
+    return table
@@ -0,0 +1,289 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from utils.schema import apply_schema, detect_layout, merge_reports, source_columns, source_dtypes
+
+MANIFEST_FILE = "manifest.json"
+
+# Environment variable overriding the memory budget, in MB
+MEMORY_BUDGET_ENV = "SALES_MEMORY_BUDGET_MB"
+
+# Share of physical memory a parsed dataset may take before the app switches to partitioned storage
+DEFAULT_BUDGET_FRACTION = 0.25
+
+# Rows parsed (and routed to partitions) per chunk while ingesting, and rows sampled to estimate parsed size
+DEFAULT_INGEST_CHUNK_ROWS = 200_000
+SIZE_SAMPLE_ROWS = 5_000
+
+# Rows buffered per partition before they are written out as one file, and the most buffered in total
+# (as a share of the budget) before the largest buffers are written early; keeps the file count down
+PARTITION_FLUSH_ROWS = 100_000
+BUFFER_BUDGET_FRACTION = 0.25
+
+# Hash buckets spilled partial aggregates are split into, so each is combined on its own
+SPILL_BUCKETS = 16
+
+# Partition month of rows without an order date
+UNDATED_MONTH = "undated"
+
+# Memory budget in bytes: $SALES_MEMORY_BUDGET_MB, or DEFAULT_BUDGET_FRACTION of physical memory
+def memory_budget():
+    configured = os.environ.get(MEMORY_BUDGET_ENV)
+    if configured:
+        return int(float(configured) * 1024 ** 2)
+    try:
+        physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+    return int(physical * DEFAULT_BUDGET_FRACTION)
+
+# In-memory size the whole CSV would take once parsed, extrapolated from its first rows
+def estimate_parsed_bytes(payload, columns=None):
+    # The header and the first SIZE_SAMPLE_ROWS lines
+    end = -1
+    for _ in range(SIZE_SAMPLE_ROWS + 1):
+        end = payload.find(b'\n', end + 1)
+        if end < 0:
+            break
+    head = payload if end < 0 else payload[:end + 1]
+
+    usecols = None
+    if columns is not None:
+        _, usecols = source_columns(pd.read_csv(io.BytesIO(head), nrows=0).columns, columns)
+    sample = pd.read_csv(io.BytesIO(head), usecols=usecols)
+    if len(sample) == 0:
+        return 0
+    return int(sample.memory_usage(deep=True).sum() * len(payload) / len(head))
+
+def _month_keys(dates):
+    months = dates.dt.strftime('%Y-%m').to_numpy(dtype=object)
+    return np.where(pd.isna(months), UNDATED_MONTH, months)
+
+# Ingested rows stored on local disk as Parquet files partitioned by month and store:
+#   <directory>/<month>/store_<code>/part_<n>.parquet
+# The manifest records every partition's files, rows and in-memory size, so a query reads only the
+# partitions its date range and stores touch and can check them against the memory budget first.
+class PartitionedStore:
+    def __init__(self, directory=None, budget=None):
+        self.directory = directory or tempfile.mkdtemp(prefix="tns_partitions_")
+        self.budget = budget if budget is not None else memory_budget()
+        self._lock = threading.Lock()
+        self.manifest = {'rows': 0, 'columns': [], 'stores': [], 'partitions': {}}
+        self.report = None
+        self._buffers = {}
+        self._buffered_bytes = 0
+
+    def _store_code(self, store):
+        stores = self.manifest['stores']
+        if store not in stores:
+            stores.append(store)
+        return stores.index(store)
+
+    # Write a partition's buffered rows out as one more file of it
+    def _flush(self, key):
+        buffer = self._buffers.pop(key, None)
+        if buffer is None:
+            return
+        parts = buffer['parts']
+        part = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+        partition = self.manifest['partitions'][key]
+        path = os.path.join(self.directory, key, f"part_{len(partition['files'])}.parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part.to_parquet(path, index=False)
+        partition['files'].append(os.path.relpath(path, self.directory))
+        partition['rows'] += buffer['rows']
+        partition['bytes'] += buffer['bytes']
+        self._buffered_bytes -= buffer['bytes']
+
+    # Route one parsed chunk to its month x store partitions. Rows are buffered per partition and written once
+    # a partition has PARTITION_FLUSH_ROWS of them, or early (largest first) when the buffers outgrow their
+    # share of the budget.
+    def append(self, chunk):
+        if len(chunk) == 0:
+            return
+        months = _month_keys(chunk['orderDate'])
+        stores = chunk['storeName'].fillna("").to_numpy(dtype=object)
+        groups = pd.DataFrame({'month': months, 'store': stores}).groupby(['month', 'store'], sort=False).indices
+
+        with self._lock:
+            if not self.manifest['columns']:
+                self.manifest['columns'] = list(chunk.columns)
+            for (month, store), rows in groups.items():
+                key = f"{month}/store_{self._store_code(store)}"
+                self.manifest['partitions'].setdefault(key, {'month': month, 'store': store, 'files': [], 'rows': 0, 'bytes': 0})
+                part = chunk.take(rows)
+                part_bytes = int(part.memory_usage(deep=True).sum())
+                buffer = self._buffers.setdefault(key, {'parts': [], 'rows': 0, 'bytes': 0})
+                buffer['parts'].append(part)
+                buffer['rows'] += len(part)
+                buffer['bytes'] += part_bytes
+                self._buffered_bytes += part_bytes
+                if buffer['rows'] >= PARTITION_FLUSH_ROWS:
+                    self._flush(key)
+
+            limit = None if self.budget is None else self.budget * BUFFER_BUDGET_FRACTION
+            while limit is not None and self._buffered_bytes > limit and self._buffers:
+                self._flush(max(self._buffers, key=lambda key: self._buffers[key]['bytes']))
+            self.manifest['rows'] += len(chunk)
+
+    # Write every buffered row out and save the manifest
+    def flush(self):
+        with self._lock:
+            for key in list(self._buffers):
+                self._flush(key)
+            with open(os.path.join(self.directory, MANIFEST_FILE), "w") as handle:
+                json.dump(self.manifest, handle)
+
+    # Parse a CSV chunk by chunk straight into partitions; memory is bounded by one chunk.
+    # Returns the merged schema report of the chunks.
+    def ingest(self, payload, columns=None, chunk_rows=DEFAULT_INGEST_CHUNK_ROWS, on_progress=None):
+        buffer = io.BytesIO(payload)
+        header = pd.read_csv(buffer, nrows=0).columns
+        buffer.seek(0)
+        layout, usecols = (detect_layout(header), None) if columns is None else source_columns(header, columns)
+        reports = []
+        with pd.read_csv(buffer, chunksize=chunk_rows, usecols=usecols, dtype=source_dtypes(header, layout)) as reader:
+            for chunk in reader:
+                chunk, report = apply_schema(chunk, layout)
+                self.append(chunk)
+                reports.append(report)
+                if on_progress is not None:
+                    on_progress(self.manifest['rows'], buffer.tell() / max(len(payload), 1))
+        self.flush()
+        self.report = merge_reports(reports) if reports else None
+        return self.report
+
+    @property
+    def stores(self):
+        return sorted({partition['store'] for partition in self.manifest['partitions'].values()} - {""})
+
+    @property
+    def date_range(self):
+        months = sorted({partition['month'] for partition in self.manifest['partitions'].values()} - {UNDATED_MONTH})
+        return months[0] if months else None, months[-1] if months else None
+
+    # Partitions whose month overlaps start..end (None = unbounded) for the given stores (None = all)
+    def partitions_for(self, start_date=None, end_date=None, stores=None):
+        start_month = None if start_date is None else pd.Timestamp(start_date).strftime('%Y-%m')
+        end_month = None if end_date is None else pd.Timestamp(end_date).strftime('%Y-%m')
+        stores = None if stores is None else set(stores)
+        selected = []
+        for partition in self.manifest['partitions'].values():
+            month = partition['month']
+            if month == UNDATED_MONTH and (start_month is not None or end_month is not None):
+                continue
+            if start_month is not None and month < start_month or end_month is not None and month > end_month:
+                continue
+            if stores is not None and partition['store'] not in stores:
+                continue
+            selected.append(partition)
+        return selected
+
+    def _read(self, partition, columns=None):
+        frames = [pd.read_parquet(os.path.join(self.directory, path), columns=columns) for path in partition['files']]
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def _date_mask(self, frame, start_date, end_date):
+        mask = np.ones(len(frame), dtype=bool)
+        days = frame['orderDate'].dt.normalize()
+        if start_date is not None:
+            mask &= (days >= pd.Timestamp(start_date).normalize()).to_numpy()
+        if end_date is not None:
+            mask &= (days <= pd.Timestamp(end_date).normalize()).to_numpy()
+        return mask
+
+    # Rows of the selected dates and stores (optionally only `products`), read from the partitions they fall in.
+    # Raises MemoryError instead of reading partitions whose combined size exceeds the budget.
+    def load(self, start_date=None, end_date=None, stores=None, products=None, columns=None):
+        partitions = self.partitions_for(start_date, end_date, stores)
+        needed = sum(partition['bytes'] for partition in partitions)
+        if self.budget is not None and needed > self.budget:
+            raise MemoryError(f"The selection spans {len(partitions)} partitions ({needed / 1024 ** 2:,.0f} MB), "
+                              f"over the {self.budget / 1024 ** 2:,.0f} MB memory budget; narrow the dates or stores")
+
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ['orderDate', 'productName']))
+        frames = []
+        for partition in partitions:
+            frame = self._read(partition, read_columns)
+            mask = self._date_mask(frame, start_date, end_date)
+            if products is not None:
+                mask &= frame['productName'].isin(products).to_numpy()
+            frames.append(frame[mask])
+        if not frames:
+            return pd.DataFrame(columns=read_columns or self.manifest['columns'])
+        data = pd.concat(frames, ignore_index=True)
+        return data if columns is None else data[list(columns)]
+
+    # Sales, cost and quantity of the selected dates and stores summed by the `by` columns, one partition at a
+    # time. Partial aggregates are combined in memory; when they and the next partition would not fit the
+    # budget together, they are spilled to Parquet files hash-partitioned by group key into SPILL_BUCKETS
+    # buckets. At the end each bucket is combined on its own, so no more than one bucket's spills are in memory.
+    def aggregate(self, by, start_date=None, end_date=None, stores=None):
+        by = list(by)
+        spill_directory = tempfile.mkdtemp(prefix="spill_", dir=self.directory)
+        spills, partials, partial_bytes = 0, [], 0
+
+        def combine(frames):
+            return pd.concat(frames).groupby(level=list(range(len(by))), sort=False).sum()
+
+        def buckets(partial):
+            return pd.util.hash_pandas_object(partial.index, index=False).to_numpy() % SPILL_BUCKETS
+
+        try:
+            for partition in self.partitions_for(start_date, end_date, stores):
+                # Make room for the partition about to be read, counted at its in-memory size
+                if self.budget is not None and partials and partial_bytes + partition['bytes'] > self.budget:
+                    # Merge what is held first; spill only if the merged partial still leaves no room
+                    merged = combine(partials)
+                    partials, partial_bytes = [merged], int(merged.memory_usage(deep=True).sum())
+                    if partial_bytes + partition['bytes'] > self.budget:
+                        codes = buckets(merged)
+                        for bucket in np.unique(codes):
+                            path = os.path.join(spill_directory, f"bucket_{bucket}", f"spill_{spills}.parquet")
+                            os.makedirs(os.path.dirname(path), exist_ok=True)
+                            merged[codes == bucket].reset_index().to_parquet(path, index=False)
+                        spills += 1
+                        partials, partial_bytes = [], 0
+
+                frame = self._read(partition, list(dict.fromkeys(by + ['orderDate', 'sellingPrice', 'costPrice', 'quantity'])))
+                frame = frame[self._date_mask(frame, start_date, end_date)]
+                keys = [frame['orderDate'].dt.normalize() if column == 'orderDate' else frame[column] for column in by]
+                partial = pd.DataFrame({
+                    'total_sales': frame['sellingPrice'] * frame['quantity'],
+                    'total_cost': frame['costPrice'] * frame['quantity'],
+                    'total_quantity': frame['quantity'],
+                }).groupby(keys, sort=False).sum()
+                del frame
+                partials.append(partial)
+                partial_bytes += int(partial.memory_usage(deep=True).sum())
+
+            if spills == 0:
+                totals = [combine(partials)] if partials else []
+            else:
+                # Held partials join the spills bucket by bucket
+                held = combine(partials) if partials else None
+                held_codes = None if held is None else buckets(held)
+                totals = []
+                for bucket in range(SPILL_BUCKETS):
+                    directory = os.path.join(spill_directory, f"bucket_{bucket}")
+                    frames = [] if held is None else [held[held_codes == bucket]]
+                    if os.path.isdir(directory):
+                        frames += [pd.read_parquet(os.path.join(directory, name)).set_index(by) for name in sorted(os.listdir(directory))]
+                    frames = [frame for frame in frames if len(frame)]
+                    if frames:
+                        totals.append(combine(frames))
+            if not totals:
+                return pd.DataFrame(columns=by + ['total_sales', 'total_cost', 'total_quantity'])
+            totals = pd.concat(totals).reset_index()
+            totals.columns = by + ['total_sales', 'total_cost', 'total_quantity']
+            return totals
+        finally:
+            shutil.rmtree(spill_directory, ignore_errors=True)
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
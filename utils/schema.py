@@ -0,0 +1,253 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# Canonical columns the analyses read, and how each is coerced at load time
+COLUMN_KINDS = {
+    'invoice': 'key',
+    'orderDate': 'date',
+    'time': 'time',
+    'storeName': 'text',
+    'productId': 'key',
+    'productName': 'text',
+    'brandName': 'text',
+    'categoryName': 'text',
+    'sellingPrice': 'number',
+    'costPrice': 'number',
+    'quantity': 'number',
+}
+
+# Rows missing a valid value in any of these are quarantined instead of loaded
+REQUIRED_COLUMNS = ['orderDate', 'storeName', 'productName', 'sellingPrice', 'costPrice', 'quantity']
+
+# Time formats tried in order, as exported by the tills; a trailing Z marks a UTC time
+TIME_FORMATS = ['%H:%M:%S.%fZ', '%H:%M:%S', '%H:%M']
+UTC_TIME_FORMATS = {'%H:%M:%S.%fZ'}
+
+# Columns derived from orderDate and time at load time (see event_columns):
+#   eventTime     int64 nanoseconds since the epoch (UTC); order dates without a time count from local midnight,
+#                 missing dates hold EVENT_TIME_MISSING
+#   eventDay      int32 local calendar day, in days since 1970-01-01 (-1 without a date)
+#   eventHour     int8 local hour 0-23 (-1 without a date or time)
+#   eventWeekday  int8 local weekday, Monday = 0 (-1 without a date)
+EVENT_COLUMNS = ['eventTime', 'eventDay', 'eventHour', 'eventWeekday']
+EVENT_TIME_MISSING = np.iinfo(np.int64).min
+
+# Environment variable naming the stores' timezone (an IANA name such as "Asia/Kolkata"); order dates and
+# times without a Z are local wall-clock times there. Defaults to UTC.
+TIMEZONE_ENV = "SALES_TIMEZONE"
+
+def event_timezone():
+    return os.environ.get(TIMEZONE_ENV) or "UTC"
+
+# Known export layouts: source column name -> canonical column. Names are matched ignoring case,
+# spaces and punctuation, so "Order Date", "order_date" and "ORDERDATE" are the same column.
+SCHEMA_LAYOUTS = {
+    'canonical': {column: column for column in COLUMN_KINDS},
+    'snake_case': {
+        'invoice': 'invoice',
+        'order_date': 'orderDate',
+        'time': 'time',
+        'store_name': 'storeName',
+        'product_id': 'productId',
+        'product_name': 'productName',
+        'brand_name': 'brandName',
+        'category_name': 'categoryName',
+        'selling_price': 'sellingPrice',
+        'cost_price': 'costPrice',
+        'quantity': 'quantity',
+    },
+    'pos_export': {
+        'Invoice No': 'invoice',
+        'Date': 'orderDate',
+        'Time': 'time',
+        'Store': 'storeName',
+        'Item Code': 'productId',
+        'Item': 'productName',
+        'Brand': 'brandName',
+        'Category': 'categoryName',
+        'Unit Price': 'sellingPrice',
+        'Unit Cost': 'costPrice',
+        'Qty': 'quantity',
+    },
+}
+
+def register_layout(name, mapping):
+    unknown = set(mapping.values()) - set(COLUMN_KINDS)
+    if unknown:
+        raise ValueError(f"Layout '{name}' maps to unknown columns: {sorted(unknown)}")
+    SCHEMA_LAYOUTS[name] = dict(mapping)
+
+def _normalize(name):
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+# Source column -> canonical column for one layout, limited to the columns present
+def _layout_renames(columns, layout):
+    lookup = {_normalize(source): canonical for source, canonical in SCHEMA_LAYOUTS[layout].items()}
+    return {column: lookup[_normalize(column)] for column in columns if _normalize(column) in lookup}
+
+# The registered layout that accounts for the most required columns (ties go to the earlier layout)
+def detect_layout(columns):
+    def required_matches(layout):
+        return len(set(_layout_renames(columns, layout).values()) & set(REQUIRED_COLUMNS))
+    return max(SCHEMA_LAYOUTS, key=required_matches)
+
+# The layout of `header` and its source columns that map to one of the canonical `columns`, for read_csv(usecols=...)
+def source_columns(header, columns, layout=None):
+    layout = layout or detect_layout(header)
+    renames = _layout_renames(header, layout)
+    return layout, [column for column in header if renames.get(column) in columns]
+
+# read_csv dtypes for a header's source columns: keys are read as text, so every chunk of a file (and every
+# file) gets the same type whatever the chunk's values look like, and codes keep their leading zeros
+def source_dtypes(header, layout=None):
+    layout = layout or detect_layout(header)
+    return {column: str for column, canonical in _layout_renames(header, layout).items() if COLUMN_KINDS[canonical] == 'key'}
+
+def parse_dates(values):
+    return pd.to_datetime(values, errors='coerce', dayfirst=True)
+
+# Time of day as a timedelta (NaT where no format of TIME_FORMATS matches) and whether each time is UTC
+def parse_time_offsets(values):
+    text = values.astype('string')
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    utc = np.zeros(len(values), dtype=bool)
+    for time_format in TIME_FORMATS:
+        missing = parsed.isna() & text.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=time_format, errors='coerce')
+        if time_format in UTC_TIME_FORMATS:
+            utc |= (missing & parsed.notna()).to_numpy()
+    return parsed - parsed.dt.normalize(), utc
+
+def _offsets_to_times(offsets):
+    parsed = pd.Timestamp(0) + offsets
+    return parsed.dt.time.astype(object).where(parsed.notna(), None)
+
+# Times as datetime.time, trying each of TIME_FORMATS in order; None where no format matches
+def parse_times(values):
+    return _offsets_to_times(parse_time_offsets(values)[0])
+
+# eventTime value of a timestamp; naive timestamps are wall-clock times in `timezone`
+def event_time(value, timezone=None):
+    value = pd.Timestamp(value)
+    if value.tzinfo is None:
+        value = value.tz_localize(timezone or event_timezone(), ambiguous=True, nonexistent='shift_forward')
+    return value.tz_convert('UTC').value
+
+# The EVENT_COLUMNS of parsed order dates and time-of-day offsets (see parse_time_offsets), computed on int64
+# nanoseconds throughout. Local wall-clock times are converted to UTC in `timezone`; nonexistent times (DST
+# gaps) move forward and ambiguous ones take the first occurrence.
+def event_columns(dates, offsets=None, utc=None, timezone=None):
+    timezone = timezone or event_timezone()
+    day_ns = 86_400 * 10 ** 9
+    hour_ns = 3_600 * 10 ** 9
+    if dates.dt.tz is not None:
+        # Already zoned dates: their local calendar day is the date
+        dates = dates.dt.tz_localize(None)
+    has_date = dates.notna().to_numpy()
+    local = dates.dt.normalize().to_numpy(dtype='datetime64[ns]').view(np.int64).copy()
+    has_time = np.zeros(len(local), dtype=bool)
+    if offsets is not None:
+        has_time = offsets.notna().to_numpy() & has_date
+        local[has_time] += offsets.to_numpy(dtype='timedelta64[ns]').view(np.int64)[has_time]
+    utc = np.zeros(len(local), dtype=bool) if utc is None else utc & has_time
+
+    event = local.copy()
+    zoned = has_date & ~utc
+    if timezone != "UTC" and zoned.any():
+        wall = pd.Series(local[zoned].view('datetime64[ns]'))
+        event[zoned] = (wall.dt.tz_localize(timezone, ambiguous=True, nonexistent='shift_forward')
+                        .dt.tz_convert('UTC').dt.tz_localize(None).to_numpy(dtype='datetime64[ns]').view(np.int64))
+        # Z times are UTC; their local day and hour come from the store's timezone
+        if utc.any():
+            instant = pd.Series(local[utc].view('datetime64[ns]'))
+            local[utc] = (instant.dt.tz_localize('UTC').dt.tz_convert(timezone).dt.tz_localize(None)
+                          .to_numpy(dtype='datetime64[ns]').view(np.int64))
+    event[~has_date] = EVENT_TIME_MISSING
+
+    day = np.where(has_date, local // day_ns, -1)
+    return {
+        'eventTime': event,
+        'eventDay': day.astype(np.int32),
+        'eventHour': np.where(has_time, local % day_ns // hour_ns, -1).astype(np.int8),
+        # 1970-01-01 was a Thursday
+        'eventWeekday': np.where(has_date, (day + 3) % 7, -1).astype(np.int8),
+    }
+
+# Numbers, also accepting text with currency symbols and thousands separators ("$1,234.50")
+def parse_numbers(values):
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values
+    cleaned = values.astype('string').str.replace(r'[\s,$£€]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+# Trimmed text; blank values become missing
+def clean_text(values):
+    text = values.astype('string').str.strip()
+    return text.astype(object).where(text.notna() & (text != ''), np.nan)
+
+PARSERS = {'date': parse_dates, 'time': parse_times, 'number': parse_numbers, 'text': clean_text}
+
+# Rename a raw export to the canonical columns and coerce every column once, vectorized.
+# Rows failing a required column are moved to the report's quarantine frame (as read, with a `reason`).
+# `on_phase` is called with "date parse" and "time parse" as those columns are reached.
+def apply_schema(raw, layout=None, on_phase=None):
+    layout = layout or detect_layout(raw.columns)
+    renames = _layout_renames(raw.columns, layout)
+    raw = raw.rename(columns=renames)
+
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in raw.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns {missing_columns} (closest layout: '{layout}')")
+
+    data = {}
+    offsets, utc = None, None
+    for column in raw.columns:
+        kind = COLUMN_KINDS.get(column)
+        if kind in ('date', 'time') and on_phase is not None:
+            on_phase(f"{kind} parse")
+        if kind == 'time':
+            # Parsed once: the offsets also feed the event columns
+            offsets, utc = parse_time_offsets(raw[column])
+            data[column] = _offsets_to_times(offsets)
+        else:
+            data[column] = PARSERS[kind](raw[column]) if kind in PARSERS else raw[column]
+    data.update(event_columns(data['orderDate'], offsets, utc))
+    data = pd.DataFrame(data)
+
+    invalid = {column: data[column].isna().to_numpy() for column in REQUIRED_COLUMNS}
+    bad_rows = np.logical_or.reduce(list(invalid.values()))
+
+    reasons = pd.Series('', index=data.index[bad_rows], dtype=object)
+    for column, rows in invalid.items():
+        label = f"missing {column}" if COLUMN_KINDS[column] == 'text' else f"invalid {column}"
+        reasons = reasons + np.where(rows[bad_rows], label + '; ', '')
+    quarantine = raw[bad_rows].assign(reason=reasons.str.rstrip('; '))
+
+    if bad_rows.any():
+        data = data[~bad_rows].reset_index(drop=True)
+
+    report = {
+        'layout': layout,
+        'renamed': {source: canonical for source, canonical in renames.items() if source != canonical},
+        'rows': len(raw),
+        'quarantine': quarantine,
+    }
+    return data, report
+
+# Combine the reports of chunks loaded one after another
+def merge_reports(reports):
+    reports = list(reports)
+    return {
+        'layout': reports[0]['layout'],
+        'renamed': reports[0]['renamed'],
+        'rows': sum(report['rows'] for report in reports),
+        'quarantine': pd.concat([report['quarantine'] for report in reports], ignore_index=True),
+    }
+
+# Quarantined row counts by reason, for display
+def quarantine_summary(report):
+    return report['quarantine']['reason'].str.split('; ').explode().value_counts().rename_axis('reason').reset_index()
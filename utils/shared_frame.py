@@ -0,0 +1,81 @@
+import json
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = "manifest.json"
+
+# Write a parsed dataset to a directory of .npy column files so other processes can memory-map it
+# Rows are stored grouped by `partition_column` so a worker can map only its own slice
+def dump_frame(data, directory, partition_column=None):
+    os.makedirs(directory, exist_ok=True)
+
+    partitions = {}
+    if partition_column is not None:
+        order = np.argsort(data[partition_column].to_numpy(dtype=object).astype(str), kind='stable')
+        data = data.iloc[order].reset_index(drop=True)
+        keys = data[partition_column].astype(str).to_numpy()
+        boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate(([0], boundaries)) if len(keys) else np.array([], dtype=int)
+        stops = np.concatenate((boundaries, [len(keys)])) if len(keys) else np.array([], dtype=int)
+        partitions = {keys[start]: [int(start), int(stop)] for start, stop in zip(starts, stops)}
+
+    columns = []
+    for position, column in enumerate(data.columns):
+        series = data[column]
+        file_name = f"col_{position}.npy"
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # Datetimes are stored as int64 nanoseconds, NaT included
+            kind = "datetime"
+            np.save(os.path.join(directory, file_name), series.to_numpy(dtype='datetime64[ns]').view('int64'))
+        elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            kind = "numeric"
+            np.save(os.path.join(directory, file_name), series.to_numpy())
+        else:
+            # Everything else (strings, datetime.time) is dictionary encoded; only the codes are mapped
+            kind = "object"
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            np.save(os.path.join(directory, file_name), codes.astype(np.int32))
+            with open(os.path.join(directory, f"col_{position}.categories.pkl"), "wb") as handle:
+                pickle.dump(list(uniques), handle)
+        columns.append({"name": column, "file": file_name, "kind": kind})
+
+    manifest = {"rows": len(data), "columns": columns, "partitions": partitions}
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as handle:
+        json.dump(manifest, handle)
+
+    return manifest
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_FILE)) as handle:
+        return json.load(handle)
+
+# Rebuild a DataFrame from a dumped directory, memory-mapping the column files
+# Pass `partition` to load only the rows of one partition_column value
+def load_frame(directory, partition=None, columns=None):
+    manifest = read_manifest(directory)
+
+    rows = slice(0, manifest["rows"])
+    if partition is not None:
+        start, stop = manifest["partitions"].get(str(partition), [0, 0])
+        rows = slice(start, stop)
+
+    frame = {}
+    for position, column in enumerate(manifest["columns"]):
+        if columns is not None and column["name"] not in columns:
+            continue
+        values = np.load(os.path.join(directory, column["file"]), mmap_mode='r')[rows]
+        if column["kind"] == "datetime":
+            frame[column["name"]] = pd.Series(values.view('datetime64[ns]'), copy=False)
+        elif column["kind"] == "numeric":
+            frame[column["name"]] = pd.Series(values, copy=False)
+        else:
+            with open(os.path.join(directory, f"col_{position}.categories.pkl"), "rb") as handle:
+                uniques = np.array(pickle.load(handle) + [None], dtype=object)
+            # Code -1 (missing) indexes the trailing None
+            decoded = uniques[np.asarray(values)]
+            decoded.setflags(write=False)
+            frame[column["name"]] = pd.Series(decoded, copy=False)
+
+    return pd.DataFrame(frame, copy=False)
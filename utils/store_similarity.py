@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import squareform
+
+# What stores are compared on: revenue per product (sales mix) or which products they sell at all (assortment)
+SIMILARITY_BASES = ['sales_mix', 'assortment']
+
+DEFAULT_STORE_CLUSTERS = 4
+
+# Sparse store x product revenue matrix of the whole dataset. Only pairs with sales are stored, so memory grows
+# with the number of distinct store/product pairs rather than stores x catalogue size.
+def build_store_product_matrix(data):
+    store_codes, stores = pd.factorize(data['storeName'], sort=True)
+    product_codes, products = pd.factorize(data['productName'], sort=True)
+    valid = (store_codes >= 0) & (product_codes >= 0)
+    revenue = (data['sellingPrice'] * data['quantity']).to_numpy(dtype=np.float64)
+
+    # Duplicate (store, product) entries are summed by the conversion to CSR
+    matrix = sp.coo_matrix(
+        (revenue[valid], (store_codes[valid], product_codes[valid])),
+        shape=(len(stores), len(products)),
+    ).tocsr()
+    matrix.eliminate_zeros()
+
+    return {
+        'stores': np.asarray(stores, dtype=object),
+        'products': np.asarray(products, dtype=object),
+        'revenue': matrix,
+    }
+
+# Store x store cosine similarity. Rows are L2-normalised in sparse form, so the product only touches
+# the stored entries; the result is dense but only stores x stores.
+def cosine_similarity(matrix, basis='sales_mix'):
+    if basis == 'assortment':
+        matrix = (matrix > 0).astype(np.float64)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalised = sp.diags(scale) @ matrix
+    return np.asarray((normalised @ normalised.T).todense())
+
+# Average-linkage clusters on cosine distance, numbered 1..n_clusters
+def cluster_stores(similarity, n_clusters=DEFAULT_STORE_CLUSTERS):
+    n_stores = len(similarity)
+    if n_stores < 2:
+        return np.ones(n_stores, dtype=np.int64)
+    distance = np.clip(1.0 - similarity, 0.0, None)
+    np.fill_diagonal(distance, 0.0)
+    tree = linkage(squareform(distance, checks=False), method='average')
+    return fcluster(tree, t=min(n_clusters, n_stores), criterion='maxclust')
+
+# Cluster and nearest neighbour of every store
+def compute_store_clusters(store_matrix, n_clusters=DEFAULT_STORE_CLUSTERS, basis='sales_mix'):
+    similarity = cosine_similarity(store_matrix['revenue'], basis)
+    clusters = cluster_stores(similarity, n_clusters)
+
+    others = similarity.copy()
+    np.fill_diagonal(others, -np.inf)
+    nearest = others.argmax(axis=1) if len(others) > 1 else np.zeros(len(others), dtype=np.int64)
+    stores = store_matrix['stores']
+
+    table = pd.DataFrame({
+        'storeName': stores,
+        'cluster': [f"Cluster {cluster}" for cluster in clusters],
+        'most_similar_store': stores[nearest] if len(others) > 1 else None,
+        'similarity': others[np.arange(len(others)), nearest] if len(others) > 1 else np.nan,
+        'products_sold': np.diff(store_matrix['revenue'].indptr),
+    })
+    return table, pd.DataFrame(similarity, index=stores, columns=stores)
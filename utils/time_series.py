@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Daily metrics kept in the cube
+CUBE_METRICS = ['total_sales', 'total_quantity']
+
+# Rows densified at a time by passes over the whole cube
+DEFAULT_BLOCK_ROWS = 4096
+
+# Daily cube of every product x store series: one row per series, one column per calendar day from the first
+# to the last order date (days without sales are 0). Each metric is a sparse CSR matrix, so the long tail of
+# series that sell on few days costs only its sales days; read rows with cube_rows.
+def build_daily_cube(data):
+    order_days = data['orderDate'].dt.normalize()
+    valid = order_days.notna().to_numpy()
+
+    series = pd.DataFrame({'productName': data['productName'], 'storeName': data['storeName']})[valid]
+    series_codes = series.groupby(['productName', 'storeName'], sort=True).ngroup().to_numpy()
+    keys = series.drop_duplicates().sort_values(['productName', 'storeName'], ignore_index=True)
+
+    if valid.any():
+        days = order_days[valid]
+        dates = pd.date_range(days.min(), days.max(), freq='D')
+        day_codes = ((days - dates[0]) // pd.Timedelta(days=1)).to_numpy()
+    else:
+        dates = pd.DatetimeIndex([], dtype=order_days.dtype)
+        day_codes = np.array([], dtype=np.int64)
+
+    shape = (len(keys), len(dates))
+    line_values = {
+        'total_sales': (data['sellingPrice'] * data['quantity'])[valid].to_numpy(dtype=np.float64),
+        'total_quantity': data['quantity'][valid].to_numpy(dtype=np.float64),
+    }
+    # Duplicate (series, day) entries are summed when the matrix is built
+    values = {
+        metric: sp.csr_matrix((line_values[metric], (series_codes, day_codes)), shape=shape)
+        for metric in CUBE_METRICS
+    }
+
+    return {
+        'dates': dates,
+        'products': keys['productName'].to_numpy(dtype=object),
+        'stores': keys['storeName'].to_numpy(dtype=object),
+        'values': values,
+    }
+
+# Dense (rows, days) float64 matrix of the selected cube rows (all rows by default)
+def cube_rows(cube, metric, rows=None):
+    matrix = cube['values'][metric]
+    return (matrix if rows is None else matrix[np.asarray(rows)]).toarray()
+
+# The cube's rows as (row slice, dense matrix) blocks of at most block_rows, optionally only the last `days` days
+def cube_blocks(cube, metric, block_rows=DEFAULT_BLOCK_ROWS, days=None):
+    matrix = cube['values'][metric]
+    if days is not None:
+        matrix = matrix[:, max(matrix.shape[1] - days, 0):]
+    for start in range(0, matrix.shape[0], block_rows):
+        rows = slice(start, min(start + block_rows, matrix.shape[0]))
+        yield rows, matrix[rows].toarray()
+
+# Sums of the selected cube rows per key (one key per row), added up on the sparse rows so only the sums are
+# densified. Returns (sorted distinct keys, dense matrix of one row per key).
+def cube_group_sums(cube, metric, rows, keys):
+    codes, groups = pd.factorize(keys, sort=True)
+    grouping = sp.csr_matrix((np.ones(len(codes)), (codes, np.arange(len(codes)))), shape=(len(groups), len(codes)))
+    return groups, (grouping @ cube['values'][metric][np.asarray(rows)]).toarray()
+
+# Rows of the cube for the selected products and stores
+def select_series(cube, products, stores):
+    return np.flatnonzero(pd.Index(cube['products']).isin(products) & pd.Index(cube['stores']).isin(stores))
+
+# Sum the selected series per product (level="product") or keep them per product and store.
+# Returns (labels frame, matrix) with one matrix row per label row.
+def aggregate_series(cube, metric, rows, level="product"):
+    if level != "product":
+        labels = pd.DataFrame({'productName': cube['products'][rows], 'storeName': cube['stores'][rows]})
+        return labels, cube_rows(cube, metric, rows)
+
+    products, matrix = cube_group_sums(cube, metric, rows, cube['products'][rows])
+    return pd.DataFrame({'productName': products}), matrix
+
+# Trailing `window`-day sums along the day axis for every series at once (partial windows at the start)
+def rolling_sum(matrix, window):
+    totals = np.cumsum(matrix, axis=1)
+    rolled = totals.copy()
+    rolled[:, window:] -= totals[:, :-window]
+    return rolled
+
+# Running totals from the first day of `matrix`
+def cumulative_sum(matrix):
+    return np.cumsum(matrix, axis=1)
+
+# Column of the same calendar day one year earlier (29 February maps to 28 February); -1 before the cube starts
+def last_year_positions(dates):
+    return dates.get_indexer(dates - pd.DateOffset(years=1))
+
+# Values on the same calendar day one year earlier, NaN where the cube has no such day
+def same_day_last_year(matrix, dates):
+    positions = last_year_positions(dates)
+    shifted = matrix[:, np.maximum(positions, 0)].astype(np.float64)
+    shifted[:, positions < 0] = np.nan
+    return shifted
+
+# Daily, rolling 7/28-day, cumulative (from `start`) and last-year values for the selected series between
+# start and end. Returns the labels frame, the cropped dates and a dict of equally shaped matrices.
+def series_metrics(cube, metric, rows, level="product", start=None, end=None):
+    labels, daily = aggregate_series(cube, metric, rows, level)
+    dates = cube['dates']
+
+    metrics = {
+        'daily': daily,
+        'rolling_7': rolling_sum(daily, 7),
+        'rolling_28': rolling_sum(daily, 28),
+        'last_year': same_day_last_year(daily, dates),
+    }
+
+    low = 0 if start is None else dates.searchsorted(pd.Timestamp(start).normalize(), side='left')
+    high = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end).normalize(), side='right')
+    metrics = {name: matrix[:, low:high] for name, matrix in metrics.items()}
+    metrics['cumulative'] = cumulative_sum(metrics['daily'])
+    metrics['last_year_cumulative'] = cumulative_sum(np.nan_to_num(metrics['last_year']))
+    return labels, dates[low:high], metrics
+
+# Long frame (one row per series and day) of the chosen metrics, for charts
+def metrics_frame(labels, dates, metrics, rows=None, names=None):
+    rows = np.arange(len(labels)) if rows is None else np.asarray(rows)
+    names = names or list(metrics)
+    frame = labels.iloc[np.repeat(rows, len(dates))].reset_index(drop=True)
+    frame['orderDate'] = np.tile(dates.to_numpy(), len(rows))
+    for name in names:
+        frame[name] = metrics[name][rows].ravel()
+    return frame
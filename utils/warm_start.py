@@ -0,0 +1,13 @@
+import glob
+import os
+
+# Environment variable naming the directory the server warm-starts from
+WARM_START_ENV = "SALES_WARM_START_DIR"
+
+# Most recently modified CSV export in `directory` (default: $SALES_WARM_START_DIR), or None
+def latest_dataset(directory=None):
+    directory = directory or os.environ.get(WARM_START_ENV)
+    if not directory or not os.path.isdir(directory):
+        return None
+    candidates = glob.glob(os.path.join(directory, "*.csv"))
+    return max(candidates, key=os.path.getmtime) if candidates else None
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from utils.data_loader import hour_of_day
+
+HOURS = 24
+SLOTS = 7 * HOURS
+
+# Weekday x hour slot of every row (weekday * 24 + hour, Monday 00:00 = 0 .. Sunday 23:00 = 167), -1 where the
+# date or time is missing. Computed once per dataset; rows selected from it keep their labels, see rows_slots.
+def weekday_hour_slots(data):
+    if {'eventWeekday', 'eventHour'}.issubset(data.columns):
+        weekday = data['eventWeekday'].to_numpy(dtype=np.int16)
+        hour = data['eventHour'].to_numpy(dtype=np.int16)
+        return np.where((weekday >= 0) & (hour >= 0), weekday * HOURS + hour, -1).astype(np.int16)
+    weekday = data['orderDate'].dt.weekday.to_numpy(dtype=np.float64, na_value=np.nan)
+    hour = hour_of_day(data['time']).to_numpy(dtype=np.float64, na_value=np.nan)
+    slots = weekday * HOURS + hour
+    return np.where(np.isnan(slots), -1, slots).astype(np.int16)
+
+# Slots of `rows`, a selection (by label) from the dataset the slots were computed on
+def rows_slots(slots, dataset_index, rows):
+    return slots[dataset_index.get_indexer(rows.index)]
+
+# 7 x 24 heatmaps of every metric for every key (store or product) at once: one bincount per metric over
+# key * 168 + slot. Returns the sorted keys and a (keys, 7, 24) array per metric.
+def build_heatmap_stack(keys, slots, metrics):
+    codes, labels = pd.factorize(keys, sort=True)
+    valid = (codes >= 0) & (slots >= 0)
+    cells = codes[valid] * SLOTS + slots[valid]
+    size = len(labels) * SLOTS
+
+    stack = {'keys': np.asarray(labels, dtype=object)}
+    for name, values in metrics.items():
+        weights = np.asarray(values, dtype=np.float64)[valid]
+        stack[name] = np.bincount(cells, weights=weights, minlength=size).reshape(len(labels), 7, HOURS)
+    return stack
+
+# Revenue and quantity heatmaps of the selected rows per store and per product
+def weekday_hour_stacks(rows, slots):
+    metrics = {
+        'revenue': (rows['sellingPrice'] * rows['quantity']).to_numpy(dtype=np.float64),
+        'quantity': rows['quantity'].to_numpy(dtype=np.float64),
+    }
+    return {
+        'store': build_heatmap_stack(rows['storeName'].to_numpy(dtype=object), slots, metrics),
+        'product': build_heatmap_stack(rows['productName'].to_numpy(dtype=object), slots, metrics),
+    }
+
+# Busiest weekday and hour of every key, with its share of the key's total
+def peak_slots(stack, metric):
+    flat = stack[metric].reshape(len(stack['keys']), SLOTS)
+    peak = flat.argmax(axis=1) if len(flat) else np.array([], dtype=np.int64)
+    totals = flat.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(totals > 0, flat[np.arange(len(flat)), peak] / totals * 100, np.nan)
+    return pd.DataFrame({
+        'key': stack['keys'],
+        'peak_weekday': peak // HOURS,
+        'peak_hour': peak % HOURS,
+        'peak_value': flat[np.arange(len(flat)), peak],
+        'peak_share': share,
+        'total': totals,
+    })